@@ -5,13 +5,14 @@ DesignMetricSystem - 仅负责指标体系设计，输出标准化JSON
 from metagpt.actions import Action
 from metagpt.logs import logger
 from backend.tools.json_utils import extract_json_from_llm_response
+from backend.tools.llm_cache import CachedAskMixin
 from backend.config.architect_prompts import (
     METRICS_DESIGN_PROMPT,   # 指标体系设计主提示词（字段规范/枚举/计分规则的生成约束）
     ARCHITECT_BASE_SYSTEM,   # 架构师系统提示（角色定位与目标）
 )
 
 
-class DesignMetricSystem(Action):
+class DesignMetricSystem(CachedAskMixin, Action):
     async def run(self, research_brief_text: str) -> list:
         """
         基于研究简报生成指标体系的标准JSON（list[dict]）。
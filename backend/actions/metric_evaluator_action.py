@@ -5,6 +5,8 @@
 from metagpt.actions import Action
 from metagpt.logs import logger
 from backend.tools.json_utils import extract_json_from_llm_response
+from backend.tools.llm_cache import CachedAskMixin
+from backend.tools.prompt_packer import PromptSegment, pack_prompt_segments
 
 from backend.config.evaluation_standards import EVALUATION_TYPES  # 评价类型配置（描述/评分指导/意见写法要求）
 from backend.config.evaluator_prompts import (
@@ -17,7 +19,7 @@ import re
 from backend.tools.project_info import get_project_info_text
 
 
-class EvaluateMetrics(Action):
+class EvaluateMetrics(CachedAskMixin, Action):
     """
     指标评分Action - 按照标准化评价类型进行指标评分
     为每个指标生成评价意见和具体得分
@@ -215,23 +217,39 @@ class EvaluateMetrics(Action):
                 scoring_method = f"{scoring_method_intro}无"
 
         if EVALUATION_PROMPT_TEMPLATE:
-            prompt = EVALUATION_PROMPT_TEMPLATE.format(
-                evaluation_type=evaluation_type or "标准评价",
-                evaluation_points=points_str,
-                facts=facts,
-                scoring_method=scoring_method,
-                type_description=type_description,
-                scoring_guidance=scoring_guidance,
-                opinion_requirements=opinion_requirements,
-            )
-            logger.info(f"📝 提示词模板生成完成: {len(prompt)} 字符")
+            def render_prompt(f: str) -> str:
+                return EVALUATION_PROMPT_TEMPLATE.format(
+                    evaluation_type=evaluation_type or "标准评价",
+                    evaluation_points=points_str,
+                    facts=f,
+                    scoring_method=scoring_method,
+                    type_description=type_description,
+                    scoring_guidance=scoring_guidance,
+                    opinion_requirements=opinion_requirements,
+                )
         else:
             # 兜底模板
-            prompt = f"请基于以下事实，按{evaluation_type or '标准评价'}进行评分。\n\n要点:\n{points_str}\n\n事实:\n{facts}\n\n评分方法:{scoring_method}"
+            def render_prompt(f: str) -> str:
+                return (
+                    f"请基于以下事实，按{evaluation_type or '标准评价'}进行评分。\n\n"
+                    f"要点:\n{points_str}\n\n事实:\n{f}\n\n评分方法:{scoring_method}"
+                )
+
             logger.warning("⚠️ 使用兜底提示词模板")
 
+        # 按 token 预算打包：评价要点/计分规则完整保留，事实依据超出预算时压缩
+        project_info_text = get_project_info_text()
+        packed = pack_prompt_segments(
+            [PromptSegment("facts", facts)],
+            model=self._llm_model_name(),
+            fixed_texts=[render_prompt(""), EVALUATOR_BASE_SYSTEM, project_info_text],
+        )
+        if packed.compressed or packed.dropped:
+            logger.info(f"✂️ 事实依据超出token预算，已压缩: {packed.summary()}")
+        prompt = render_prompt(packed.texts["facts"])
+        logger.info(f"📝 提示词生成完成: {len(prompt)} 字符")
+
         try:
-            project_info_text = get_project_info_text()
             logger.info("🤖 开始调用LLM进行评分...")
             result = await self._aask(prompt, [EVALUATOR_BASE_SYSTEM, project_info_text])
             logger.info(f"🤖 LLM响应完成: {len(result)} 字符")
@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Tuple
 import hashlib
 import json
 import time
+import re
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -17,12 +18,26 @@ from pydantic import BaseModel, Field, TypeAdapter
 from metagpt.actions import Action
 from metagpt.logs import logger
 from metagpt.tools.search_engine import SearchEngine
-from metagpt.tools.web_browser_engine import WebBrowserEngine
 from metagpt.utils.project_repo import ProjectRepo
 from metagpt.utils.common import OutputParser
-from backend.tools.search_utils import normalize_keywords
+from backend.tools.search_utils import normalize_keywords, select_relevant_passages
 from backend.tools.json_utils import extract_json_from_llm_response
 from backend.tools.project_info import get_project_info_text
+from backend.tools.rate_limiter import get_rate_limiter, retry_async
+from backend.tools.browser_pool import BrowserPool
+from backend.tools.page_cache import get_page_cache
+from backend.tools.llm_cache import CachedAskMixin
+from backend.tools.prompt_packer import PromptSegment, pack_prompt_segments
+from backend.tools.near_dup import NearDuplicateDetector
+from backend.tools.pipeline import Stage, StagePipeline
+from backend.tools.search_hit import format_hits
+from backend.config.performance_config import (
+    SEARCH_CONCURRENCY,  # 搜索并发/重试配置
+    BROWSER_POOL,        # 网页抓取会话池配置
+    BRIEF_MERGE,         # 简报字段合并配置（素材切分）
+    NEAR_DUP,            # 网页近重复去除配置
+    RESEARCH_PIPELINE,   # 研究流水线各阶段 worker 数/队列容量
+)
 from backend.config.research_prompts import (
     COMPREHENSIVE_RESEARCH_BASE_SYSTEM,  # 综合研究基础系统提示（事实密度/质量要求）
     RESEARCH_TOPIC_SYSTEM,               # 主题设定模板
@@ -34,8 +49,8 @@ from backend.config.research_prompts import (
     ENHANCEMENT_QUERIES,                 # 研究增强查询模板
     RESEARCH_DECOMPOSITION_NUMS,         # 问题分解数量
     RESEARCH_URLS_PER_QUERY,             # 每问题URL数量
-    MAX_INPUT_TOKENS,                    # LLM输入长度限制
     DECOMPOSITION_DIMENSIONS,            # 统一研究方向维度种子
+    MERGE_FIELD_KEYWORDS,                # 简报字段相关度关键词
 )
 
 # MetaGPT 原生 RAG 组件 - 强制使用，不再提供简化版本
@@ -43,6 +58,10 @@ from backend.config.research_prompts import (
 
 # --- 提示词改为配置驱动，移除硬编码 ---
 
+PAGE_FAILED_TEXT = "无法访问或处理此页面。"  # 抓取或总结失败时的来源块正文
+SOURCE_LINE_PREFIX = "#### 来源:"
+_SOURCE_URL_PATTERN = re.compile(r"https?://[^\s（）()<>\"'，、]+")
+
 
 class Document(BaseModel):
     """单个文档的结构化模型"""
@@ -89,16 +108,29 @@ class PrepareDocuments(Action):
         return Documents(docs=docs)
 
 
-class ConductComprehensiveResearch(Action):
+class ConductComprehensiveResearch(CachedAskMixin, Action):
     """
     综合研究Action - 整合本地文档和网络研究
     完全整合case_research.py中的精细化研究逻辑和提示词
     """
+    _browser_pool: Optional[BrowserPool] = None  # 私有属性：网页抓取会话池（懒加载）
+    _dedup_saved_calls: int = 0  # 私有属性：近重复去除节省的总结调用次数
+    _pipeline_metrics: Optional[dict] = None  # 私有属性：最近一次研究流水线的各阶段指标
     
     def __init__(self, search_engine: SearchEngine = None, **kwargs):
         super().__init__(**kwargs)
         self.search_engine = search_engine
 
+    def _get_browser_pool(self) -> BrowserPool:
+        """懒加载可复用的网页抓取会话池（整个Action生命周期共享）"""
+        if self._browser_pool is None:
+            self._browser_pool = BrowserPool(
+                size=int(BROWSER_POOL.get("size", 4)),
+                per_domain_limit=int(BROWSER_POOL.get("per_domain_limit", 2)),
+                page_timeout=float(BROWSER_POOL.get("page_timeout", 60.0)),
+            )
+        return self._browser_pool
+
     async def run(
         self, 
         topic: str,
@@ -162,17 +194,10 @@ class ConductComprehensiveResearch(Action):
         # 收集允许引用的来源白名单
         allowed_web_urls: List[str] = []
         try:
-            # 从研究内容中提取浏览过的URL（#### 来源: <url>）
-            if online_research_content:
-                for line in online_research_content.splitlines():
-                    if line.startswith("#### 来源:"):
-                        url = line.split("#### 来源:", 1)[1].strip()
-                        if url.startswith("http"):
-                            allowed_web_urls.append(url)
+            # 从研究内容中提取浏览过的URL（#### 来源: <url>，含近重复镜像来源行），已去重
+            allowed_web_urls = self._extract_source_urls(online_research_content or "")
         except Exception:
             pass
-        # 去重
-        allowed_web_urls = list(dict.fromkeys(allowed_web_urls))
 
         allowed_project_docs: List[str] = []
         try:
@@ -193,19 +218,26 @@ class ConductComprehensiveResearch(Action):
         # 使用统一的可维护简报模板（仅6键）
         prompt_template = GENERATE_RESEARCH_BRIEF_PROMPT
         time_stamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        prompt = (
-            prompt_template
-            .replace("{content}", enhanced_content)
-            .replace("{topic}", topic)
-            .replace("{time_stamp}", time_stamp)
-            .replace("{allowed_web_urls}", json.dumps(allowed_web_urls, ensure_ascii=False))
-            .replace("{allowed_project_docs}", json.dumps(allowed_project_docs, ensure_ascii=False))
-        )
-        # 防止超长输入触发底层提供商长度限制：截断到安全长度
-        safe_prompt = prompt[:MAX_INPUT_TOKENS]
+
+        def render_prompt(content: str) -> str:
+            return (
+                prompt_template
+                .replace("{content}", content)
+                .replace("{topic}", topic)
+                .replace("{time_stamp}", time_stamp)
+                .replace("{allowed_web_urls}", json.dumps(allowed_web_urls, ensure_ascii=False))
+                .replace("{allowed_project_docs}", json.dumps(allowed_project_docs, ensure_ascii=False))
+            )
+
         # 注入项目配置信息作为系统级提示，统一对齐上下文
         project_info_text = get_project_info_text()
-        brief = await self._aask(safe_prompt, [COMPREHENSIVE_RESEARCH_BASE_SYSTEM, project_info_text])
+        system_msgs = [COMPREHENSIVE_RESEARCH_BASE_SYSTEM, project_info_text]
+        # 按 token 预算打包：模板指令与URL白名单完整保留，仅压缩素材正文
+        packed = self._pack_prompt(
+            [PromptSegment("content", enhanced_content)],
+            fixed_texts=[render_prompt("")] + system_msgs,
+        )
+        brief = await self._aask(render_prompt(packed["content"]), system_msgs)
         
         logger.info(f"研究简报正在生成,数分钟后请查阅。")
 
@@ -341,19 +373,20 @@ class ConductComprehensiveResearch(Action):
             
             enhanced_sections = []
             
-            for query in enhancement_queries:
-                logger.info(f"🧠 智能检索增强: {query}")
-                search_result = await intelligent_search.intelligent_search(
-                    query=query,
-                    project_vector_storage_path=vector_store_path,
-                    mode="hybrid",  # 由权重与意图路由决定是否走KG
-                    enable_global=True,
-                    max_results=5
-                )
-                
+            # 各增强查询互相独立：一次批量检索（共用一次查询嵌入请求），结果按查询顺序合并
+            logger.info(f"🧠 智能检索增强: {enhancement_queries}")
+            search_results = await intelligent_search.intelligent_search_many(
+                queries=enhancement_queries,
+                project_vector_storage_path=vector_store_path,
+                mode="hybrid",  # 由权重与意图路由决定是否走KG
+                enable_global=True,
+                max_results=5
+            )
+            
+            for query, search_result in zip(enhancement_queries, search_results):
                 if search_result.get("results"):
                     enhanced_sections.append(f"### 🧠 智能检索: {query}\n")
-                    enhanced_sections.extend(search_result["results"])
+                    enhanced_sections.extend(format_hits(search_result["results"]))
                     enhanced_sections.append("\n")
             
             if enhanced_sections:
@@ -368,30 +401,58 @@ class ConductComprehensiveResearch(Action):
             logger.warning(f"⚠️ 智能检索增强失败: {e}")
             return combined_content
 
+    def _pack_prompt(self, segments: List[PromptSegment], fixed_texts: List[str]) -> Dict[str, str]:
+        """按当前模型的 token 预算打包提示词片段，返回 {片段名: 文本}"""
+        result = pack_prompt_segments(segments, model=self._llm_model_name(), fixed_texts=fixed_texts)
+        if result.compressed or result.dropped:
+            logger.info(f"✂️ 提示词超出token预算，已按优先级打包: {result.summary()}")
+        return result.texts
+
     async def _llm_merge_text(self, field_name: str, old_text: str, new_notes: str) -> str:
-        from backend.config.research_prompts import MERGE_FIELD_PROMPT, MAX_INPUT_TOKENS
-        prompt = MERGE_FIELD_PROMPT.format(field_name=field_name, old_text=old_text or "（无）", new_notes=new_notes or "（无）")
+        from backend.config.research_prompts import MERGE_FIELD_PROMPT
         project_info_text = get_project_info_text()
-        merged = await self._aask(prompt[:MAX_INPUT_TOKENS], [project_info_text])
+        # 旧内容优先保留，新素材超出预算时压缩
+        packed = self._pack_prompt(
+            [PromptSegment("old_text", old_text or "（无）", priority=1),
+             PromptSegment("new_notes", new_notes or "（无）", priority=2)],
+            fixed_texts=[MERGE_FIELD_PROMPT.format(field_name=field_name, old_text="", new_notes=""), project_info_text],
+        )
+        prompt = MERGE_FIELD_PROMPT.format(field_name=field_name, **packed)
+        merged = await self._aask(prompt, [project_info_text])
         return (merged or "").strip()
 
     async def _llm_merge_events(self, old_events: str, new_notes: str) -> str:
-        from backend.config.research_prompts import MERGE_EVENTS_PROMPT, MAX_INPUT_TOKENS
-        prompt = MERGE_EVENTS_PROMPT.format(old_events=old_events or "（无）", new_notes=new_notes or "（无）")
+        from backend.config.research_prompts import MERGE_EVENTS_PROMPT
         project_info_text = get_project_info_text()
-        merged = await self._aask(prompt[:MAX_INPUT_TOKENS], [project_info_text])
+        packed = self._pack_prompt(
+            [PromptSegment("old_events", old_events or "（无）", priority=1),
+             PromptSegment("new_notes", new_notes or "（无）", priority=2)],
+            fixed_texts=[MERGE_EVENTS_PROMPT.format(old_events="", new_notes=""), project_info_text],
+        )
+        prompt = MERGE_EVENTS_PROMPT.format(**packed)
+        merged = await self._aask(prompt, [project_info_text])
         return (merged or "").strip()
 
+    def _select_notes_for_field(self, field_name: str, new_notes: str) -> str:
+        """按字段关键词在本地挑选相关素材片段，减少每次合并发送的上下文"""
+        max_chars = int(BRIEF_MERGE.get("slice_max_chars", 30000))
+        keywords = MERGE_FIELD_KEYWORDS.get(field_name, []) + [field_name]
+        return select_relevant_passages(new_notes or "", keywords, max_chars)
+
     async def _merge_research_brief(self, old_brief: dict, new_notes: str) -> dict:
         fields = ["项目情况", "资金情况", "重要事件", "政策引用", "推荐方法", "可借鉴网络案例"]
-        merged = {}
-        for f in fields:
+        slice_notes = bool(BRIEF_MERGE.get("slice_notes", False))
+
+        async def _merge_field(f: str) -> str:
             old_val = old_brief.get(f, "") if isinstance(old_brief, dict) else ""
+            notes = self._select_notes_for_field(f, new_notes) if slice_notes else new_notes
             if f == "重要事件":
-                merged[f] = await self._llm_merge_events(old_val, new_notes)
-            else:
-                merged[f] = await self._llm_merge_text(f, old_val, new_notes)
-        return merged
+                return await self._llm_merge_events(old_val, notes)
+            return await self._llm_merge_text(f, old_val, notes)
+
+        # 六个字段互相独立：并发合并（LLM 调用频率由共享限流器控制）
+        values = await asyncio.gather(*(_merge_field(f) for f in fields))
+        return dict(zip(fields, values))
     
     async def _conduct_online_research(self, topic: str, decomposition_nums: int, url_per_query: int, project_vector_path: str = "") -> str:
         """执行在线研究"""
@@ -400,12 +461,17 @@ class ConductComprehensiveResearch(Action):
             raise ValueError("搜索引擎未初始化，无法执行在线研究。请检查config/config2.yaml中的search配置")
         
         logger.info("步骤 1: 生成搜索关键词")
-        keywords_prompt = RESEARCH_TOPIC_SYSTEM.format(topic=topic)
         try:
             project_info_text = get_project_info_text()
+            # 主题文本按 token 预算打包（关键词指令完整保留）；打包后的主题设定也用作问题分解的系统提示
+            packed = self._pack_prompt(
+                [PromptSegment("topic", topic)],
+                fixed_texts=[RESEARCH_TOPIC_SYSTEM.format(topic=""), SEARCH_KEYWORDS_PROMPT, project_info_text],
+            )
+            keywords_prompt = RESEARCH_TOPIC_SYSTEM.format(topic=packed["topic"])
             keywords_str = await self._aask(
-                SEARCH_KEYWORDS_PROMPT[:MAX_INPUT_TOKENS],
-                [keywords_prompt[:MAX_INPUT_TOKENS], project_info_text]
+                SEARCH_KEYWORDS_PROMPT,
+                [keywords_prompt, project_info_text]
             )
         except Exception as e:
             # 关键词阶段失败直接中断，避免后续流程质量不可控
@@ -432,18 +498,8 @@ class ConductComprehensiveResearch(Action):
 
         logger.info(f"关键词: {keywords}")
 
-        # 串行搜索关键词，避免并发请求触发频率限制
-        search_results = []
-        for i, kw in enumerate(keywords):
-            try:
-                if i > 0:  # 第一个请求不需要延迟
-                    await asyncio.sleep(2)  # 每个请求间隔2秒
-                result = await self.search_engine.run(kw, as_string=False)
-                search_results.append(result)
-                logger.info(f"成功搜索关键词: {kw}")
-            except Exception as e:
-                logger.error(f"搜索关键词失败 {kw}: {e}")
-                search_results.append([])  # 添加空结果保持索引一致
+        # 有界并发搜索关键词，由令牌桶限流器控制实际请求速率
+        search_results = await self._search_keywords(keywords)
         
         # 🧠 智能检索增强：使用智能检索服务查询项目知识库
         rag_results_str = ""
@@ -462,7 +518,7 @@ class ConductComprehensiveResearch(Action):
                 )
                 
                 if search_result.get("results"):
-                    rag_results_str = "\n\n### 🧠 智能检索相关信息\n" + "\n".join(search_result["results"])
+                    rag_results_str = "\n\n### 🧠 智能检索相关信息\n" + "\n".join(format_hits(search_result["results"]))
                     
                     # 添加智能洞察
                     if search_result.get("insights"):
@@ -488,15 +544,21 @@ class ConductComprehensiveResearch(Action):
             dims = dims_seed[:max(1, decomposition_nums)]
             queries = [f"围绕‘{d}’提出一个与主题‘{topic}’强相关且可检索的具体问题" for d in dims]
         if not queries:
-            decompose_prompt = DECOMPOSE_RESEARCH_PROMPT.format(
-                decomposition_nums=decomposition_nums,
-                url_per_query=url_per_query,
-                search_results=combined_search_results
-            )
             project_info_text = get_project_info_text()
+
+            def render_decompose(results: str) -> str:
+                return DECOMPOSE_RESEARCH_PROMPT.format(
+                    decomposition_nums=decomposition_nums,
+                    url_per_query=url_per_query,
+                    search_results=results
+                )
+            packed = self._pack_prompt(
+                [PromptSegment("search_results", combined_search_results)],
+                fixed_texts=[render_decompose(""), keywords_prompt, project_info_text],
+            )
             queries_str = await self._aask(
-                decompose_prompt[:MAX_INPUT_TOKENS],
-                [keywords_prompt[:MAX_INPUT_TOKENS], project_info_text]
+                render_decompose(packed["search_results"]),
+                [keywords_prompt, project_info_text]
             )
             await asyncio.sleep(1)
             try:
@@ -517,54 +579,158 @@ class ConductComprehensiveResearch(Action):
                 queries = keywords
         logger.info(f"研究问题: {queries}")
 
-        # 串行处理每个问题，避免并发搜索
-        summaries = []
-        for i, q in enumerate(queries):
-            if i > 0:  # 第一个请求不需要延迟
-                await asyncio.sleep(2)  # 每个问题处理间隔2秒，增加延迟
-            summary = await self._search_and_summarize_query(topic, q, url_per_query)
-            summaries.append(summary)
+        # 各问题进入流式阶段图（搜索/LLM 频率由共享限流器控制），结果按问题顺序输出
+        try:
+            return await self._run_question_pipeline(topic, queries, url_per_query)
+        finally:
+            # 研究结束释放浏览器会话（下次抓取时按需重新启动）
+            if self._browser_pool is not None:
+                await self._browser_pool.close()
+
+    async def _search_keywords(self, keywords: List[str]) -> List[list]:
+        """有界并发搜索关键词，结果顺序与关键词一致；单个关键词重试耗尽后返回空结果"""
+        semaphore = asyncio.Semaphore(max(1, int(SEARCH_CONCURRENCY.get("max_concurrency", 4))))
+
+        async def _search_one(kw: str) -> list:
+            async with semaphore:
+                try:
+                    result = await self._rate_limited_search(kw)
+                    logger.info(f"成功搜索关键词: {kw}")
+                    return result
+                except Exception as e:
+                    logger.error(f"搜索关键词失败 {kw}: {e}")
+                    return []  # 空结果保持索引一致
 
-        return "\n\n".join(summaries)
+        return list(await asyncio.gather(*(_search_one(kw) for kw in keywords)))
 
-    async def _search_and_summarize_query(self, topic: str, query: str, url_per_query: int) -> str:
-        """搜索、排序并总结单个问题的URL"""
-        logger.info(f"处理问题: {query}")
-        urls = await self._search_and_rank_urls(topic, query, url_per_query)
-        
-        if not urls:
-            return f"### 问题: {query}\n\n未能找到相关信息。\n"
-
-        # 串行浏览和分析URL，避免并发请求
-        contents = []
-        for i, url in enumerate(urls):
-            if i > 0:  # 第一个请求不需要延迟
-                await asyncio.sleep(1)  # 每个URL处理间隔1秒
-            content = await self._web_browse_and_summarize(url, query)
-            contents.append(content)
-
-        # 过滤掉不相关/空白内容
-        relevant_contents = [c for c in contents if (isinstance(c, str) and c.strip() and "不相关" not in c)]
-        if not relevant_contents:
-            # 回退：至少列出来源URL，避免空报告
-            fallback_blocks = [f"#### 来源: {u}\n无法从该页面提取有效内容。" for u in urls]
-            relevant_contents = fallback_blocks
-        
-        summary = f"### 问题: {query}\n\n" + "\n\n".join(relevant_contents)
-        return summary
+    async def _rate_limited_search(self, query: str, **kwargs) -> list:
+        """经共享令牌桶限流的搜索调用，失败时指数退避重试"""
+        limiter = get_rate_limiter("search")
+
+        async def _call() -> list:
+            await limiter.acquire()
+            return await self.search_engine.run(query, as_string=False, **kwargs)
+
+        def _on_retry(attempt: int, e: BaseException, delay: float) -> None:
+            logger.warning(f"搜索失败，{delay:.1f}s 后第{attempt}次重试 {query}: {e}")
+
+        return await retry_async(
+            _call,
+            retries=int(SEARCH_CONCURRENCY.get("max_retries", 3)),
+            backoff_base=float(SEARCH_CONCURRENCY.get("backoff_base", 1.0)),
+            backoff_max=float(SEARCH_CONCURRENCY.get("backoff_max", 10.0)),
+            on_retry=_on_retry,
+        )
 
-    async def _search_and_rank_urls(self, topic: str, query: str, num_results: int) -> List[str]:
-        """搜索并排序URL"""
+    async def _run_question_pipeline(self, topic: str, queries: List[str], url_per_query: int) -> str:
+        """流式研究阶段图：search → rank → fetch → summarize → index
+        各阶段独立 worker 数并以有界队列相连，先完成搜索的问题无需等待其他问题即可进入抓取与总结"""
+        self._dedup_saved_calls = 0
+        ranked_urls: Dict[int, List[str]] = {}
+        blocks: Dict[int, Dict[int, Tuple[str, str]]] = {i: {} for i in range(len(queries))}
+        mirrors: Dict[int, Dict[str, List[str]]] = {i: {} for i in range(len(queries))}  # 代表页 -> 近重复镜像
+        detectors = {i: self._new_near_dup_detector() for i in range(len(queries))}
+
+        async def search(item):
+            q_idx, query = item
+            logger.info(f"处理问题: {query}")
+            return [(q_idx, query, await self._search_query_results(query, url_per_query))]
+
+        async def rank(item):
+            q_idx, query, results = item
+            urls = await self._rank_urls(topic, query, results, url_per_query)
+            ranked_urls[q_idx] = urls
+            return [(q_idx, query, r, url) for r, url in enumerate(urls)]
+
+        async def fetch(item):
+            q_idx, query, r, url = item
+            page = await self._fetch_page_or_none(url)
+            # 同一问题内与已抓取页面近重复时，标记代表页（先到达者）并跳过总结
+            detector = detectors[q_idx]
+            dup_of = detector.find_or_add(url, page) if (detector is not None and page) else None
+            return [(q_idx, query, r, url, page, dup_of)]
+
+        async def summarize(item):
+            q_idx, query, r, url, page, dup_of = item
+            if dup_of:
+                self._dedup_saved_calls += 1
+                # 镜像不单独成块：代表页的摘要确定后再决定附在其来源行上还是一并丢弃
+                return [(q_idx, r, url, None, dup_of)]
+            return [(q_idx, r, url, await self._summarize_page(url, query, page), None)]
+
+        async def index(item):
+            q_idx, r, url, block, dup_of = item
+            if dup_of:
+                mirrors[q_idx].setdefault(dup_of, []).append(url)
+            else:
+                blocks[q_idx][r] = (url, block)
+            return None
+
+        workers = RESEARCH_PIPELINE.get("workers", {})
+        queue_size = int(RESEARCH_PIPELINE.get("queue_size", 8))
+        pipeline = StagePipeline([
+            Stage(name, handler, workers=int(workers.get(name, 1)), queue_size=queue_size)
+            for name, handler in (("search", search), ("rank", rank), ("fetch", fetch),
+                                  ("summarize", summarize), ("index", index))
+        ], name="research")
+        await pipeline.run(enumerate(queries))
+        self._pipeline_metrics = pipeline.metrics()
+        logger.info(f"📈 研究流水线各阶段指标:\n{pipeline.format_metrics()}")
+        if self._dedup_saved_calls:
+            logger.info(f"🧹 近重复网页去除共节省 {self._dedup_saved_calls} 次LLM总结调用")
+
+        summaries = []
+        for q_idx, query in enumerate(queries):
+            urls = ranked_urls.get(q_idx) or []
+            if not urls:
+                summaries.append(f"### 问题: {query}\n\n未能找到相关信息。\n")
+                continue
+            contents = [blocks[q_idx][r] for r in sorted(blocks[q_idx])]
+            # 过滤掉不相关/空白内容；镜像来源附在保留下来的代表页来源行上，代表页被过滤或失败时一并丢弃
+            relevant_contents = [
+                self._attach_mirrors(c, url, mirrors[q_idx].get(url))
+                for url, c in contents if (isinstance(c, str) and c.strip() and "不相关" not in c)
+            ]
+            if not relevant_contents:
+                # 回退：至少列出来源URL，避免空报告
+                relevant_contents = [f"#### 来源: {u}\n无法从该页面提取有效内容。" for u in urls]
+            summaries.append(f"### 问题: {query}\n\n" + "\n\n".join(relevant_contents))
+        return "\n\n".join(summaries)
+
+    @staticmethod
+    def _attach_mirrors(block: str, url: str, mirror_urls: Optional[List[str]]) -> str:
+        """在代表页块末尾为每个近重复镜像追加独立的来源行（摘要失败的代表页不附带镜像）"""
+        if not mirror_urls or block.rstrip().endswith(PAGE_FAILED_TEXT):
+            return block
+        lines = [f"{SOURCE_LINE_PREFIX} {mirror}（镜像，内容同 {url}）" for mirror in mirror_urls]
+        return block.rstrip() + "\n" + "\n".join(lines)
+
+    @staticmethod
+    def _extract_source_urls(content: str) -> List[str]:
+        """提取研究内容中来源行的URL（按出现顺序去重），来源行后的说明文字不计入URL"""
+        urls = []
+        for line in content.splitlines():
+            if line.startswith(SOURCE_LINE_PREFIX):
+                match = _SOURCE_URL_PATTERN.search(line[len(SOURCE_LINE_PREFIX):])
+                if match:
+                    urls.append(match.group(0))
+        return list(dict.fromkeys(urls))
+
+    async def _search_query_results(self, query: str, num_results: int) -> list:
+        """搜索单个研究问题的候选结果（数量为目标URL数的两倍，供排序筛选）"""
         max_results = max(num_results * 2, 6)
         try:
-            results = await self.search_engine.run(query, max_results=max_results, as_string=False)
+            results = await self._rate_limited_search(query, max_results=max_results)
             if not results:
                 logger.error(f"❌ 搜索引擎未返回任何结果: {query}")
                 raise ValueError(f"搜索引擎对查询'{query}'未返回任何结果，可能是网络问题或API配置错误")
         except Exception as e:
             logger.error(f"❌ 搜索失败 {query}: {e}")
             raise e  # 直接抛出异常，不隐藏
-    
+        return results
+
+    async def _rank_urls(self, topic: str, query: str, results: list, num_results: int) -> List[str]:
+        """LLM 按相关性与域名白名单排序搜索结果，返回最终URL"""
         # 以机器可读JSON形式提供候选，便于LLM进行域名白名单筛选
         candidates = []
         for i, res in enumerate(results):
@@ -576,18 +742,25 @@ class ConductComprehensiveResearch(Action):
                 "domain": (parsed.netloc if parsed else ""),
                 "title": res.get("title", ""),
             })
-        _results_str = json.dumps(candidates, ensure_ascii=False)
         time_stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # 注入项目配置信息作为系统级提示
+        project_info_text = get_project_info_text()
+        # 候选按 token 预算打包：每行一个候选，超出预算时只保留完整的行，JSON 仍然有效
+        lines = [json.dumps(c, ensure_ascii=False) for c in candidates]
+        packed = self._pack_prompt(
+            [PromptSegment("results", "\n".join(lines))],
+            fixed_texts=[
+                RANK_URLS_PROMPT.format(topic=topic, query=query, results="", time_stamp=time_stamp),
+                project_info_text,
+            ],
+        )
+        kept = set(packed["results"].splitlines())
+        _results_str = "[" + ",\n".join(line for line in lines if line in kept) + "]"
         prompt = RANK_URLS_PROMPT.format(topic=topic, query=query, results=_results_str, time_stamp=time_stamp)
         
         logger.debug(f"URL排序提示词: {prompt}")  # 添加调试日志
         
-        # 注入项目配置信息作为系统级提示
-        project_info_text = get_project_info_text()
-        indices_str = await self._aask(prompt[:MAX_INPUT_TOKENS], [project_info_text])
-        
-        # 添加LLM调用后的延迟，避免频率限制
-        await asyncio.sleep(0.5)
+        indices_str = await self._aask(prompt, [project_info_text])
         
         logger.debug(f"LLM返回的排序结果: {indices_str}")  # 添加调试日志
         
@@ -628,17 +801,56 @@ class ConductComprehensiveResearch(Action):
         
         return final_urls
 
+    async def _fetch_page_text(self, url: str) -> str:
+        """抓取页面正文：优先走本地网页缓存（新鲜命中零请求，过期仅一次条件请求）"""
+        async def _fetch(u: str) -> Tuple[str, Dict[str, str]]:
+            # 验证器取自抓取响应头，首次抓取即可记录，过期后只需一次条件请求
+            page = await self._get_browser_pool().fetch(u)
+            text = getattr(page, "inner_text", None) or str(page or "")
+            return text, dict(getattr(page, "validators", None) or {})
+
+        page_cache = get_page_cache()
+        if page_cache is None:
+            return (await _fetch(url))[0]
+        return await page_cache.get_or_fetch(url, _fetch, slot=self._get_browser_pool().domain_slot)
+
+    async def _fetch_page_or_none(self, url: str) -> Optional[str]:
+        """抓取页面正文，失败返回 None（由总结阶段输出失败说明）"""
+        try:
+            return await self._fetch_page_text(url)
+        except Exception as e:
+            logger.error(f"浏览URL失败 {url}: {e}")
+            return None
+
+    def _new_near_dup_detector(self) -> Optional[NearDuplicateDetector]:
+        """每个研究问题一个近重复检测器（未启用时返回 None）"""
+        if not NEAR_DUP.get("enabled", True):
+            return None
+        return NearDuplicateDetector(
+            hamming_threshold=int(NEAR_DUP.get("hamming_threshold", 3)),
+            shingle_size=int(NEAR_DUP.get("shingle_size", 4)),
+            min_chars=int(NEAR_DUP.get("min_chars", 200)),
+            containment_threshold=float(NEAR_DUP.get("containment_threshold", 0.9)),
+            min_size_ratio=float(NEAR_DUP.get("min_size_ratio", 0.5)),
+        )
+
     async def _web_browse_and_summarize(self, url: str, query: str) -> str:
         """浏览网页并总结内容"""
+        return await self._summarize_page(url, query, await self._fetch_page_or_none(url))
+
+    async def _summarize_page(self, url: str, query: str, content: Optional[str]) -> str:
+        """总结已抓取的网页正文（content 为 None 表示抓取失败）"""
+        if content is None:
+            return f"#### 来源: {url}\n\n{PAGE_FAILED_TEXT}"
         try:
-            content = await WebBrowserEngine().run(url)
-            prompt = WEB_CONTENT_ANALYSIS_PROMPT.format(content=content, query=query)
             # 注入项目配置信息作为系统级提示
             project_info_text = get_project_info_text()
-            summary = await self._aask(prompt[:MAX_INPUT_TOKENS], [project_info_text])
-            
-            # 添加LLM调用后的延迟，避免频率限制
-            await asyncio.sleep(1)
+            packed = self._pack_prompt(
+                [PromptSegment("content", content or "")],
+                fixed_texts=[WEB_CONTENT_ANALYSIS_PROMPT.format(content="", query=query), project_info_text],
+            )
+            prompt = WEB_CONTENT_ANALYSIS_PROMPT.format(content=packed["content"], query=query)
+            summary = await self._aask(prompt, [project_info_text])
             # 若LLM返回空白，则使用兜底：输出原文片段或失败提示，避免空块
             safe_summary = (summary or "").strip()
             if not safe_summary:
@@ -651,5 +863,5 @@ class ConductComprehensiveResearch(Action):
                     safe_summary = "无法访问或页面无可用内容。"
             return f"#### 来源: {url}\n{safe_summary}"
         except Exception as e:
-            logger.error(f"浏览URL失败 {url}: {e}")
-            return f"#### 来源: {url}\n\n无法访问或处理此页面。"
\ No newline at end of file
+            logger.error(f"总结URL失败 {url}: {e}")
+            return f"#### 来源: {url}\n\n{PAGE_FAILED_TEXT}"
\ No newline at end of file
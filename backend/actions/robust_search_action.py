@@ -6,9 +6,10 @@ import json
 from metagpt.actions.search_enhanced_qa import SearchEnhancedQA
 from metagpt.logs import logger
 from metagpt.utils.common import CodeParser
+from backend.tools.llm_cache import CachedAskMixin
 
 
-class RobustSearchEnhancedQA(SearchEnhancedQA):
+class RobustSearchEnhancedQA(CachedAskMixin, SearchEnhancedQA):
     """
     一个更健壮的搜索Action，专门处理LLM返回非标准JSON的情况。
     继承自SearchEnhancedQA，只重写容易出错的查询重写部分。
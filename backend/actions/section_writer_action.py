@@ -11,12 +11,14 @@ from backend.config.writer_prompts import (
 )
 from backend.tools.project_info import get_project_info_text
 from backend.tools.json_utils import extract_json_from_llm_response
+from backend.tools.llm_cache import CachedAskMixin
+from backend.tools.prompt_packer import PromptSegment, pack_prompt_segments
 import json
 from .project_manager_action import Task
 import re
 
 
-class WriteSection(Action):
+class WriteSection(CachedAskMixin, Action):
     """
     写作章节Action - WriterExpert的核心能力
     仅基于研究简报与网络案例摘录生成章节内容（禁用RAG，不注入指标）。
@@ -166,14 +168,23 @@ class WriteSection(Action):
         return "\n\n---\n\n".join(snippets[:5])  # 截取最多5段，避免上下文过长
     
     def _build_writing_prompt(self, task: Task, factual_basis: str) -> str:
-        """构建写作prompt（不包含指标引用）"""
-        prompt = SECTION_WRITING_PROMPT.format(
-            section_title=task.section_title,
-            instruction=task.instruction,
-            factual_basis=factual_basis,
-            word_limit="2000"
+        """构建写作prompt（不包含指标引用）；事实依据按 token 预算打包，写作指导完整保留"""
+        def render_prompt(basis: str) -> str:
+            return SECTION_WRITING_PROMPT.format(
+                section_title=task.section_title,
+                instruction=task.instruction,
+                factual_basis=basis,
+                word_limit="2000"
+            )
+
+        packed = pack_prompt_segments(
+            [PromptSegment("factual_basis", factual_basis)],
+            model=self._llm_model_name(),
+            fixed_texts=[render_prompt(""), WRITER_BASE_SYSTEM, get_project_info_text()],
         )
-        return prompt
+        if packed.compressed or packed.dropped:
+            logger.info(f"✂️ 事实依据超出token预算，已压缩: {packed.summary()}")
+        return render_prompt(packed.texts["factual_basis"])
     
     async def _generate_content(self, prompt: str) -> str:
         """生成章节内容"""
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+性能与并发相关常量（限流、并发度、重试），供 actions/services/tools 统一读取
+"""
+
+# 按提供商划分的令牌桶限流配置：rate_per_second=稳态速率，burst=突发容量
+# 请按各提供商的真实配额调整（如阿里云 OpenSearch web 搜索 QPS）
+RATE_LIMITS = {
+    "search": {"rate_per_second": 2.0, "burst": 4},
+    "llm": {"rate_per_second": 4.0, "burst": 8},
+    "embedding": {"rate_per_second": 8.0, "burst": 8},
+}
+
+# 关键词搜索阶段：有界并发 + 单关键词重试退避
+SEARCH_CONCURRENCY = {
+    "max_concurrency": 4,   # 同时在途的搜索请求上限
+    "max_retries": 3,       # 单个关键词失败后的重试次数
+    "backoff_base": 1.0,    # 指数退避基数（秒）：1, 2, 4 ...
+    "backoff_max": 10.0,    # 单次退避上限（秒）
+}
+
+# 网页抓取会话池：一个常驻浏览器 + 复用的浏览器上下文 + 按域名并发上限（未安装 playwright 时退化为 WebBrowserEngine）
+BROWSER_POOL = {
+    "size": 4,               # 常驻的浏览器上下文数（全局抓取并发上限）
+    "per_domain_limit": 2,   # 单个域名同时抓取的页面数上限
+    "page_timeout": 60.0,    # 单页抓取超时（秒）
+}
+
+# 搜索结果磁盘缓存：键为 (engine, query, max_results)，重复运行同一项目时免去重复搜索
+SEARCH_CACHE = {
+    "enabled": True,
+    "path": "workspace/.cache/search_cache.sqlite3",
+    "ttl_seconds": 86400,    # 缓存有效期（秒），默认1天
+    "bypass": False,         # True 时跳过读取、强制刷新（仍写入新结果）
+}
+
+# 网页正文缓存：URL + 内容哈希寻址，过期后以 ETag/Last-Modified 条件请求校验
+PAGE_CACHE = {
+    "enabled": True,
+    "path": "workspace/.cache/page_cache.sqlite3",
+    "fresh_seconds": 21600,  # 新鲜期（秒）内直接命中，不发任何请求
+    "revalidate": True,      # 过期后先发条件请求校验，未变化则复用
+    "request_timeout": 10.0, # 条件请求超时（秒）
+}
+
+# LLM 响应缓存：off / read_through / record_only / replay（严格回放，未命中即报错）
+# 运行时可用环境变量 AUTOWRITER_LLM_CACHE_MODE 覆盖 mode
+LLM_CACHE = {
+    "mode": "off",
+    "path": "workspace/.cache/llm_cache.sqlite3",
+}
+
+# 研究简报字段合并：六个字段并发合并（受共享 'llm' 限流器约束）
+BRIEF_MERGE = {
+    "slice_notes": False,        # True 时每个字段只发送与其相关的素材片段（本地关键词相关度筛选）
+    "slice_max_chars": 30000,    # 每个字段素材片段的字符上限
+}
+
+# 提示词 token 预算（按模型）：取代按字符截断，必保段（指令/白名单）完整保留，低优先级大段内容先压缩
+PROMPT_TOKEN_BUDGETS = {
+    "default": 100000,
+    "qwen-plus-latest": 120000,
+    "qwen-max-latest": 28000,
+    "qwen-turbo-latest": 120000,
+}
+
+# 网页近重复去除：抓取后、总结前按 SimHash 合并镜像页面，仅代表页调用 LLM 总结，镜像URL仍保留为来源
+NEAR_DUP = {
+    "enabled": True,
+    "hamming_threshold": 3,  # 64 位指纹汉明距离阈值（≤ 即视为近重复）
+    "shingle_size": 4,       # 字符 n-gram 长度
+    "min_chars": 200,        # 正文过短（错误页/空页）不参与合并
+    "containment_threshold": 0.9,  # n-gram 包含度阈值（转载页多出导航/版权外壳时仍可识别）
+    "min_size_ratio": 0.5,   # 两页 n-gram 数之比低于该值时不比包含度（防止只有外壳的短页吞掉共享外壳的长文）
+}
+
+# 研究流水线：search → rank → fetch → summarize → index，阶段间以有界队列相连（队列满时上游等待）
+RESEARCH_PIPELINE = {
+    "queue_size": 8,
+    "workers": {
+        "search": 2,
+        "rank": 2,
+        "fetch": 4,      # 建议与 BROWSER_POOL.size 一致
+        "summarize": 4,
+        "index": 1,
+    },
+}
+
+# 切块嵌入缓存：键为 (模型, 维度, 切块文本哈希)，项目/xsearch/全局索引构建共用，仅对新切块调用嵌入 API
+EMBEDDING_CACHE = {
+    "enabled": True,
+    "dir": "workspace/.cache/embeddings",  # sqlite 行号索引 + float32 向量矩阵文件（内存映射读取）
+}
+
+# 项目检索索引缓存：按估算内存（映射的向量文件大小 + 固定开销）限额的 LRU/TTL，淘汰后下次访问从磁盘重新加载
+ENGINE_CACHE = {
+    "max_bytes": 512 * 1024 * 1024,   # 全部缓存索引的估算内存上限
+    "max_entries": 32,
+    "ttl_seconds": 3600,              # 超过该时长未访问即过期；None 表示不过期
+    "engine_overhead_bytes": 8 * 1024 * 1024,  # 每个索引的固定开销估算（嵌入客户端、sqlite 连接、墓碑掩码等）
+}
+
+# 嵌入执行器：切块按提供商单次条数/token 上限分批，多批并发（受 'embedding' 限流器约束）；
+# 400 参数错误只拆分该批重试，并把被拒批次的规模记为后续分批的上限
+EMBEDDING_EXECUTOR = {
+    "max_items_per_request": 10,      # DashScope text-embedding-v3 单次最多 10 条
+    "max_tokens_per_item": 8192,      # 单条文本 token 上限（超出部分截断）
+    "max_tokens_per_request": 32000,  # 单次请求总 token 上限（保守值）
+    "concurrency": 4,                 # 同时在途的嵌入请求数
+    "max_retries": 3,                 # 限流/网络等临时错误的重试次数（400 不重试）
+    "backoff_base": 1.0,
+    "backoff_max": 10.0,
+}
+
+# 项目检索词法通道：原生索引文档库内的 BM25 倒排索引（FTS5）与向量结果做倒数排名融合（RRF）
+LEXICAL_SEARCH = {
+    "enabled": True,
+    "identifier_fast_path": True,  # 纯编号查询（文号/指标编号）词法命中即返回，不发嵌入请求
+    "rrf_k": 60,                   # RRF 平滑常数：score = Σ w / (k + rank)
+    "candidate_multiplier": 2,     # 每个通道取 top_k × 倍数 的候选参与融合
+    "lexical_weight": 1.0,
+    "vector_weight": 1.0,
+}
+
+# 全局知识库近似最近邻索引：flat 为精确暴力检索；hnsw（需 faiss）/ ivfpq（numpy 实现）构建时训练，参数随索引持久化；
+# pq / fp16 为压缩向量穷举扫描（常驻内存约为 float32 的 m/(4·维度) / 一半）
+# 近似检索只产生候选，最终距离用内存映射的 float32 向量精确重排；参数选择见 benchmarks/bench_ann_index.py、bench_compressed_vectors.py
+ANN_INDEX = {
+    "type": "flat",              # flat | hnsw | ivfpq | pq | fp16
+    "min_vectors": 50000,        # 切块数低于该值时仍用精确检索（暴力矩阵检索已足够快）
+    "rescore_factor": 4,         # 近似候选数 = top_k × 倍数
+    "train_sample": 65536,       # 训练抽样行数
+    "search_breadth": None,      # 查询时覆盖持久化的检索宽度（hnsw 的 efSearch / ivfpq 的 nprobe），None 用构建时的值
+    "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 0, "m": 64, "nprobe": 16, "kmeans_iters": 20},  # nlist=0 时取 4·√n；m 为子空间数（需整除维度）
+    "pq": {"m": 128, "kmeans_iters": 20},
+    "fp16": {},
+}
+
+# 全局知识库分类分片（laws / standards / templates / general 各自一个索引，独立构建与版本戳）
+# 查询命中某意图的关键词（intent_keywords）时只检索该意图对应的分片（intent_categories）；
+# 未命中意图、意图未配置或对应分片未构建时检索全部分片
+GLOBAL_SHARDS = {
+    "intent_keywords": {
+        "policy": ["政策", "法规", "法律", "条例", "办法", "规定", "文件精神"],
+        "metric": ["指标", "评分", "权重", "分值", "得分"],
+        "method": ["方法", "流程", "步骤", "评价方式", "如何"],
+        "case": ["案例", "经验", "范例", "实践"],
+    },
+    "intent_categories": {
+        "policy": ["laws"],
+        "metric": ["standards", "templates"],
+        "method": ["standards", "general"],
+        "case": ["general", "templates"],
+    },
+    "max_concurrency": 4,  # 同时检索的分片数
+}
+
+# 多项目联邦检索：查询扇出到多个项目索引，索引经 ENGINE_CACHE 按需加载与淘汰
+FEDERATED_SEARCH = {
+    "max_concurrency": 4,   # 同时检索（及加载）的项目数，限制峰值内存与嵌入/磁盘压力
+    "build_missing": False, # 未建索引的项目是否在检索时现场构建（默认跳过）
+}
+
+# 项目索引压缩向量：常驻多个项目索引时以 pq / fp16 压缩副本做首轮扫描，候选再用 float32 向量精确重排
+# 每次增量同步后，若压缩副本缺失、类型不符或构建后追加的行超过 rebuild_ratio 则重建
+PROJECT_VECTOR_COMPRESSION = {
+    "type": "flat",            # flat（不压缩）| fp16 | pq
+    "min_vectors": 2000,       # 切块数低于该值时不压缩（暴力检索常驻内存本就很小）
+    "rescore_factor": 8,       # 重排候选数 = top_k × 倍数
+    "rebuild_ratio": 0.2,
+    "pq": {"m": 128, "kmeans_iters": 10},
+    "fp16": {},
+}
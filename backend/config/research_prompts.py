@@ -138,8 +138,15 @@ EVIDENCE_KEYWORD_MAPPING = {
     "实施效果数据": {"keywords": ["效果", "成果", "成效", "数据", "统计"]},
 }
 
-# LLM输入长度限制
-MAX_INPUT_TOKENS = 120000
+# 简报字段 -> 相关度关键词（按字段切分新素材时使用，见 performance_config.BRIEF_MERGE）
+MERGE_FIELD_KEYWORDS = {
+    "项目情况": ["项目", "建设", "实施", "内容", "规模", "目标", "单位", "地点", "工程"],
+    "资金情况": ["资金", "预算", "金额", "万元", "拨付", "支付", "支出", "结算", "决算", "审核"],
+    "重要事件": ["年", "月", "日", "立项", "招标", "合同", "开工", "竣工", "验收", "支付", "批复"],
+    "政策引用": ["政策", "办法", "通知", "条例", "意见", "规定", "文号", "〔", "号"],
+    "推荐方法": ["方法", "指标", "评价", "模型", "流程", "标准", "权重", "计分", "评分"],
+    "可借鉴网络案例": ["来源", "案例", "经验", "做法", "成效", "http"],
+}
 
 # 合并简报（可维护）提示词
 MERGE_FIELD_PROMPT = (
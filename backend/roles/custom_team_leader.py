@@ -6,8 +6,8 @@ from metagpt.roles.di.team_leader import TeamLeader
 from backend.actions.robust_search_action import RobustSearchEnhancedQA
 from metagpt.actions.research import CollectLinks
 from metagpt.config2 import config
-from metagpt.tools.search_engine import SearchEngine
 from metagpt.tools import SearchEngineType
+from backend.tools.search_cache import CachedSearchEngine
 from metagpt.schema import Message, AIMessage
 from metagpt.logs import logger
 from typing import Tuple
@@ -26,8 +26,8 @@ class CustomTeamLeader(TeamLeader):
         search_config = config.search
         search_kwargs = search_config.model_dump() if hasattr(search_config, 'model_dump') else {}
         
-        # 创建搜索引擎实例
-        self.search_engine = SearchEngine(
+        # 创建搜索引擎实例（带磁盘缓存，配置见 performance_config.SEARCH_CACHE）
+        self.search_engine = CachedSearchEngine(
             engine=SearchEngineType.ALIBABA,
             **search_kwargs
         )
@@ -8,8 +8,8 @@ from metagpt.roles import Role
 from metagpt.schema import Message
 from metagpt.logs import logger
 from metagpt.config2 import config
-from metagpt.tools.search_engine import SearchEngine
 from metagpt.tools import SearchEngineType
+from backend.tools.search_cache import CachedSearchEngine
 from pathlib import Path
 
 
@@ -30,8 +30,8 @@ class ProductManager(Role):
         search_config = config.search
         search_kwargs = search_config.model_dump() if hasattr(search_config, 'model_dump') else {}
         
-        # 创建搜索引擎实例
-        self.search_engine = SearchEngine(
+        # 创建搜索引擎实例（带磁盘缓存，配置见 performance_config.SEARCH_CACHE）
+        self.search_engine = CachedSearchEngine(
             engine=SearchEngineType.ALIBABA,
             **search_kwargs
         )
@@ -107,6 +107,8 @@ class ProductManager(Role):
             instruct_content=rd_json
         )
         
+        if self.search_engine.cache is not None:
+            logger.info(f"🔎 搜索缓存统计: {self.search_engine.cache.stats()}")
         logger.info(f"✅ ProductManager完成所有研究工作。")
         logger.info(f"📄 研究简报长度: {len(research_data.brief)} 字符")
         logger.info(f"📁 向量存储路径: {research_data.vector_store_path}")
@@ -0,0 +1,494 @@
+"""
+全局知识库服务
+法规、标准、模板与历史报告等跨项目共享的文档（由 ragall.py 导入），按分类（laws / standards / templates / general）
+分片存储：每个分类一个原生向量索引，带独立的构建戳（版本号、构建时间、文档签名），重建某一分类不触及其他分片。
+检索按查询意图只打开并检索对应分片（如 policy → laws），多分片并发检索后按分数合并 top-k；
+编号类查询（文号/指标编号）由分片的 BM25 词法通道直接回答，不发嵌入请求；
+语料规模较大的分片按 ANN_INDEX 配置在构建时训练近似最近邻索引（hnsw / ivfpq）；
+打开分片时读取文档旁车元数据（.meta.json），检索可按领域标签/年份/分类预过滤候选切块；
+分片由其他嵌入模型/维度构建时（切换嵌入后端后）构建与检索前都会按当前模型重建，不混用不可比的向量
+"""
+
+import asyncio
+import hashlib
+import json
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from metagpt.logs import logger
+from metagpt.config2 import Config
+
+from backend.config.performance_config import ANN_INDEX, GLOBAL_SHARDS, LEXICAL_SEARCH
+from backend.tools.embeddings import create_embed_model, embed_queries
+from backend.tools.index_manifest import file_content_hash
+from backend.tools.lexical_index import is_identifier_query
+from backend.tools.metadata_filter import SIDECAR_SUFFIX, FilterSpec, MetadataFilter, MetadataIndex, sidecar_path
+from backend.tools.native_index import META_FILENAME, NativeVectorIndex, embed_nodes, load_file_nodes, to_indexed_nodes
+from backend.tools.search_hit import SearchHit, dedupe_hits, distance_to_score, hit_from_node
+
+EMBED_DIMENSIONS = 1024  # text-embedding-v3 向量维度
+GLOBAL_CATEGORIES = ("laws", "standards", "templates", "general")
+SHARD_STAMP_FILENAME = "shard.json"
+
+
+class GlobalShard:
+    """一个分类分片：documents/<category>/ 的文档 -> shards/<category>/ 的索引与构建戳"""
+
+    def __init__(self, category: str, documents_dir: Path, index_dir: Path):
+        self.category = category
+        self.documents_dir = documents_dir
+        self.index_dir = index_dir
+        self._index: Optional[NativeVectorIndex] = None
+        self._metadata: Optional[MetadataIndex] = None
+        self._lock = threading.Lock()
+        # 索引租约：id(index) -> 在途检索数；关闭时仍被持有的索引登记为待关闭
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, NativeVectorIndex] = {}
+
+    def documents(self) -> List[Path]:
+        if not self.documents_dir.exists():
+            return []
+        return sorted(
+            p for p in self.documents_dir.iterdir() if p.is_file() and not p.name.endswith(SIDECAR_SUFFIX)
+        )
+
+    @staticmethod
+    def signature(files: Sequence[Path]) -> str:
+        """文档集合签名（文件名 + 内容哈希）：未变化的分片无需重建"""
+        h = hashlib.sha256()
+        for path in files:
+            h.update(f"{path.name}\0{file_content_hash(path)}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def stamp(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.index_dir / SHARD_STAMP_FILENAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def exists(self) -> bool:
+        return NativeVectorIndex.exists(self.index_dir)
+
+    def built_with(self) -> Tuple[Optional[str], Optional[int]]:
+        """构建分片所用的 (嵌入模型, 向量维度)，取自索引元数据"""
+        try:
+            meta = json.loads((self.index_dir / META_FILENAME).read_text(encoding="utf-8"))
+            return meta.get("model"), int(meta["dims"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, None
+
+    def open(self) -> Optional[Tuple[NativeVectorIndex, MetadataIndex]]:
+        """按需打开分片索引并建立元数据索引（旁车缺少分类时以分片分类补齐），返回在锁内取得的 (索引, 元数据索引)"""
+        with self._lock:
+            return self._open_locked()
+
+    def _open_locked(self) -> Optional[Tuple[NativeVectorIndex, MetadataIndex]]:
+        if self._index is None and self.exists():
+            index = NativeVectorIndex(self.index_dir)
+            files = self.documents()
+            self._metadata = MetadataIndex.build(index, files, {p: {"category": self.category} for p in files})
+            self._index = index
+            logger.info(
+                f"📖 加载全局知识库分片 {self.category}: {len(index)} 个切块 ({index.ann_info()['type']})，"
+                f"版本 {self.stamp().get('version', '?')}"
+            )
+        if self._index is None:
+            return None
+        return self._index, self._metadata
+
+    @contextmanager
+    def _lease(self) -> Iterator[Optional[Tuple[NativeVectorIndex, MetadataIndex]]]:
+        """打开分片并持有租约：检索期间分片被关闭（重建替换）时，旧索引延后到最后一个租约归还后关闭"""
+        with self._lock:
+            opened = self._open_locked()
+            if opened is not None:
+                self._leases[id(opened[0])] = self._leases.get(id(opened[0]), 0) + 1
+        try:
+            yield opened
+        finally:
+            if opened is not None:
+                self._release(opened[0])
+
+    def _release(self, index: NativeVectorIndex) -> None:
+        with self._lock:
+            remaining = self._leases.get(id(index), 0) - 1
+            if remaining > 0:
+                self._leases[id(index)] = remaining
+                return
+            self._leases.pop(id(index), None)
+            retired = self._retired.pop(id(index), None)
+        if retired is not None:
+            retired.close()
+
+    def close(self) -> None:
+        """移出当前索引；无在途检索时立即关闭（sqlite 连接与内存映射），否则等租约归还后关闭"""
+        with self._lock:
+            index, self._index, self._metadata = self._index, None, None
+            if index is None:
+                return
+            if self._leases.get(id(index)):
+                self._retired[id(index)] = index
+                return
+        index.close()
+
+    def lexical(self, queries: List[str], top_k: int, spec: Optional[MetadataFilter]) -> List[List[SearchHit]]:
+        """（工作线程）BM25 词法检索本分片（编号类查询直达，无需嵌入），分数为 bm25 取负"""
+        with self._lease() as opened:
+            if opened is None or not opened[0].lexical_enabled:
+                return [[] for _ in queries]
+            index, metadata = opened
+            rows = metadata.rows(spec)
+            if rows is not None and not len(rows):
+                return [[] for _ in queries]
+            return [
+                [replace(hit_from_node(node, -bm25, "global"), lexical_score=-bm25) for node, bm25 in per_query if node.text]
+                for per_query in index.lexical_query(queries, top_k, rows)
+            ]
+
+    def query(self, embeddings: List[List[float]], top_k: int, spec: Optional[MetadataFilter]) -> List[List[SearchHit]]:
+        """（工作线程）检索本分片，返回每个查询的命中列表"""
+        with self._lease() as opened:
+            if opened is None:
+                return [[] for _ in embeddings]
+            index, metadata = opened
+            rows = metadata.rows(spec)
+            if rows is not None and not len(rows):
+                return [[] for _ in embeddings]
+            hits = index.query(embeddings, top_k, breadth=ANN_INDEX.get("search_breadth"), rows=rows)
+            return [
+                [hit_from_node(node, distance_to_score(dist, index.metric), "global") for node, dist in per_query if node.text]
+                for per_query in hits
+            ]
+
+
+class GlobalKnowledgeService:
+    """全局知识库：documents/<category>/ 存放文档，shards/<category>/ 存放该分类的原生向量索引"""
+
+    def __init__(self, storage_root: str = "workspace/vector_storage/global_knowledge"):
+        self.storage_root = Path(storage_root)
+        self.documents_dir = self.storage_root / "documents"
+        self.shards_dir = self.storage_root / "shards"
+        self.shards: Dict[str, GlobalShard] = {
+            category: GlobalShard(category, self.documents_dir / category, self.shards_dir / category)
+            for category in GLOBAL_CATEGORIES
+        }
+        self._config = None
+        self._embed_model = None
+        self._rebuild_lock: Optional[asyncio.Lock] = None
+        self._rebuild_lock_loop = None
+
+    def _get_config(self) -> Config:
+        """获取配置"""
+        if self._config is None:
+            self._config = Config.from_yaml_file(Path('config/config2.yaml'))
+        return self._config
+
+    def _create_embed_model(self):
+        """与项目知识库相同的嵌入模型（共用切块嵌入缓存）"""
+        embed_config = self._get_config().embedding
+        return create_embed_model(
+            model_name=embed_config.model,
+            api_key=embed_config.api_key,
+            dimensions=self._embed_dimensions(),
+        )
+
+    def _embed_dimensions(self) -> int:
+        return getattr(self._get_config().embedding, "dimensions", None) or EMBED_DIMENSIONS
+
+    def _query_embed_model(self):
+        if self._embed_model is None:
+            self._embed_model = self._create_embed_model()
+        return self._embed_model
+
+    # ========== 文档管理 ==========
+
+    def add_global_document(self, file_path: str, category: str = "general") -> bool:
+        """复制文档（及其 .meta.json 旁车元数据）到全局知识库的分类目录"""
+        try:
+            source = Path(file_path)
+            category = category if category in GLOBAL_CATEGORIES else "general"
+            target_dir = self.documents_dir / category
+            target_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target_dir / source.name)
+            sidecar = sidecar_path(source)
+            if sidecar.exists():
+                shutil.copy2(sidecar, target_dir / sidecar.name)
+            return True
+        except Exception as e:
+            logger.error(f"❌ 添加全局文档失败 {file_path}: {e}")
+            return False
+
+    def _collect_documents(self) -> List[Path]:
+        return [path for shard in self.shards.values() for path in shard.documents()]
+
+    # ========== 索引 ==========
+
+    async def build_global_index(
+        self,
+        force_rebuild: bool = False,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        categories: Optional[Sequence[str]] = None,
+    ) -> bool:
+        """构建全局知识库分片（categories 为空时处理全部分类）
+
+        每个分片独立构建：文档签名与构建戳一致且未强制重建时跳过；切块数达到 ANN_INDEX.min_vectors 时训练 ANN 索引。
+        Returns:
+            所选分类中有文档的分片是否全部构建成功（或无需重建）；构建失败的分片继续提供旧版本检索
+        """
+        selected = [c for c in (categories or GLOBAL_CATEGORIES) if c in self.shards]
+        shards = [self.shards[c] for c in selected if self.shards[c].documents()]
+        if not shards:
+            logger.warning(f"⚠️ 全局知识库没有文档: {', '.join(selected)}")
+            return False
+        results = [await self._build_shard(shard, force_rebuild, chunk_size, overlap) for shard in shards]
+        return all(results)
+
+    async def _build_shard(
+        self, shard: GlobalShard, force_rebuild: bool, chunk_size: Optional[int], overlap: Optional[int]
+    ) -> bool:
+        """构建单个分片：在临时目录完成后整体替换，构建失败或进行中时旧分片仍可检索"""
+        try:
+            files = shard.documents()
+            signature = await asyncio.to_thread(shard.signature, files)
+            stamp = shard.stamp()
+            embed_model = self._create_embed_model()
+            current = (embed_model.model_name, self._embed_dimensions())
+            if shard.exists() and not force_rebuild and stamp.get("signature") == signature:
+                built_with = shard.built_with()
+                if built_with == current:
+                    logger.info(f"✅ 全局知识库分片 {shard.category} 未变化（版本 {stamp.get('version')}），跳过构建")
+                    return True
+                logger.info(
+                    f"⚠️ 全局知识库分片 {shard.category} 由 {built_with[0]}（{built_with[1]} 维）构建，"
+                    f"当前嵌入模型为 {current[0]}（{current[1]} 维），重建分片"
+                )
+
+            logger.info(f"🔧 构建全局知识库分片 {shard.category}: {len(files)} 个文件")
+            started = time.perf_counter()
+            nodes = await asyncio.to_thread(load_file_nodes, files, chunk_size, overlap)
+            vectors = await embed_nodes(embed_model, nodes)
+            dims = len(vectors[0]) if vectors else self._embed_dimensions()
+            staging = shard.index_dir.with_name(shard.index_dir.name + ".building")
+            shutil.rmtree(staging, ignore_errors=True)
+            new_stamp = await asyncio.to_thread(
+                self._write_shard, staging, dims, embed_model.model_name, nodes, vectors
+            )
+            new_stamp.update({
+                "category": shard.category,
+                "version": int(stamp.get("version", 0)) + 1,
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "signature": signature,
+                "files": len(files),
+                "chunk_size": chunk_size,
+                "overlap": overlap,
+            })
+            (staging / SHARD_STAMP_FILENAME).write_text(json.dumps(new_stamp, ensure_ascii=False, indent=2), encoding="utf-8")
+
+            shard.close()
+            retired = shard.index_dir.with_name(shard.index_dir.name + ".old")
+            shutil.rmtree(retired, ignore_errors=True)
+            if shard.index_dir.exists():
+                shard.index_dir.replace(retired)
+            staging.replace(shard.index_dir)
+            shard.close()  # 替换期间被检索重新打开的旧索引也一并移出，下次检索打开新版本
+            shutil.rmtree(retired, ignore_errors=True)
+            logger.info(
+                f"✅ 全局知识库分片 {shard.category} 构建完成: 版本 {new_stamp['version']}，{new_stamp['chunks']} 个切块，"
+                f"检索方式 {new_stamp['ann']}（耗时 {time.perf_counter() - started:.1f}s）"
+            )
+            return True
+        except Exception as e:
+            if shard.exists():
+                logger.error(
+                    f"❌ 构建全局知识库分片 {shard.category} 失败: {e}；继续使用旧版本 {shard.stamp().get('version', '?')}"
+                )
+            else:
+                logger.error(f"❌ 构建全局知识库分片 {shard.category} 失败: {e}")
+            return False
+
+    @classmethod
+    def _write_shard(cls, index_dir: Path, dims: int, model: str, nodes, vectors) -> Dict[str, Any]:
+        """（工作线程）写入向量与节点并按配置训练 ANN 索引"""
+        index = NativeVectorIndex.create(index_dir, dims, model=model)
+        try:
+            index.add(to_indexed_nodes(nodes), vectors)
+            ann = cls._build_ann(index)
+            return {"chunks": len(index), "model": model, "dims": dims, "ann": ann["type"]}
+        finally:
+            index.close()
+
+    @staticmethod
+    def _build_ann(index: NativeVectorIndex) -> Dict[str, Any]:
+        """按配置训练 ANN 索引；小语料或 flat 配置使用精确检索"""
+        kind = ANN_INDEX.get("type", "flat")
+        if kind == "flat" or len(index) < int(ANN_INDEX.get("min_vectors", 0)):
+            return index.build_ann("flat")
+        logger.info(f"🧭 训练 {kind} 近似最近邻索引: {len(index)} 个向量")
+        return index.build_ann(
+            kind,
+            rescore_factor=ANN_INDEX.get("rescore_factor", 4),
+            train_sample=ANN_INDEX.get("train_sample", 65536),
+            **ANN_INDEX.get(kind, {}),
+        )
+
+    def close(self) -> None:
+        for shard in self.shards.values():
+            shard.close()
+
+    def _get_rebuild_lock(self) -> asyncio.Lock:
+        # 锁绑定事件循环，跨 asyncio.run 时按当前循环重建
+        loop = asyncio.get_running_loop()
+        if self._rebuild_lock is None or self._rebuild_lock_loop is not loop:
+            self._rebuild_lock = asyncio.Lock()
+            self._rebuild_lock_loop = loop
+        return self._rebuild_lock
+
+    async def _current_categories(self, categories: Sequence[str]) -> List[str]:
+        """待检索分片中由其他嵌入模型/维度构建的，先按当前模型重建（沿用原切块参数）；重建失败的分片不参与检索"""
+        current = (self._query_embed_model().model_name, self._embed_dimensions())
+        stale = [c for c in categories if self.shards[c].built_with() != current]
+        if not stale:
+            return list(categories)
+        async with self._get_rebuild_lock():
+            for category in stale:
+                shard = self.shards[category]
+                if shard.built_with() == current:  # 等锁期间已由其他检索重建
+                    continue
+                stamp = shard.stamp()
+                await self._build_shard(shard, False, stamp.get("chunk_size"), stamp.get("overlap"))
+        usable = [c for c in categories if self.shards[c].built_with() == current]
+        if len(usable) < len(categories):
+            logger.warning(
+                f"⚠️ 全局知识库分片与当前嵌入模型不一致且重建失败，跳过: "
+                f"{', '.join(c for c in categories if c not in usable)}"
+            )
+        return usable
+
+    # ========== 检索 ==========
+
+    def route_categories(self, query: str, filters: Optional[FilterSpec] = None) -> List[str]:
+        """查询应检索的分片：过滤条件指定分类时按分类，否则按意图关键词（GLOBAL_SHARDS.intent_keywords）
+        映射到分类（GLOBAL_SHARDS.intent_categories），未命中意图或对应分片均未构建时检索全部已构建分片"""
+        built = [c for c in GLOBAL_CATEGORIES if self.shards[c].exists()]
+        spec = MetadataFilter.coerce(filters)
+        if spec is not None and spec.categories:
+            return [c for c in built if c in spec.categories]
+        mapping: Dict[str, List[str]] = GLOBAL_SHARDS.get("intent_categories", {})
+        routed = set()
+        for intent, keywords in GLOBAL_SHARDS.get("intent_keywords", {}).items():
+            if isinstance(keywords, list) and any(kw and kw in (query or "") for kw in keywords):
+                routed.update(mapping.get(intent, GLOBAL_CATEGORIES))
+        selected = [c for c in built if c in routed]
+        return selected or built
+
+    async def search_global(
+        self,
+        query: str,
+        top_k: int = 3,
+        filters: Optional[FilterSpec] = None,
+        categories: Optional[Sequence[str]] = None,
+    ) -> List[SearchHit]:
+        """搜索全局知识库"""
+        return (await self.search_global_many([query], top_k, filters, categories))[0]
+
+    async def search_global_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        filters: Optional[FilterSpec] = None,
+        categories: Optional[Sequence[str]] = None,
+        embeddings: Optional[Dict[int, List[float]]] = None,
+    ) -> List[List[SearchHit]]:
+        """批量搜索：一次嵌入请求，每个查询只检索路由到的分片（categories 覆盖路由），分片并发检索后按分数合并 top-k
+
+        filters 如 {"category": "laws", "domain_tags": ["政策规范"], "year": (2020, 2024)}：
+        先由分片的元数据索引求出候选行，只对候选行打分。
+        编号类查询（文号/指标编号）先走分片的 BM25 词法通道，命中即返回，不需要查询向量；
+        embeddings（查询序号 -> 向量）为调用方已算好的查询向量（混合检索与项目知识库共用），缺少的才发嵌入请求。
+        """
+        queries = list(queries or [])
+        try:
+            spec = MetadataFilter.coerce(filters)
+            routes = [
+                [c for c in categories if c in self.shards and self.shards[c].exists()] if categories
+                else self.route_categories(q, spec)
+                for q in queries
+            ]
+            usable = set(await self._current_categories(sorted({c for route in routes for c in route})))
+            by_shard: Dict[str, List[int]] = {}
+            for i, route in enumerate(routes):
+                for category in route:
+                    if category in usable:
+                        by_shard.setdefault(category, []).append(i)
+            if not by_shard:
+                return [[] for _ in queries]
+            logger.info(f"🌍 全局知识库检索分片: {', '.join(f'{c}({len(ids)})' for c, ids in by_shard.items())}")
+
+            semaphore = asyncio.Semaphore(max(1, int(GLOBAL_SHARDS.get("max_concurrency", 4))))
+            merged: List[List[SearchHit]] = [[] for _ in queries]
+
+            async def _search_shards(selected: List[int], search) -> None:
+                """selected 中的查询在各自路由到的分片上并发检索，命中并入 merged"""
+                chosen = set(selected)
+                jobs = {c: [i for i in ids if i in chosen] for c, ids in by_shard.items()}
+                jobs = {c: ids for c, ids in jobs.items() if ids}
+
+                async def _one(category: str, ids: List[int]) -> List[List[SearchHit]]:
+                    async with semaphore:
+                        return await asyncio.to_thread(search, self.shards[category], ids)
+
+                shard_hits = await asyncio.gather(*(_one(c, ids) for c, ids in jobs.items()))
+                for ids, per_shard in zip(jobs.values(), shard_hits):
+                    for i, hits in zip(ids, per_shard):
+                        merged[i].extend(hits)
+
+            fast_path = LEXICAL_SEARCH.get("enabled", True) and LEXICAL_SEARCH.get("identifier_fast_path", True)
+            lexical_ids = [i for i, q in enumerate(queries) if fast_path and is_identifier_query(q)]
+            if lexical_ids:
+                await _search_shards(lexical_ids, lambda shard, ids: shard.lexical([queries[i] for i in ids], top_k, spec))
+
+            # 词法未命中的编号类查询与其余查询走向量通道
+            vector_ids = [i for i in range(len(queries)) if not merged[i]]
+            if vector_ids:
+                known = embeddings or {}
+                missing = [i for i in vector_ids if i not in known]
+                vectors = dict(known)
+                if missing:
+                    fresh = await embed_queries(self._query_embed_model(), [queries[i] for i in missing])
+                    vectors.update(zip(missing, fresh))
+                await _search_shards(vector_ids, lambda shard, ids: shard.query([vectors[i] for i in ids], top_k, spec))
+            return [dedupe_hits(hits)[:top_k] for hits in merged]
+        except Exception as e:
+            logger.error(f"❌ 全局知识库搜索失败: {e}")
+            return [[] for _ in queries]
+
+    def get_global_stats(self) -> Dict[str, Any]:
+        """文件数、分类统计与各分片的构建戳"""
+        categories: Dict[str, int] = {}
+        shards: Dict[str, Any] = {}
+        for category, shard in self.shards.items():
+            count = len(shard.documents())
+            if count:
+                categories[category] = count
+            if shard.exists():
+                stamp = shard.stamp()
+                shards[category] = {
+                    key: stamp.get(key) for key in ("version", "built_at", "files", "chunks", "ann", "model", "dims")
+                }
+        return {
+            "total_files": sum(categories.values()),
+            "categories": categories,
+            "index_exists": bool(shards),
+            "chunks": sum(int(s.get("chunks") or 0) for s in shards.values()),
+            "shards": shards,
+        }
+
+
+# 全局单例实例
+global_knowledge = GlobalKnowledgeService()
@@ -1,25 +1,67 @@
 """
 混合检索服务
 同时检索全局知识库和项目知识库，合并结果
+项目知识库为词法（BM25）+ 向量双通道：纯编号查询词法命中即返回，其余查询按倒数排名融合
+两库均支持按旁车元数据（领域标签/年份/分类）预过滤候选切块
+联邦检索：同一查询扇出到多个项目索引（并发受限、经引擎缓存按需加载），按通道跨项目排名融合为带项目归属的全局 top-k
 """
 
 import asyncio
 import os
+import shutil
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Tuple, Union
 from metagpt.logs import logger
-from metagpt.rag.engines.simple import SimpleEngine
-from metagpt.rag.schema import FAISSRetrieverConfig
 from metagpt.config2 import Config
 
+from backend.config.performance_config import (
+    ENGINE_CACHE,
+    FEDERATED_SEARCH,
+    LEXICAL_SEARCH,
+    PROJECT_VECTOR_COMPRESSION,
+)
+from backend.tools.embeddings import create_embed_model, embed_queries
+from backend.tools.index_manifest import IndexManifest, scan_source_files
+from backend.tools.lexical_index import is_identifier_query, reciprocal_rank_fusion
+from backend.tools.lru_cache import BoundedLRUCache
+from backend.tools.metadata_filter import FilterSpec, MetadataIndex, read_sidecar
+from backend.tools.singleflight import SingleFlight
+from backend.tools.search_hit import SearchHit, as_hit, dedupe_hits, distance_to_score, hit_from_node, merge_ranked_hits
+from backend.tools.native_index import (
+    NativeVectorIndex,
+    embed_nodes,
+    has_legacy_index,
+    install_staged_index,
+    load_file_nodes,
+    to_indexed_nodes,
+)
 from .global_knowledge import global_knowledge
 
+EMBED_DIMENSIONS = 1024  # text-embedding-v3 向量维度
+
 
 class HybridSearchService:
     """混合检索服务：全局知识库 + 项目知识库"""
     
     def __init__(self):
-        self._project_engines = {}  # 缓存项目引擎
+        # 缓存项目索引：path -> (index, embed_model, metadata)，按估算内存限额淘汰，淘汰后按需从磁盘重新加载
+        self._project_indexes = BoundedLRUCache(
+            max_bytes=ENGINE_CACHE.get("max_bytes", 512 * 1024 * 1024),
+            max_entries=ENGINE_CACHE.get("max_entries", 32),
+            ttl_seconds=ENGINE_CACHE.get("ttl_seconds"),
+            on_evict=self._on_engine_evicted,
+        )
+        # 同一路径的并发冷启动合并为一次构建；失效计数用于丢弃构建期间已过期的结果
+        self._index_flights = SingleFlight()
+        self._cache_epochs: Dict[str, int] = {}
+        # 索引租约：id(index) -> 在途检索数；移出缓存时仍被持有的索引延后到租约归还时关闭
+        self._index_leases: Dict[int, int] = {}
+        self._retired_indexes: Dict[int, NativeVectorIndex] = {}
+        self._lease_lock = threading.Lock()
         self._config = None
     
     def _get_config(self) -> Config:
@@ -32,10 +74,8 @@ class HybridSearchService:
         """创建LLM和嵌入模型"""
         config = self._get_config()
         llm_config = config.llm
-        embed_config = config.embedding
         
         # 🔧 按照阿里云官方文档使用OpenAI-Like方式 
-        from llama_index.embeddings.dashscope import DashScopeEmbedding
         from llama_index.llms.openai_like import OpenAILike
         
         # 创建LLM - 使用官方推荐的OpenAI-Like方式
@@ -46,15 +86,19 @@ class HybridSearchService:
             is_chat_model=True
         )
         
-        # 创建Embedding模型 - 使用官方DashScopeEmbedding
-        embed_model = DashScopeEmbedding(
+        return llm, self._create_embed_model()
+
+    def _create_embed_model(self):
+        """创建Embedding模型 - 官方DashScopeEmbedding + 切块嵌入缓存（重建索引时仅嵌入新切块）"""
+        embed_config = self._get_config().embedding
+        return create_embed_model(
             model_name=embed_config.model,  # text-embedding-v3
             api_key=embed_config.api_key,
-            dashscope_api_key=embed_config.api_key  # DashScope专用参数
+            dimensions=self._embed_dimensions(),
         )
-        embed_model.embed_batch_size = 8
-        
-        return llm, embed_model
+
+    def _embed_dimensions(self) -> int:
+        return getattr(self._get_config().embedding, "dimensions", None) or EMBED_DIMENSIONS
     
     def _get_project_vector_index_path(self, project_vector_storage_path: str) -> str:
         """获取项目向量索引路径"""
@@ -62,138 +106,299 @@ class HybridSearchService:
         return str(project_dir / "vector_index")
     
     def _is_project_index_exists(self, index_path: str) -> bool:
-        """检查项目索引是否存在"""
-        index_path = Path(index_path)
-        # 使用正确的FAISS索引文件名
-        index_files = ['default__vector_store.json', 'docstore.json', 'index_store.json']
-        return all((index_path / f).exists() for f in index_files)
+        """检查项目索引是否存在（原生索引，或尚未迁移的 llama-index JSON 索引）"""
+        return NativeVectorIndex.exists(index_path) or has_legacy_index(index_path)
     
     async def _build_project_index(self, project_vector_storage_path: str) -> bool:
-        """构建项目向量索引"""
+        """全量构建项目向量索引（忽略清单，重新切块嵌入全部文件）"""
+        return await self._sync_project_index(project_vector_storage_path, force_rebuild=True)
+
+    async def _sync_project_index(self, project_vector_storage_path: str, force_rebuild: bool = False) -> bool:
+        """按清单增量同步项目向量索引：仅对新增/变更的文件重新切块嵌入，删除/变更文件的旧向量就地移除
+
+        文件扫描、切块与索引读写在工作线程执行，嵌入请求异步并发，事件循环不被构建阻塞。
+
+        Returns:
+            索引是否可用
+        """
+        index_path = Path(self._get_project_vector_index_path(project_vector_storage_path))
+        index = None
         try:
-            # 收集项目文档
-            project_files = []
-            if os.path.isdir(project_vector_storage_path):
-                project_files = [
-                    os.path.join(project_vector_storage_path, f) 
-                    for f in os.listdir(project_vector_storage_path) 
-                    if f.endswith(('.md', '.txt'))
-                ]
-            
-            if not project_files:
+            embed_model = self._create_embed_model()
+            index, manifest, current, rebuild = await asyncio.to_thread(
+                self._open_for_sync, Path(project_vector_storage_path), index_path, embed_model.model_name, force_rebuild
+            )
+            if rebuild and not current:
                 logger.warning(f"⚠️ 项目知识库为空: {project_vector_storage_path}")
                 return False
-            
-            logger.info(f"🔧 构建项目知识库索引: {len(project_files)} 个文件")
-            llm, embed_model = self._create_llm_and_embed_model()
-            
-            # 🚀 使用FAISS Retriever支持持久化
-            from metagpt.rag.schema import FAISSRetrieverConfig
-            
-            # 构建引擎时就指定支持持久化的配置
-            engine = SimpleEngine.from_docs(
-                input_files=project_files,
-                llm=llm,
-                embed_model=embed_model,
-                retriever_configs=[FAISSRetrieverConfig(dimensions=1024)]  # 使用FAISS支持持久化
-            )
-            
-            index_path = self._get_project_vector_index_path(project_vector_storage_path)
-            Path(index_path).mkdir(parents=True, exist_ok=True)
-            
-            # 持久化索引
-            engine.persist(index_path)
-            
-            logger.info(f"✅ 项目知识库索引已保存到: {index_path}")
+            diff = manifest.diff(current)
+            if not diff.has_changes:
+                return True
+
+            started = time.perf_counter()
+            if rebuild:
+                logger.info(f"🔧 构建项目知识库索引: {len(current)} 个文件")
+            else:
+                logger.info(
+                    f"🔁 增量更新项目知识库索引: 新增 {len(diff.added)}，变更 {len(diff.changed)}，"
+                    f"删除 {len(diff.removed)}，未变化 {len(diff.unchanged)}"
+                )
+
+            # 先完成切块与嵌入，成功后才改动磁盘上的索引（失败时旧索引保持可用）
+            nodes, vectors = [], []
+            if diff.to_embed:
+                nodes = await asyncio.to_thread(
+                    load_file_nodes, [Path(project_vector_storage_path) / name for name in diff.to_embed]
+                )
+                vectors = await embed_nodes(embed_model, nodes)
+
+            if rebuild:
+                # 全量重建写入同级的 <目录名>.building，完成后才替换原生索引文件：中途失败时旧索引（如有）原样可用
+                if index is not None:
+                    index.close()
+                    index = None
+                dims = len(vectors[0]) if vectors else self._embed_dimensions()
+                await asyncio.to_thread(
+                    self._rebuild_staged, index_path, dims, embed_model.model_name, current, diff, nodes, vectors
+                )
+            else:
+                await asyncio.to_thread(self._apply_sync, index, manifest, current, diff, nodes, vectors)
+            logger.info(f"✅ 项目知识库索引已保存到: {index_path}（耗时 {time.perf_counter() - started:.1f}s）")
             return True
-            
+
         except Exception as e:
-            logger.error(f"❌ 构建项目知识库索引失败: {e}")
-            return False
+            logger.error(f"❌ 同步项目知识库索引失败: {e}")
+            # 嵌入或重建失败时磁盘上的旧索引未被改写（全量重建在暂存目录进行），仍可加载使用
+            return NativeVectorIndex.exists(index_path)
+        finally:
+            if index is not None:
+                index.close()
+
+    @staticmethod
+    def _open_for_sync(source_dir: Path, index_path: Path, model_name: str, force_rebuild: bool):
+        """（工作线程）扫描源文件、读取清单并打开索引，判断是否需要全量重建"""
+        current = scan_source_files(source_dir)
+        manifest = IndexManifest.load(index_path)
+        index = None
+        # 旧的 llama-index JSON 索引一次性迁移为原生格式（node_id 不变，清单仍然有效）
+        if not force_rebuild:
+            index = NativeVectorIndex.open_or_migrate(index_path, model=model_name)
+        # 无清单的旧索引无法判断是否与文件一致；切换嵌入后端后旧向量不可比：一次性全量重建，此后增量维护
+        rebuild = (
+            index is None
+            or not manifest.exists()
+            or (index.model is not None and index.model != model_name)
+        )
+        if rebuild:
+            manifest = IndexManifest(index_path)
+        return index, manifest, current, rebuild
+
+    @classmethod
+    def _rebuild_staged(cls, index_path: Path, dims: int, model: str, current, diff, nodes, vectors) -> None:
+        """（工作线程）在暂存目录写入全部切块与新清单，校验可打开后替换 index_path 中的原生索引与清单"""
+        staging = index_path.with_name(index_path.name + ".building")
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            index = NativeVectorIndex.create(staging, dims, "l2", model)
+            try:
+                cls._apply_sync(index, IndexManifest(staging), current, diff, nodes, vectors)
+            finally:
+                index.close()
+            NativeVectorIndex(staging).close()
+            install_staged_index(staging, index_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _apply_sync(index: NativeVectorIndex, manifest: IndexManifest, current, diff, nodes, vectors) -> None:
+        """（工作线程）移除过期向量、写入新切块并保存清单"""
+        stale_node_ids = set()
+        for name in diff.to_remove:
+            stale_node_ids.update(manifest.node_ids(name))
+        index.delete(stale_node_ids)
+        for name in diff.removed:
+            manifest.remove_file(name)
+
+        if nodes:
+            index.add(to_indexed_nodes(nodes), vectors)
+            by_file: Dict[str, List[Any]] = {}
+            for node in nodes:
+                by_file.setdefault(node.metadata.get("file_name", ""), []).append(node)
+            for name in diff.to_embed:
+                file_nodes = by_file.get(name, [])
+                manifest.set_file(
+                    name,
+                    current[name],
+                    [n.node_id for n in file_nodes],
+                    [n.ref_doc_id for n in file_nodes if n.ref_doc_id],
+                )
+
+        manifest.save()
+
+    @staticmethod
+    def _maintain_compression(index: NativeVectorIndex) -> None:
+        """（工作线程）按 PROJECT_VECTOR_COMPRESSION 维护压缩向量副本：缺失、类型不符或追加行过多时重建"""
+        kind = PROJECT_VECTOR_COMPRESSION.get("type", "flat")
+        info = index.ann_info()
+        if kind == "flat" or len(index) < int(PROJECT_VECTOR_COMPRESSION.get("min_vectors", 0)):
+            if info["type"] != "flat":
+                index.build_ann("flat")
+            return
+        covered = int(info.get("rows", 0))
+        if info["type"] == kind and info["uncovered_rows"] <= PROJECT_VECTOR_COMPRESSION.get("rebuild_ratio", 0.2) * covered:
+            return
+        started = time.perf_counter()
+        info = index.build_ann(
+            kind,
+            rescore_factor=PROJECT_VECTOR_COMPRESSION.get("rescore_factor", 8),
+            **PROJECT_VECTOR_COMPRESSION.get(kind, {}),
+        )
+        logger.info(f"🗜️ 项目索引压缩向量已重建: {kind} {info.get('params')}（耗时 {time.perf_counter() - started:.1f}s）")
     
-    async def _get_project_engine(self, project_vector_storage_path: str) -> SimpleEngine:
-        """获取或创建项目知识库引擎"""
+    async def _get_project_index(self, project_vector_storage_path: str) -> Tuple[NativeVectorIndex, Any, MetadataIndex]:
+        """获取项目知识库索引、嵌入模型（批量查询嵌入复用）与元数据索引；同一路径的并发冷启动只构建一次"""
         cache_key = project_vector_storage_path
         
         # 检查缓存
-        if cache_key in self._project_engines:
-            return self._project_engines[cache_key]
-        
+        cached = self._project_indexes.get(cache_key)
+        if cached is not None:
+            return cached
+        return await self._index_flights.do(cache_key, lambda: self._load_project_index(project_vector_storage_path))
+
+    async def _load_project_index(self, project_vector_storage_path: str) -> Tuple[NativeVectorIndex, Any, MetadataIndex]:
+        cache_key = project_vector_storage_path
+        epoch = self._cache_epochs.get(cache_key, 0)
         try:
             index_path = self._get_project_vector_index_path(project_vector_storage_path)
             
-            # 检查索引是否存在，不存在则构建
-            if not self._is_project_index_exists(index_path):
-                logger.info("📁 项目索引不存在，开始构建...")
-                if not await self._build_project_index(project_vector_storage_path):
-                    raise Exception("构建项目索引失败")
+            # 按清单同步索引：不存在则全量构建，文件有增删改则仅更新对应向量
+            if not await self._sync_project_index(project_vector_storage_path):
+                raise Exception("构建项目索引失败")
             
-            # 从索引加载引擎
+            # 打开索引：向量文件内存映射、文档库按需读取，耗时与语料规模无关
             logger.info(f"📖 加载项目知识库索引: {index_path}")
-            llm, embed_model = self._create_llm_and_embed_model()
+            index = await asyncio.to_thread(NativeVectorIndex, index_path)
+            await asyncio.to_thread(self._maintain_compression, index)
+            metadata = await asyncio.to_thread(self._load_metadata, index, Path(project_vector_storage_path))
+            embed_model = self._create_embed_model()
             
-            from metagpt.rag.schema import FAISSIndexConfig
-            config = FAISSIndexConfig(
-                persist_path=index_path,
-                embed_model=embed_model
-            )
-            engine = SimpleEngine.from_index(
-                index_config=config,
-                embed_model=embed_model,
-                llm=llm,
-                retriever_configs=[FAISSRetrieverConfig(dimensions=1024)]
-            )
-            
-            # 缓存引擎
-            self._project_engines[cache_key] = engine
-            logger.info("✅ 项目知识库引擎加载成功")
-            return engine
+            # 缓存索引（登记估算内存占用）；构建期间缓存被失效（文档有更新）时不缓存，下次访问重新同步
+            size_bytes = self._estimate_index_bytes(index)
+            if self._cache_epochs.get(cache_key, 0) == epoch:
+                self._project_indexes.put(cache_key, (index, embed_model, metadata), size_bytes)
+            else:
+                self._retire_index(index, defer=True)  # 未进入缓存：本次检索结束后关闭
+            logger.info(f"✅ 项目知识库索引加载成功: {len(index)} 个切块 (估算 {size_bytes / 1024 / 1024:.1f}MB)")
+            return index, embed_model, metadata
             
         except Exception as e:
-            logger.error(f"❌ 获取项目知识库引擎失败: {e}")
+            logger.error(f"❌ 获取项目知识库索引失败: {e}")
             raise
+
+    @staticmethod
+    def _load_metadata(index: NativeVectorIndex, source_dir: Path) -> MetadataIndex:
+        """（工作线程）读取项目文档的旁车元数据，建立 文件 -> 行号 映射"""
+        file_rows = index.rows_by_file()
+        return MetadataIndex({name: read_sidecar(source_dir / name) for name in file_rows}, file_rows)
     
-    async def _search_project_knowledge(self, query: str, project_vector_storage_path: str, top_k: int = 3) -> List[str]:
+    async def _search_project_knowledge(
+        self, query: str, project_vector_storage_path: str, top_k: int = 3, filters: Optional[FilterSpec] = None
+    ) -> List[SearchHit]:
         """搜索项目知识库"""
+        return (await self._search_project_knowledge_many([query], project_vector_storage_path, top_k, filters))[0]
+    
+    async def _search_project_knowledge_many(
+        self,
+        queries: List[str],
+        project_vector_storage_path: str,
+        top_k: int = 3,
+        filters: Optional[FilterSpec] = None,
+        query_embeddings: Optional[Dict[int, List[float]]] = None,
+    ) -> List[List[SearchHit]]:
+        """批量搜索项目知识库：编号类查询由 BM25 直接回答，其余查询一次嵌入请求 + 一次矩阵检索后与词法结果融合
+
+        filters 经元数据索引转为候选行号，词法与向量两个通道都只对候选行打分；
+        query_embeddings（查询序号 -> 向量）为调用方已算好的查询向量（联邦检索跨项目复用），缺少的才发嵌入请求并回填。
+        """
         try:
-            engine = await self._get_project_engine(project_vector_storage_path)
-            results = await engine.aretrieve(query)
-            return [result.text.strip() for result in results[:top_k]]
+            # 持有租约：检索期间索引即使被淘汰/失效也不会被关闭，租约归还后才释放文件句柄
+            async with self._leased_project_index(project_vector_storage_path) as (index, embed_model, metadata):
+                rows = metadata.rows(filters)
+                if rows is not None and not len(rows):
+                    return [[] for _ in queries]
+                lexical_on = bool(LEXICAL_SEARCH.get("enabled", True)) and index.lexical_enabled
+                candidates = top_k * max(1, int(LEXICAL_SEARCH.get("candidate_multiplier", 2))) if lexical_on else top_k
+                lexical_hits = index.lexical_query(queries, candidates, rows) if lexical_on else [[] for _ in queries]
+
+                results: List[List[SearchHit]] = [[] for _ in queries]
+                pending = []
+                for i, query in enumerate(queries):
+                    if LEXICAL_SEARCH.get("identifier_fast_path", True) and lexical_hits[i] and is_identifier_query(query):
+                        # FTS5 的 bm25 值越小越相关，取负作为分数
+                        results[i] = [
+                            replace(hit_from_node(node, -bm25, "project"), lexical_score=-bm25)
+                            for node, bm25 in lexical_hits[i][:top_k]
+                        ]
+                    else:
+                        pending.append(i)
+                if len(pending) < len(queries):
+                    logger.info(f"🔤 编号类查询词法直达: {len(queries) - len(pending)}/{len(queries)} 个查询无需嵌入")
+
+                if pending:
+                    known = query_embeddings or {}
+                    missing = [i for i in pending if i not in known]
+                    fresh = dict(zip(missing, await embed_queries(embed_model, [queries[i] for i in missing]))) if missing else {}
+                    if query_embeddings is not None:
+                        query_embeddings.update(fresh)  # 补算的向量回填，供其余项目复用
+                    embeddings = [known[i] if i in known else fresh[i] for i in pending]
+                    for i, vector_hits in zip(pending, index.query(embeddings, candidates, rows=rows)):
+                        results[i] = self._fuse_project_hits(lexical_hits[i], vector_hits, top_k, index.metric)
+                return results
         except Exception as e:
-            logger.error(f"❌ 项目知识库搜索失败: {e}")
-            return []
-    
+            logger.error(f"❌ 项目知识库批量搜索失败: {e}")
+            return [[] for _ in queries]
+
+    @staticmethod
+    def _fuse_project_hits(
+        lexical_hits: List[Tuple[Any, float]], vector_hits: List[Tuple[Any, float]], top_k: int, metric: str = "l2"
+    ) -> List[SearchHit]:
+        """词法/向量两个排名列表按 node_id 做倒数排名融合，分数为融合分；命中附带各通道的原始分数（供跨项目合并）"""
+        nodes = {node.node_id: node for node, _ in vector_hits + lexical_hits}
+        similarity = {node.node_id: distance_to_score(dist, metric) for node, dist in vector_hits}
+        lexical_score = {node.node_id: -bm25 for node, bm25 in lexical_hits}
+        fused = reciprocal_rank_fusion(
+            [[node.node_id for node, _ in lexical_hits], [node.node_id for node, _ in vector_hits]],
+            weights=[LEXICAL_SEARCH.get("lexical_weight", 1.0), LEXICAL_SEARCH.get("vector_weight", 1.0)],
+            k=LEXICAL_SEARCH.get("rrf_k", 60),
+        )
+        return [
+            replace(
+                hit_from_node(nodes[node_id], score, "project"),
+                similarity=similarity.get(node_id),
+                lexical_score=lexical_score.get(node_id),
+            )
+            for node_id, score in fused[:top_k]
+        ]
+
     def _merge_search_results(
         self, 
-        global_results: List[str], 
-        project_results: List[str],
+        global_results: List[SearchHit], 
+        project_results: List[SearchHit],
         global_weight: float = 0.3,
         project_weight: float = 0.7,
         limit: int = 6,
-    ) -> List[str]:
-        """合并检索结果，项目知识库权重更高"""
-        
-        merged_results = []
-        
-        # 先添加项目结果（权重更高）
-        for result in project_results:
-            if result and result.strip():
-                merged_results.append(f"📁 [项目知识] {result.strip()}")
-        
-        # 再添加全局结果
-        for result in global_results:
-            if result and result.strip():
-                merged_results.append(f"🌍 [全局知识] {result.strip()}")
-        
-        # 去重并限制总数
-        seen = set()
-        unique_results = []
-        for result in merged_results:
-            if result not in seen:
-                seen.add(result)
-                unique_results.append(result)
-        
-        return unique_results[:limit]  # 限制总结果数（可配置）
+    ) -> List[SearchHit]:
+        """合并检索结果：按权重做倒数排名融合（项目知识库权重更高），按 node_id 去重，两库都命中的内容排名提前"""
+        project_hits = dedupe_hits(as_hit(r, "project") for r in project_results)
+        global_hits = dedupe_hits(as_hit(r, "global") for r in global_results)
+        by_key = {hit.key: hit for hit in global_hits}
+        by_key.update((hit.key, hit) for hit in project_hits)
+        fused = reciprocal_rank_fusion(
+            [[hit.key for hit in project_hits], [hit.key for hit in global_hits]],
+            weights=[project_weight, global_weight],
+            k=LEXICAL_SEARCH.get("rrf_k", 60),
+        )
+        return [by_key[key].with_score(score) for key, score in fused[:limit]]  # 限制总结果数（可配置）
     
     async def hybrid_search(
         self, 
@@ -201,8 +406,9 @@ class HybridSearchService:
         project_vector_storage_path: str,
         enable_global: bool = True,
         global_top_k: int = 2,
-        project_top_k: int = 4
-    ) -> List[str]:
+        project_top_k: int = 4,
+        filters: Optional[FilterSpec] = None,
+    ) -> List[SearchHit]:
         """
         混合检索：同时搜索全局知识库和项目知识库
         
@@ -212,41 +418,246 @@ class HybridSearchService:
             enable_global: 是否启用全局知识库搜索
             global_top_k: 全局知识库返回结果数
             project_top_k: 项目知识库返回结果数
+            filters: 元数据过滤，如 {"category": "laws", "domain_tags": ["政策规范"], "year": (2020, 2024)}；
+                缺少对应旁车字段的文档不命中
+
+        Returns:
+            按融合分数降序的 SearchHit 列表（拼装提示词时用 format_hits 转为文本）
+        """
+        results = await self.hybrid_search_many(
+            [query], project_vector_storage_path, enable_global, global_top_k, project_top_k, filters
+        )
+        return results[0] if results else []
+    
+    async def hybrid_search_many(
+        self,
+        queries: List[str],
+        project_vector_storage_path: str,
+        enable_global: bool = True,
+        global_top_k: int = 2,
+        project_top_k: int = 4,
+        filters: Optional[FilterSpec] = None,
+    ) -> List[List[SearchHit]]:
         """
+        批量混合检索：全部查询一次嵌入请求，每个索引（项目/全局）一次矩阵检索
+
+        启用全局知识库时查询向量在此处统一计算，项目与全局两侧共用，不再各自嵌入；编号类查询不预先嵌入，
+        两侧先走词法直达，词法未命中时才补算向量。仅检索项目知识库时由项目侧按需嵌入。
+
+        Returns:
+            与 queries 顺序一致的结果列表，每项与 hybrid_search 的返回格式相同
+        """
+        queries = list(queries or [])
+        if not queries:
+            return []
         try:
-            tasks = []
-            
-            # 项目知识库搜索（总是执行）
-            project_task = self._search_project_knowledge(
-                query, project_vector_storage_path, project_top_k
+            embeddings: Dict[int, List[float]] = {}
+            to_embed = self._vector_query_indices(queries)
+            if enable_global and to_embed:
+                try:
+                    vectors = await embed_queries(self._create_embed_model(), [queries[i] for i in to_embed])
+                    embeddings = dict(zip(to_embed, vectors))
+                except Exception as e:
+                    logger.warning(f"⚠️ 批量查询嵌入失败，项目/全局知识库分别重试: {e}")
+
+            async def _global_many() -> List[List[SearchHit]]:
+                if not enable_global:
+                    return [[] for _ in queries]
+                # 一次检索全部查询，复用已算好的查询向量
+                return await global_knowledge.search_global_many(queries, global_top_k, filters, embeddings=embeddings)
+
+            project_lists, global_lists = await asyncio.gather(
+                self._search_project_knowledge_many(
+                    queries, project_vector_storage_path, project_top_k, filters, embeddings
+                ),
+                _global_many(),
             )
-            tasks.append(project_task)
-            
-            # 全局知识库搜索（可选）
-            if enable_global:
-                global_task = global_knowledge.search_global(query, global_top_k)
-                tasks.append(global_task)
-            else:
-                tasks.append(asyncio.coroutine(lambda: [])())
-            
-            # 并行执行
-            project_results, global_results = await asyncio.gather(*tasks)
-            
-            logger.info(f"🔍 混合检索完成 - 项目结果: {len(project_results)}, 全局结果: {len(global_results)}")
-            
-            # 合并结果（按 top_k 之和限制总结果数）
-            return self._merge_search_results(global_results, project_results, limit=max(1, int(global_top_k) + int(project_top_k)))
-            
+            logger.info(
+                f"🔍 混合检索完成 - 查询数: {len(queries)}, 项目结果: {sum(map(len, project_lists))}, "
+                f"全局结果: {sum(map(len, global_lists))}"
+            )
+            limit = max(1, int(global_top_k) + int(project_top_k))
+            return [
+                self._merge_search_results(g, p, limit=limit)
+                for p, g in zip(project_lists, global_lists)
+            ]
         except Exception as e:
             logger.error(f"❌ 混合检索失败: {e}")
-            return []
-    
+            return [[] for _ in queries]
+
+    @staticmethod
+    def _vector_query_indices(queries: List[str]) -> List[int]:
+        """需要预先嵌入的查询序号：编号类查询由词法通道直接回答，先不嵌入，词法未命中时再由检索方补算"""
+        fast_path = LEXICAL_SEARCH.get("enabled", True) and LEXICAL_SEARCH.get("identifier_fast_path", True)
+        return [i for i, q in enumerate(queries) if not (fast_path and is_identifier_query(q))]
+
+    # ========== 🔭 多项目联邦检索 ==========
+
+    @staticmethod
+    def discover_projects(workspace_root: str = "workspace") -> Dict[str, str]:
+        """扫描工作区内的项目知识库：{项目名: 项目向量存储路径}（workspace/<项目>/vector_storage/project_docs）"""
+        root = Path(workspace_root)
+        if not root.is_dir():
+            return {}
+        return {
+            path.parent.parent.name: str(path)
+            for path in sorted(root.glob("*/vector_storage/project_docs"))
+            if path.is_dir()
+        }
+
+    @staticmethod
+    def _project_name(project_vector_storage_path: str) -> str:
+        path = Path(project_vector_storage_path)
+        if path.name == "project_docs" and path.parent.name == "vector_storage":
+            return path.parent.parent.name
+        return path.name
+
+    async def federated_search(
+        self,
+        query: str,
+        projects: Union[Dict[str, str], Sequence[str]],
+        top_k: int = 6,
+        per_project_top_k: Optional[int] = None,
+        filters: Optional[FilterSpec] = None,
+    ) -> List[SearchHit]:
+        """跨项目检索单个查询，见 federated_search_many"""
+        return (await self.federated_search_many([query], projects, top_k, per_project_top_k, filters))[0]
+
+    async def federated_search_many(
+        self,
+        queries: List[str],
+        projects: Union[Dict[str, str], Sequence[str]],
+        top_k: int = 6,
+        per_project_top_k: Optional[int] = None,
+        filters: Optional[FilterSpec] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> List[List[SearchHit]]:
+        """
+        联邦检索：查询扇出到多个项目知识库，合并为全局 top-k
+
+        Args:
+            queries: 查询列表（全部项目共用一次查询嵌入请求）
+            projects: {项目名: 项目向量存储路径} 或路径列表（项目名取 workspace/<项目>/… 中的目录名）；
+                可用 discover_projects() 扫描工作区
+            top_k: 每个查询合并后返回的结果数
+            per_project_top_k: 每个项目的召回数，默认与 top_k 相同
+            filters: 元数据过滤，对每个项目生效
+            max_concurrency: 同时检索（及按需加载）的项目数，默认 FEDERATED_SEARCH.max_concurrency
+
+        索引经引擎缓存按需加载，受缓存内存限额淘汰，不会同时常驻全部项目；
+        未建索引的项目默认跳过（FEDERATED_SEARCH.build_missing）。各项目共用同一嵌入模型，
+        向量通道按相似度、词法通道按 BM25 分分别跨项目排序后做倒数排名融合（项目内的融合分只反映排名，跨项目不可比）；
+        每条命中的 project 字段标明所属项目。
+
+        Returns:
+            与 queries 顺序一致的 SearchHit 列表
+        """
+        queries = list(queries or [])
+        if isinstance(projects, dict):
+            targets = dict(projects)
+        else:
+            targets = {self._project_name(path): path for path in projects}
+        if not FEDERATED_SEARCH.get("build_missing", False):
+            targets = {
+                name: path for name, path in targets.items()
+                if self._is_project_index_exists(self._get_project_vector_index_path(path))
+            }
+        if not queries or not targets:
+            return [[] for _ in queries]
+
+        started = time.perf_counter()
+        per_project_top_k = int(per_project_top_k or top_k)
+        # 查询向量只算一次；编号类查询可能由词法通道直接回答，先不嵌入，个别项目词法未命中时再补算
+        to_embed = self._vector_query_indices(queries)
+        embeddings: Dict[int, List[float]] = {}
+        if to_embed:
+            vectors = await embed_queries(self._create_embed_model(), [queries[i] for i in to_embed])
+            embeddings = dict(zip(to_embed, vectors))
+
+        semaphore = asyncio.Semaphore(max(1, int(max_concurrency or FEDERATED_SEARCH.get("max_concurrency", 4))))
+
+        async def _search_project(name: str, path: str) -> List[List[SearchHit]]:
+            async with semaphore:
+                result_lists = await self._search_project_knowledge_many(
+                    queries, path, per_project_top_k, filters, embeddings
+                )
+            return [[replace(hit, project=name) for hit in hits] for hits in result_lists]
+
+        per_project = await asyncio.gather(*(_search_project(name, path) for name, path in targets.items()))
+        weights = (LEXICAL_SEARCH.get("lexical_weight", 1.0), LEXICAL_SEARCH.get("vector_weight", 1.0))
+        results = [
+            merge_ranked_hits((lists[i] for lists in per_project), top_k, weights, LEXICAL_SEARCH.get("rrf_k", 60))
+            for i in range(len(queries))
+        ]
+        logger.info(
+            f"🔭 联邦检索完成 - 项目数: {len(targets)}, 查询数: {len(queries)}, "
+            f"耗时 {time.perf_counter() - started:.2f}s"
+        )
+        return results
+
     def invalidate_project_cache(self, project_vector_storage_path: str):
-        """清除项目引擎缓存（当项目文档更新时调用）"""
+        """清除项目索引缓存（当项目文档更新时调用）；索引在没有在途检索后关闭"""
         cache_key = project_vector_storage_path
-        if cache_key in self._project_engines:
-            del self._project_engines[cache_key]
-            logger.info(f"🗑️ 已清除项目引擎缓存: {cache_key}")
+        self._cache_epochs[cache_key] = self._cache_epochs.get(cache_key, 0) + 1
+        if self._project_indexes.pop(cache_key) is not None:
+            logger.info(f"🗑️ 已清除项目索引缓存: {cache_key}")
+
+    def get_engine_cache_stats(self) -> Dict[str, Any]:
+        """项目索引缓存统计：条目数、估算内存、命中/未命中/淘汰次数"""
+        return self._project_indexes.stats()
+
+    @staticmethod
+    def _estimate_index_bytes(index: NativeVectorIndex) -> int:
+        """估算索引内存：检索时映射进内存的向量字节数 + 固定开销（文档库按需读取，不计入）"""
+        return index.estimated_bytes() + int(ENGINE_CACHE.get("engine_overhead_bytes", 0))
+
+    def _on_engine_evicted(self, cache_key: str, entry: Any, reason: str) -> None:
+        """淘汰/过期/失效的索引：无在途检索时立即关闭（sqlite 连接与内存映射），否则等租约归还后关闭"""
+        if reason in ("capacity", "ttl"):
+            logger.info(f"♻️ 项目索引缓存淘汰({reason}): {cache_key}，下次访问时从磁盘重新加载")
+        self._retire_index(entry[0])
+
+    @asynccontextmanager
+    async def _leased_project_index(
+        self, project_vector_storage_path: str
+    ) -> AsyncIterator[Tuple[NativeVectorIndex, Any, MetadataIndex]]:
+        """获取项目索引并持有租约；取到时已被关闭（等待加载期间被淘汰）的索引重新获取"""
+        for _ in range(3):
+            entry = await self._get_project_index(project_vector_storage_path)
+            if self._acquire_index(entry[0]):
+                break
+        else:
+            raise RuntimeError(f"项目索引在获取期间反复被关闭: {project_vector_storage_path}")
+        try:
+            yield entry
+        finally:
+            self._release_index(entry[0])
+
+    def _acquire_index(self, index: NativeVectorIndex) -> bool:
+        with self._lease_lock:
+            if index.closed:
+                return False
+            self._index_leases[id(index)] = self._index_leases.get(id(index), 0) + 1
+            return True
+
+    def _release_index(self, index: NativeVectorIndex) -> None:
+        with self._lease_lock:
+            remaining = self._index_leases.get(id(index), 0) - 1
+            if remaining > 0:
+                self._index_leases[id(index)] = remaining
+                return
+            self._index_leases.pop(id(index), None)
+            retired = self._retired_indexes.pop(id(index), None)
+        if retired is not None:
+            retired.close()
+
+    def _retire_index(self, index: NativeVectorIndex, defer: bool = False) -> None:
+        """关闭移出缓存的索引；仍有租约（或 defer）时登记为待关闭，最后一个租约归还时关闭"""
+        with self._lease_lock:
+            if defer or self._index_leases.get(id(index)):
+                self._retired_indexes[id(index)] = index
+                return
+        index.close()
     
     # ========== 📁 项目知识库管理功能 ==========
     
@@ -341,6 +752,20 @@ class HybridSearchService:
             logger.error(f"❌ 批量添加内容失败: {e}")
             return False
     
+    def remove_content_from_project(self, filename: str, project_vector_storage_path: str) -> bool:
+        """从项目知识库删除文件；下次检索时按清单仅移除该文件的向量"""
+        try:
+            file_path = Path(project_vector_storage_path) / filename
+            if not file_path.exists():
+                return False
+            file_path.unlink()
+            self.invalidate_project_cache(project_vector_storage_path)
+            logger.info(f"🗑️ 已从项目知识库删除文档: {filename}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ 从项目知识库删除文档失败: {e}")
+            return False
+    
     # 🗑️ 移除复杂的手动分块逻辑，统一使用MetaGPT原生SentenceSplitter
     # 这样与全局知识库保持一致，简化维护复杂度
     
@@ -4,10 +4,14 @@
 为所有action提供最智能的检索能力
 """
 
-from typing import List, Dict, Optional, Literal
+import asyncio
+from typing import List, Dict, Optional, Literal, Tuple
 from metagpt.logs import logger
 from .hybrid_search import hybrid_search
 from .knowledge_graph import performance_kg
+from backend.tools.lexical_index import reciprocal_rank_fusion
+from backend.tools.metadata_filter import FilterSpec
+from backend.tools.search_hit import SearchHit, as_hit
 from backend.config.global_prompts import (
     QUERY_INTENT_MAPPING,  # 查询意图关键词映射（reasoning/policy/method/...）
     SEARCH_MODE_WEIGHTS,   # 检索模式权重（vector/kg 权重）
@@ -43,7 +47,8 @@ class IntelligentSearchService:
         project_vector_storage_path: str = "",
         mode: Literal["vector", "knowledge_graph", "hybrid"] = "hybrid",
         enable_global: bool = True,
-        max_results: int = 5
+        max_results: int = 5,
+        filters: Optional[FilterSpec] = None,
     ) -> Dict[str, any]:
         """
         🧠 智能检索统一入口
@@ -54,6 +59,7 @@ class IntelligentSearchService:
             mode: 检索模式
             enable_global: 是否启用全局知识库
             max_results: 最大返回结果数
+            filters: 向量通道的元数据过滤（领域标签/年份区间/分类），见 hybrid_search.hybrid_search
             
         Returns:
             Dict包含results, mode_used, insights等
@@ -62,11 +68,13 @@ class IntelligentSearchService:
         
         try:
             if mode == "vector":
-                return await self._vector_search(query, project_vector_storage_path, enable_global, max_results)
+                return await self._vector_search(query, project_vector_storage_path, enable_global, max_results, filters)
             elif mode == "knowledge_graph":
                 return await self._knowledge_graph_search(query, project_vector_storage_path, max_results)
             elif mode == "hybrid":
-                return await self._hybrid_intelligent_search(query, project_vector_storage_path, enable_global, max_results)
+                return await self._hybrid_intelligent_search(
+                    query, project_vector_storage_path, enable_global, max_results, filters
+                )
             else:
                 raise ValueError(f"不支持的检索模式: {mode}")
                 
@@ -84,7 +92,8 @@ class IntelligentSearchService:
         query: str, 
         project_path: str, 
         enable_global: bool, 
-        max_results: int
+        max_results: int,
+        filters: Optional[FilterSpec] = None,
     ) -> Dict[str, any]:
         """📊 向量检索模式"""
         try:
@@ -93,7 +102,8 @@ class IntelligentSearchService:
                 project_vector_storage_path=project_path,
                 enable_global=enable_global,
                 global_top_k=max_results//2,
-                project_top_k=max_results//2
+                project_top_k=max_results//2,
+                filters=filters,
             )
             
             return {
@@ -139,7 +149,7 @@ class IntelligentSearchService:
             insights = self._extract_kg_insights(kg_result)
             
             return {
-                "results": [kg_result] if kg_result else [],
+                "results": [SearchHit(text=kg_result, score=1.0, source="knowledge_graph")] if kg_result else [],
                 "mode_used": "knowledge_graph",
                 "insights": insights,
                 "search_summary": f"知识图谱推理模式，查询: {query}",
@@ -157,7 +167,8 @@ class IntelligentSearchService:
         query: str, 
         project_path: str, 
         enable_global: bool, 
-        max_results: int
+        max_results: int,
+        filters: Optional[FilterSpec] = None,
     ) -> Dict[str, any]:
         """🚀 混合智能检索模式 - 多种方法结合"""
         logger.info("🚀 启动混合智能检索...")
@@ -174,12 +185,7 @@ class IntelligentSearchService:
         vector_w = float(SEARCH_MODE_WEIGHTS.get("vector", 0))
         kg_w = float(SEARCH_MODE_WEIGHTS.get("knowledge_graph", 0))
 
-        # 读取可配置的top_k（提供默认值）
-        try:
-            global_top_k = int(TOP_K.get("global_top_k", max_results // 2 or 2))
-            project_top_k = int(TOP_K.get("project_top_k", max_results - global_top_k or 4))
-        except Exception:
-            global_top_k, project_top_k = max_results // 2 or 2, max_results - (max_results // 2 or 2)
+        global_top_k, project_top_k = self._resolve_top_k(max_results)
 
         if vector_w > 0:
             # 在向量检索内部（hybrid_search）按 top_k 精细化控制项目/全局召回
@@ -191,6 +197,7 @@ class IntelligentSearchService:
                     enable_global=enable_global,
                     global_top_k=global_top_k,
                     project_top_k=project_top_k,
+                    filters=filters,
                 )
                 return {"results": results, "mode_used": "vector", "insights": [f"📊 Vector召回: 项目{project_top_k}, 全局{global_top_k}"]}
             tasks.append(_vector_adapter())
@@ -207,6 +214,77 @@ class IntelligentSearchService:
         
         return hybrid_result
     
+    async def intelligent_search_many(
+        self,
+        queries: List[str],
+        project_vector_storage_path: str = "",
+        mode: Literal["vector", "knowledge_graph", "hybrid"] = "hybrid",
+        enable_global: bool = True,
+        max_results: int = 5,
+        filters: Optional[FilterSpec] = None,
+    ) -> List[Dict[str, any]]:
+        """
+        🧠 批量智能检索：多个独立查询作为一次批量请求执行
+
+        - 向量通道：所有查询共用一次嵌入请求（hybrid_search_many）
+        - 知识图谱通道：按意图路由的查询并发执行
+        - 返回与 queries 顺序一致、格式与 intelligent_search 相同的结果
+        """
+        queries = list(queries or [])
+        if not queries:
+            return []
+        logger.info(f"🧠 批量智能检索开始: {len(queries)} 个查询, 模式: {mode}")
+        if mode != "hybrid":
+            return list(await asyncio.gather(*(
+                self.intelligent_search(q, project_vector_storage_path, mode, enable_global, max_results, filters)
+                for q in queries
+            )))
+
+        try:
+            strategies = [await self._analyze_query_intent(q) for q in queries]
+            vector_w = float(SEARCH_MODE_WEIGHTS.get("vector", 0))
+            kg_w = float(SEARCH_MODE_WEIGHTS.get("knowledge_graph", 0))
+            global_top_k, project_top_k = self._resolve_top_k(max_results)
+
+            async def _vector_many() -> List[Optional[Dict]]:
+                if vector_w <= 0:
+                    return [None] * len(queries)
+                result_lists = await hybrid_search.hybrid_search_many(
+                    queries,
+                    project_vector_storage_path,
+                    enable_global=enable_global,
+                    global_top_k=global_top_k,
+                    project_top_k=project_top_k,
+                    filters=filters,
+                )
+                insight = f"📊 Vector召回: 项目{project_top_k}, 全局{global_top_k}"
+                return [{"results": r, "mode_used": "vector", "insights": [insight]} for r in result_lists]
+
+            async def _kg_many() -> List[Optional[Dict]]:
+                async def _one(q: str, strategy: Dict) -> Optional[Dict]:
+                    if kg_w > 0 and strategy["use_kg"]:
+                        return await self._knowledge_graph_search(q, project_vector_storage_path, max_results)
+                    return None
+                return list(await asyncio.gather(*(_one(q, st) for q, st in zip(queries, strategies))))
+
+            vector_results, kg_results = await asyncio.gather(_vector_many(), _kg_many())
+            return [
+                await self._merge_search_results([r for r in (v, k) if r is not None], q, st)
+                for q, st, v, k in zip(queries, strategies, vector_results, kg_results)
+            ]
+        except Exception as e:
+            logger.error(f"❌ 批量智能检索失败: {e}")
+            return [{"results": [], "mode_used": "error", "error": str(e), "insights": []} for _ in queries]
+
+    def _resolve_top_k(self, max_results: int) -> Tuple[int, int]:
+        """读取可配置的top_k（提供默认值），返回 (global_top_k, project_top_k)"""
+        try:
+            global_top_k = int(TOP_K.get("global_top_k", max_results // 2 or 2))
+            project_top_k = int(TOP_K.get("project_top_k", max_results - global_top_k or 4))
+        except Exception:
+            global_top_k, project_top_k = max_results // 2 or 2, max_results - (max_results // 2 or 2)
+        return global_top_k, project_top_k
+
     async def _analyze_query_intent(self, query: str) -> Dict[str, bool]:
         """🧠 查询意图分析（配置驱动：QUERY_INTENT_MAPPING）"""
         strategy: Dict[str, bool | str] = {"use_kg": False, "query_type": "general"}
@@ -245,22 +323,26 @@ class IntelligentSearchService:
         query: str, 
         strategy: Dict
     ) -> Dict[str, any]:
-        """🧠 智能结果融合"""
-        merged_results = []
+        """🧠 智能结果融合：各通道结果按检索模式权重做倒数排名融合，按 node_id 去重"""
+        channel_hits: List[List[SearchHit]] = []
+        channel_weights: List[float] = []
         all_insights = []
         modes_used = []
         
         for result in search_results:
             if isinstance(result, dict) and not isinstance(result, Exception):
+                mode = result.get("mode_used", "vector")
                 if result.get("results"):
-                    merged_results.extend(result["results"])
+                    source = "knowledge_graph" if mode == "knowledge_graph" else "project"
+                    channel_hits.append([as_hit(r, source) for r in result["results"]])
+                    channel_weights.append(float(SEARCH_MODE_WEIGHTS.get(mode, 1.0) or 1.0))
                 if result.get("insights"):
                     all_insights.extend(result["insights"])
                 if result.get("mode_used"):
                     modes_used.append(result["mode_used"])
         
         # 🧠 结果去重和排序
-        unique_results = self._deduplicate_and_rank_results(merged_results, query)
+        unique_results = self._deduplicate_and_rank_results(channel_hits, channel_weights)
         
         # 🧠 生成综合洞察
         comprehensive_insights = self._generate_comprehensive_insights(
@@ -276,44 +358,25 @@ class IntelligentSearchService:
             "strategy_used": strategy
         }
     
-    def _deduplicate_and_rank_results(self, results: List[str], query: str) -> List[str]:
-        """🧠 结果去重和智能排序"""
-        if not results:
-            return []
-        
-        # 简单去重（基于内容相似度）
-        unique_results = []
-        for result in results:
-            # 检查是否与已有结果重复（简单字符串匹配）
-            is_duplicate = False
-            for existing in unique_results:
-                if len(result) > 50 and len(existing) > 50:
-                    # 检查长结果的重复度
-                    overlap = len(set(result.split()) & set(existing.split()))
-                    total_words = len(set(result.split()) | set(existing.split()))
-                    if overlap / total_words > 0.7:  # 70%重复度阈值
-                        is_duplicate = True
-                        break
-            
-            if not is_duplicate:
-                unique_results.append(result)
-        
-        # 简单排序：较长的、包含查询关键词的结果优先
-        query_keywords = set(query.lower().split())
-        
-        def relevance_score(text: str) -> float:
-            text_lower = text.lower()
-            keyword_matches = sum(1 for kw in query_keywords if kw in text_lower)
-            length_factor = min(len(text) / 1000, 1.0)  # 长度因子，最大1.0
-            return keyword_matches + length_factor
-        
-        unique_results.sort(key=relevance_score, reverse=True)
-        
-        return unique_results[:5]  # 返回最相关的5个结果
+    def _deduplicate_and_rank_results(
+        self, channel_hits: List[List[SearchHit]], weights: List[float], limit: int = 5
+    ) -> List[SearchHit]:
+        """🧠 结果去重和排序：按去重键（node_id / 文本哈希）合并，通道内按分数、通道间按加权排名融合，O(n)"""
+        by_key: Dict[str, SearchHit] = {}
+        ranked_keys = []
+        for hits in channel_hits:
+            keys = []
+            for hit in sorted(hits, key=lambda h: h.score, reverse=True):
+                if hit.text and hit.key not in by_key:
+                    by_key[hit.key] = hit
+                keys.append(hit.key)
+            ranked_keys.append(keys)
+        fused = reciprocal_rank_fusion(ranked_keys, weights=weights)
+        return [by_key[key].with_score(score) for key, score in fused if key in by_key][:limit]  # 返回最相关的5个结果
     
     def _generate_comprehensive_insights(
         self, 
-        results: List[str], 
+        results: List[SearchHit], 
         all_insights: List[str], 
         strategy: Dict, 
         query: str
@@ -26,6 +26,7 @@ except ImportError as e:
     logger.warning(f"⚠️ 知识图谱依赖不可用: {e}，将使用传统RAG检索")
 
 from .hybrid_search import hybrid_search
+from backend.tools.search_hit import format_hits
 from metagpt.config2 import Config
 from pathlib import Path
 
@@ -125,7 +126,7 @@ class PerformanceKnowledgeGraph:
                 enable_global=True,
                 global_top_k=max_knowledge_sequence
             )
-            return "\n".join(results) if results else "无可用结果"
+            return "\n".join(format_hits(results)) if results else "无可用结果"
             
         try:
             if not self._kg_index:
@@ -307,8 +308,8 @@ class PerformanceKnowledgeGraph:
         embed_config = yaml_config.get('embedding', {})
         
         # 🔧 按照阿里云官方文档使用OpenAI-Like方式创建图谱专用LLM
-        from llama_index.embeddings.dashscope import DashScopeEmbedding
         from llama_index.llms.openai_like import OpenAILike
+        from backend.tools.embeddings import create_embed_model
         
         # 创建知识图谱专用LLM - 使用qwen-flash快速低成本模型
         kg_llm = OpenAILike(
@@ -318,13 +319,12 @@ class PerformanceKnowledgeGraph:
             is_chat_model=True
         )
         
-        # 创建Embedding模型 - 复用embedding配置
-        embed_model = DashScopeEmbedding(
+        # 创建Embedding模型 - 复用embedding配置（接入切块嵌入缓存）
+        embed_model = create_embed_model(
             model_name=embed_config.get('model', 'text-embedding-v3'),  # text-embedding-v3
             api_key=embed_config.get('api_key', ''),
-            dashscope_api_key=embed_config.get('api_key', '')
+            dimensions=embed_config.get('dimensions', 1024),
         )
-        embed_model.embed_batch_size = 8
         
         return kg_llm, embed_model
     
@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+"""
+近似最近邻（ANN）索引：供大规模原生向量索引（全局知识库）使用
+- ivfpq: 倒排文件 + 乘积量化（numpy 实现，无额外依赖）；构建时训练粗聚类中心与子空间码本，
+  检索宽度为 nprobe（访问的倒排桶数）
+- hnsw: 分层可导航小世界图（需要 faiss）；检索宽度为 efSearch
+- pq: 乘积量化压缩（单桶 IVF-PQ，穷举扫描），每个向量 m 字节
+- fp16: float16 标量量化副本（穷举扫描），内存为 float32 的一半
+均只产生候选行号，最终距离由原生索引用内存映射的 float32 向量精确重排（只读取候选行）。
+训练得到的参数与检索宽度默认值随索引文件持久化。
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+ANN_TYPES = ("flat", "hnsw", "ivfpq", "pq", "fp16")
+PQ_CENTROIDS = 256          # 每个子空间的码字数（编码为 uint8）
+ASSIGN_CHUNK_ROWS = 16384   # k-means 分配时每次计算的行数（限制临时内存）
+
+
+def _sq_norms(x: np.ndarray) -> np.ndarray:
+    return np.einsum("ij,ij->i", x, x)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """最近中心下标（平方欧氏距离）"""
+    c_norms = _sq_norms(centroids)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), ASSIGN_CHUNK_ROWS):
+        chunk = x[start:start + ASSIGN_CHUNK_ROWS]
+        labels[start:start + len(chunk)] = np.argmin(c_norms[None, :] - 2.0 * chunk @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd k-means；空簇用随机样本重新播种"""
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    k = max(1, min(int(k), len(x)))
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(max(1, int(iters))):
+        labels = _assign(x, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), size=len(empty), replace=False)]
+    return centroids
+
+
+def _pq_subspaces(dims: int, m: int) -> int:
+    """不超过 m 且能整除维度的子空间数"""
+    m = max(1, min(int(m), dims))
+    while dims % m:
+        m -= 1
+    return m
+
+
+class IVFPQIndex:
+    """倒排文件 + 残差乘积量化；ids 为原生索引中的行号"""
+
+    kind = "ivfpq"
+    suffix = "npz"
+
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray, metric: str = "l2", nprobe: int = 16):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)   # (nlist, d)
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)   # (m, 256, d/m)
+        self.metric = metric
+        self.nprobe = int(nprobe)
+        self.m, _, self.dsub = self.codebooks.shape
+        self._codebooks_t = np.ascontiguousarray(self.codebooks.transpose(0, 2, 1))   # (m, d/m, 256)
+        self._codebook_norms = np.einsum("mkd,mkd->mk", self.codebooks, self.codebooks)
+        self.offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)    # 倒排桶在 codes/ids 中的起止
+        self.codes = np.zeros((0, self.m), dtype=np.uint8)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        metric: str = "l2",
+        nlist: int = 0,
+        m: int = 64,
+        nprobe: int = 16,
+        train_sample: int = 65536,
+        kmeans_iters: int = 20,
+        seed: int = 0,
+        **_: Any,
+    ) -> "IVFPQIndex":
+        """在（抽样的）向量上训练粗聚类中心与残差码本；nlist=0 时取 4·√n"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if train_sample and len(vectors) > train_sample:
+            sample = vectors[np.sort(rng.choice(len(vectors), size=int(train_sample), replace=False))]
+        nlist = int(nlist) or max(1, int(4 * np.sqrt(len(vectors))))
+        centroids = kmeans(sample, min(nlist, len(sample)), kmeans_iters, seed)
+        residuals = sample - centroids[_assign(sample, centroids)]
+        m = _pq_subspaces(vectors.shape[1], m)
+        dsub = vectors.shape[1] // m
+        codebooks = np.stack([
+            cls._fit_codebook(residuals[:, j * dsub:(j + 1) * dsub], kmeans_iters, seed + j) for j in range(m)
+        ])
+        return cls(centroids, codebooks, metric, nprobe)
+
+    @staticmethod
+    def _fit_codebook(sub: np.ndarray, iters: int, seed: int) -> np.ndarray:
+        codebook = kmeans(sub, PQ_CENTROIDS, iters, seed)
+        if len(codebook) < PQ_CENTROIDS:
+            # 样本少于码字数时补零码字，保持码本形状固定
+            codebook = np.vstack([codebook, np.zeros((PQ_CENTROIDS - len(codebook), sub.shape[1]), np.float32)])
+        return codebook
+
+    def encode(self, vectors: np.ndarray, lists: np.ndarray) -> np.ndarray:
+        residuals = np.asarray(vectors, dtype=np.float32) - self.centroids[lists]
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _assign(residuals[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        lists = _assign(vectors, self.centroids)
+        codes = self.encode(vectors, lists)
+        # 与已有条目合并后按倒排桶重新排序（构建时一次性写入）
+        all_lists = np.concatenate([np.repeat(np.arange(self.nlist), np.diff(self.offsets)), lists])
+        all_codes = np.vstack([self.codes, codes])
+        all_ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        order = np.argsort(all_lists, kind="stable")
+        self.codes, self.ids = all_codes[order], all_ids[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(all_lists, minlength=self.nlist))])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, queries: np.ndarray, candidates: int, breadth: Optional[int] = None) -> List[np.ndarray]:
+        """每个查询返回至多 candidates 个候选 id（按近似距离升序）"""
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = max(1, min(int(breadth or self.nprobe), self.nlist))
+        if self.metric == "ip":
+            coarse = -(queries @ self.centroids.T)
+        else:
+            coarse = _sq_norms(queries)[:, None] - 2.0 * queries @ self.centroids.T + _sq_norms(self.centroids)[None, :]
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < self.nlist else \
+            np.broadcast_to(np.arange(self.nlist), coarse.shape)
+        sub_index = np.arange(self.m)
+        results = []
+        for q, q_coarse, q_probes in zip(queries, coarse, probes):
+            if self.metric == "ip":
+                table = -(q.reshape(self.m, 1, self.dsub) @ self._codebooks_t)[:, 0, :]
+            dists, ids = [], []
+            for lst in q_probes:
+                start, end = self.offsets[lst], self.offsets[lst + 1]
+                if start == end:
+                    continue
+                if self.metric != "ip":
+                    # ||r - c||² = ||r||² - 2 r·c + ||c||²，逐子空间一次矩阵乘
+                    residual = (q - self.centroids[lst]).reshape(self.m, 1, self.dsub)
+                    table = self._codebook_norms - 2.0 * (residual @ self._codebooks_t)[:, 0, :]
+                    base = float(residual.ravel() @ residual.ravel())
+                else:
+                    base = q_coarse[lst]
+                dists.append(base + table[sub_index, self.codes[start:end]].sum(axis=1))
+                ids.append(self.ids[start:end])
+            if not dists:
+                results.append(np.zeros(0, dtype=np.int64))
+                continue
+            dist, cand = np.concatenate(dists), np.concatenate(ids)
+            if len(dist) > candidates:
+                keep = np.argpartition(dist, candidates - 1)[:candidates]
+                dist, cand = dist[keep], cand[keep]
+            results.append(cand[np.argsort(dist, kind="stable")])
+        return results
+
+    def params(self) -> Dict[str, Any]:
+        return {"nlist": self.nlist, "m": self.m, "nprobe": self.nprobe}
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, codebooks=self.codebooks, offsets=self.offsets,
+                     codes=self.codes, ids=self.ids)
+
+    @classmethod
+    def load(cls, path: Path, metric: str, params: Dict[str, Any]) -> "IVFPQIndex":
+        with np.load(path) as data:
+            index = cls(data["centroids"], data["codebooks"], metric, params.get("nprobe", 16))
+            index.offsets, index.codes, index.ids = data["offsets"], data["codes"], data["ids"]
+        return index
+
+
+class HNSWIndex:
+    """faiss HNSW 图索引；faiss 内部序号 -> 原生索引行号的映射另存为 .ids.npy"""
+
+    kind = "hnsw"
+    suffix = "faiss"
+
+    def __init__(self, index: Any, ids: np.ndarray, metric: str = "l2"):
+        self.index = index
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.metric = metric
+
+    @classmethod
+    def train(
+        cls, vectors: np.ndarray, metric: str = "l2", m: int = 32, ef_construction: int = 200,
+        ef_search: int = 64, **_: Any,
+    ) -> "HNSWIndex":
+        if not FAISS_AVAILABLE:
+            raise ImportError("hnsw 索引需要安装 faiss-cpu")
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+        index = faiss.IndexHNSWFlat(int(vectors.shape[1]), int(m), faiss_metric)
+        index.hnsw.efConstruction = int(ef_construction)
+        index.hnsw.efSearch = int(ef_search)
+        return cls(index, np.zeros(0, dtype=np.int64), metric)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, queries: np.ndarray, candidates: int, breadth: Optional[int] = None) -> List[np.ndarray]:
+        ef = int(breadth or self.index.hnsw.efSearch)
+        self.index.hnsw.efSearch = max(ef, candidates)
+        _, positions = self.index.search(np.ascontiguousarray(queries, dtype=np.float32), candidates)
+        return [self.ids[row[row >= 0]] for row in positions]
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "m": int(self.index.hnsw.nb_neighbors(1)),
+            "ef_construction": int(self.index.hnsw.efConstruction),
+            "ef_search": int(self.index.hnsw.efSearch),
+        }
+
+    def save(self, path: Path) -> None:
+        faiss.write_index(self.index, str(path))
+        with open(str(path) + ".ids.npy", "wb") as f:
+            np.save(f, self.ids)
+
+    @classmethod
+    def load(cls, path: Path, metric: str, params: Dict[str, Any]) -> "HNSWIndex":
+        if not FAISS_AVAILABLE:
+            raise ImportError("hnsw 索引需要安装 faiss-cpu")
+        index = faiss.read_index(str(path))
+        index.hnsw.efSearch = int(params.get("ef_search", 64))
+        return cls(index, np.load(str(path) + ".ids.npy"), metric)
+
+
+class PQIndex(IVFPQIndex):
+    """乘积量化：单个倒排桶（残差相对全体均值）的 IVF-PQ，查询穷举扫描全部编码"""
+
+    kind = "pq"
+
+    @classmethod
+    def train(
+        cls, vectors: np.ndarray, metric: str = "l2", m: int = 64, train_sample: int = 65536,
+        kmeans_iters: int = 20, seed: int = 0, **_: Any,
+    ) -> "PQIndex":
+        return super().train(
+            vectors, metric, nlist=1, m=m, nprobe=1, train_sample=train_sample, kmeans_iters=kmeans_iters, seed=seed
+        )
+
+    def params(self) -> Dict[str, Any]:
+        return {"m": self.m}
+
+
+class FP16Index:
+    """float16 标量量化副本，查询分块穷举扫描（块内转回 float32 计算）"""
+
+    kind = "fp16"
+    suffix = "npz"
+
+    def __init__(self, dims: int, metric: str = "l2"):
+        self.metric = metric
+        self.vectors = np.zeros((0, int(dims)), dtype=np.float16)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.norms = np.zeros(0, dtype=np.float32)   # 量化后向量的平方范数（l2 距离用，避免每次查询重算）
+        self._pending: List[tuple] = []   # 构建时分批 add，首次检索/保存时一次拼接
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, metric: str = "l2", **_: Any) -> "FP16Index":
+        return cls(np.asarray(vectors).shape[1], metric)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self._pending.append((np.asarray(vectors, dtype=np.float16), np.asarray(ids, dtype=np.int64)))
+
+    def _flush(self) -> None:
+        if self._pending:
+            self.vectors = np.vstack([self.vectors] + [v for v, _ in self._pending])
+            self.ids = np.concatenate([self.ids] + [i for _, i in self._pending])
+            self._pending = []
+            self._compute_norms()
+
+    def _compute_norms(self) -> None:
+        self.norms = np.concatenate([
+            _sq_norms(self.vectors[start:start + ASSIGN_CHUNK_ROWS].astype(np.float32))
+            for start in range(0, len(self.vectors), ASSIGN_CHUNK_ROWS)
+        ] or [np.zeros(0, dtype=np.float32)])
+
+    def __len__(self) -> int:
+        return len(self.ids) + sum(len(i) for _, i in self._pending)
+
+    def search(self, queries: np.ndarray, candidates: int, breadth: Optional[int] = None) -> List[np.ndarray]:
+        self._flush()
+        queries = np.asarray(queries, dtype=np.float32)
+        best_dist = np.zeros((len(queries), 0), dtype=np.float32)
+        best_pos = np.zeros((len(queries), 0), dtype=np.int64)
+        buffer = np.empty((min(ASSIGN_CHUNK_ROWS, len(self.ids)), self.vectors.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.ids), ASSIGN_CHUNK_ROWS):
+            chunk = buffer[:len(self.ids[start:start + ASSIGN_CHUNK_ROWS])]
+            np.copyto(chunk, self.vectors[start:start + len(chunk)])
+            dots = queries @ chunk.T
+            dist = -dots if self.metric == "ip" else self.norms[None, start:start + len(chunk)] - 2.0 * dots
+            best_dist = np.concatenate([best_dist, dist], axis=1)
+            best_pos = np.concatenate([best_pos, np.broadcast_to(np.arange(start, start + len(chunk)), dist.shape)], axis=1)
+            if best_dist.shape[1] > candidates:
+                keep = np.argpartition(best_dist, candidates - 1, axis=1)[:, :candidates]
+                best_dist = np.take_along_axis(best_dist, keep, axis=1)
+                best_pos = np.take_along_axis(best_pos, keep, axis=1)
+        order = np.argsort(best_dist, axis=1, kind="stable")
+        return [self.ids[pos[o]] for pos, o in zip(best_pos, order)]
+
+    def params(self) -> Dict[str, Any]:
+        return {}
+
+    def save(self, path: Path) -> None:
+        self._flush()
+        with open(path, "wb") as f:
+            np.savez(f, vectors=self.vectors, ids=self.ids)
+
+    @classmethod
+    def load(cls, path: Path, metric: str, params: Dict[str, Any]) -> "FP16Index":
+        with np.load(path) as data:
+            index = cls(data["vectors"].shape[1], metric)
+            index.vectors, index.ids = data["vectors"], data["ids"]
+        index._compute_norms()
+        return index
+
+
+_ANN_CLASSES = {"ivfpq": IVFPQIndex, "hnsw": HNSWIndex, "pq": PQIndex, "fp16": FP16Index}
+
+
+def create_ann(kind: str, train_vectors: np.ndarray, metric: str = "l2", **params: Any):
+    """按类型训练一个空的 ANN 索引（随后分批 add）"""
+    if kind not in _ANN_CLASSES:
+        raise ValueError(f"不支持的 ANN 索引类型: {kind}（可选 {', '.join(ANN_TYPES)}）")
+    return _ANN_CLASSES[kind].train(train_vectors, metric=metric, **params)
+
+
+def build_ann(kind: str, vectors: np.ndarray, ids: np.ndarray, metric: str = "l2", **params: Any):
+    """训练并写入全部向量"""
+    ann = create_ann(kind, vectors, metric, **params)
+    ann.add(vectors, ids)
+    return ann
+
+
+def load_ann(meta_path: Path):
+    """按 ann 元数据加载已持久化的 ANN 索引，返回 (ann, meta)"""
+    meta = json.loads(Path(meta_path).read_text(encoding="utf-8"))
+    cls = _ANN_CLASSES[meta["type"]]
+    return cls.load(Path(meta_path).parent / meta["file"], meta.get("metric", "l2"), meta.get("params", {})), meta
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+可复用的网页抓取会话池
+- 启动一个真实浏览器（playwright chromium）并常驻 size 个浏览器上下文循环复用，每个URL只新开/关闭一个标签页，
+  不再为每个URL启动浏览器进程
+- 按域名限制并发，避免同一站点被并发请求压垮或触发封禁；单页超时与抓取异常都会归还上下文
+- 未安装 playwright 时退化为 WebBrowserEngine 包装（每次抓取仍由引擎自行启动浏览器），此时仅起并发限制作用
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# launcher() -> (browser, shutdown)：browser 提供 new_context()/close()，shutdown 为停止驱动的协程函数（可为 None）
+BrowserLauncher = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class FetchedPage:
+    """抓取结果（字段与 MetaGPT WebPage 一致，调用方取 inner_text）；validators 为响应的 ETag / Last-Modified"""
+    url: str
+    inner_text: str
+    html: str = ""
+    validators: Dict[str, str] = field(default_factory=dict)
+
+
+async def _launch_chromium() -> Any:
+    playwright = await async_playwright().start()
+    try:
+        browser = await playwright.chromium.launch(headless=True)
+    except Exception:
+        await playwright.stop()
+        raise
+    return browser, playwright.stop
+
+
+def _default_engine_factory() -> Any:
+    from metagpt.tools.web_browser_engine import WebBrowserEngine
+    return WebBrowserEngine()
+
+
+class BrowserPool:
+    """浏览器会话池：一个浏览器、size 个常驻上下文共享，单域名最多 per_domain_limit 个并发抓取。"""
+
+    def __init__(
+        self,
+        size: int = 4,
+        per_domain_limit: int = 2,
+        page_timeout: float = 60.0,
+        launcher: Optional[BrowserLauncher] = None,
+        engine_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.size = max(1, int(size))
+        self.per_domain_limit = max(1, int(per_domain_limit))
+        self.page_timeout = float(page_timeout)
+        if launcher is None and engine_factory is None and PLAYWRIGHT_AVAILABLE:
+            launcher = _launch_chromium
+        self._launcher = launcher
+        self._engine_factory = engine_factory or _default_engine_factory
+        self._browser: Any = None
+        self._shutdown: Optional[Callable[[], Awaitable[Any]]] = None
+        self._sessions: List[Any] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._domain_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop = None
+        self.launches = 0
+
+    @property
+    def uses_browser_sessions(self) -> bool:
+        """是否持有真实浏览器会话（否则为 WebBrowserEngine 退化模式）"""
+        return self._launcher is not None
+
+    def _ensure_loop_state(self) -> None:
+        # 队列/信号量/浏览器都绑定事件循环：在新循环中使用时重建（旧循环的浏览器无法再驱动，丢弃后按需重启）
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._domain_semaphores = {}
+        self._idle = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
+        if self.uses_browser_sessions:
+            self._browser, self._shutdown, self._sessions = None, None, []
+            return
+        if not self._sessions:
+            self._sessions = [self._engine_factory() for _ in range(self.size)]
+        for engine in self._sessions:
+            self._idle.put_nowait(engine)
+
+    async def _ensure_started(self) -> None:
+        """首次抓取时启动浏览器并创建常驻上下文"""
+        if not self.uses_browser_sessions or self._browser is not None:
+            return
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+            launched = await self._launcher()
+            browser, shutdown = launched if isinstance(launched, tuple) else (launched, None)
+            sessions = [await browser.new_context() for _ in range(self.size)]
+            self._browser, self._shutdown, self._sessions = browser, shutdown, sessions
+            self.launches += 1
+            for session in sessions:
+                self._idle.put_nowait(session)
+
+    def _domain_semaphore(self, url: str) -> asyncio.Semaphore:
+        domain = (urlparse(url).netloc or "").lower()
+        sem = self._domain_semaphores.get(domain)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_domain_limit)
+            self._domain_semaphores[domain] = sem
+        return sem
+
+    def domain_slot(self, url: str) -> asyncio.Semaphore:
+        """按域名的并发槽位（async with 使用）：抓取之外对同一站点的请求（如缓存校验 HEAD）也计入上限"""
+        self._ensure_loop_state()
+        return self._domain_semaphore(url)
+
+    async def fetch(self, url: str) -> Any:
+        """借出一个会话抓取页面，完成或失败后归还；超时抛出 asyncio.TimeoutError。"""
+        self._ensure_loop_state()
+        async with self._domain_semaphore(url):
+            await self._ensure_started()
+            session = await self._idle.get()
+            try:
+                return await asyncio.wait_for(self._fetch_with(session, url), timeout=self.page_timeout)
+            finally:
+                self._idle.put_nowait(session)
+
+    async def _fetch_with(self, session: Any, url: str) -> Any:
+        if not self.uses_browser_sessions:
+            return await session.run(url)
+        page = await session.new_page()
+        try:
+            response = await page.goto(url, timeout=self.page_timeout * 1000, wait_until="domcontentloaded")
+            inner_text = await page.evaluate("() => document.body ? document.body.innerText : ''")
+            headers = (getattr(response, "headers", None) or {}) if response is not None else {}
+            validators = {"etag": headers.get("etag", ""), "last_modified": headers.get("last-modified", "")}
+            return FetchedPage(url=url, inner_text=inner_text or "", html=await page.content(), validators=validators)
+        finally:
+            await page.close()
+
+    async def close(self) -> None:
+        """关闭常驻上下文与浏览器（下次抓取时重新启动）"""
+        if not self.uses_browser_sessions or self._browser is None:
+            return
+        browser, shutdown, sessions = self._browser, self._shutdown, self._sessions
+        self._browser, self._shutdown, self._sessions = None, None, []
+        self._idle = asyncio.Queue()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception:
+                pass
+        try:
+            await browser.close()
+        finally:
+            if shutdown is not None:
+                await shutdown()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+切块嵌入向量持久化缓存（所有向量索引共用）
+- 键：(模型, 维度, 切块文本哈希)；同一切块无论被哪个索引、哪次构建使用，只调用一次嵌入 API
+- 存储：sqlite 记录 键 -> 行号；向量按命名空间（模型+维度）追加写入 float32 矩阵文件，读取时内存映射
+- 跨进程写入以 sqlite 事务（BEGIN IMMEDIATE）串行化，保证行号与矩阵文件一致
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from backend.config.performance_config import EMBEDDING_CACHE
+
+_FLOAT_BYTES = 4
+
+
+class _VectorFile:
+    """按行追加的 float32 矩阵文件，读取时内存映射（文件增长后重新映射）"""
+
+    def __init__(self, path: Path, dims: int):
+        self.path = path
+        self.dims = int(dims)
+        self.row_bytes = self.dims * _FLOAT_BYTES
+        self._mm: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._mapped_rows = 0
+
+    def rows_on_disk(self) -> int:
+        try:
+            return self.path.stat().st_size // self.row_bytes
+        except FileNotFoundError:
+            return 0
+
+    def append(self, vectors: Sequence[Sequence[float]]) -> int:
+        """追加向量，返回首行行号（调用方负责跨进程互斥）。"""
+        start = self.rows_on_disk()
+        data = array("f")
+        for vec in vectors:
+            if len(vec) != self.dims:
+                raise ValueError(f"向量维度不匹配: {len(vec)} != {self.dims}")
+            data.extend(float(x) for x in vec)
+        with open(self.path, "ab") as f:
+            # 截掉异常中断留下的半行，保证行对齐
+            f.truncate(start * self.row_bytes)
+            f.write(data.tobytes())
+        return start
+
+    def read(self, row: int) -> Optional[List[float]]:
+        if row >= self._mapped_rows:
+            self._remap()
+            if row >= self._mapped_rows:
+                return None
+        offset = row * self.dims
+        return self._view[offset:offset + self.dims].tolist()
+
+    def _remap(self) -> None:
+        self.close()
+        rows = self.rows_on_disk()
+        if rows == 0:
+            return
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), rows * self.row_bytes, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm).cast("f")
+        self._mapped_rows = rows
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._mapped_rows = 0
+
+
+class EmbeddingCache:
+    """(模型, 维度, 文本哈希) -> 向量 的本地持久化缓存"""
+
+    def __init__(self, cache_dir: str | Path):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.dir / "embeddings.sqlite3"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, text_hash TEXT NOT NULL, row INTEGER NOT NULL, "
+            "PRIMARY KEY (namespace, text_hash))"
+        )
+        self._files: Dict[str, _VectorFile] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def namespace(model: str, dims: int) -> str:
+        return f"{model}:{int(dims)}"
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    def _file(self, ns: str, dims: int) -> _VectorFile:
+        vf = self._files.get(ns)
+        if vf is None:
+            name = hashlib.sha1(ns.encode("utf-8")).hexdigest()[:16]
+            vf = _VectorFile(self.dir / f"vectors_{name}.f32", dims)
+            self._files[ns] = vf
+        return vf
+
+    def get_many(self, model: str, dims: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """按顺序返回缓存向量，未命中为 None。"""
+        ns = self.namespace(model, dims)
+        hashes = [self.text_hash(t) for t in texts]
+        with self._lock:
+            rows: Dict[str, int] = {}
+            unique = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for text_hash, row in self._conn.execute(
+                    f"SELECT text_hash, row FROM embeddings WHERE namespace = ? AND text_hash IN ({placeholders})",
+                    (ns, *chunk),
+                ):
+                    rows[text_hash] = int(row)
+            vf = self._file(ns, dims)
+            result = [vf.read(rows[h]) if h in rows else None for h in hashes]
+        found = sum(1 for v in result if v is not None)
+        self.hits += found
+        self.misses += len(result) - found
+        return result
+
+    def put_many(self, model: str, dims: int, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        ns = self.namespace(model, dims)
+        pending: Dict[str, Sequence[float]] = {}
+        for text, vec in zip(texts, vectors):
+            pending.setdefault(self.text_hash(text), vec)
+        if not pending:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = set()
+                hashes = list(pending)
+                for i in range(0, len(hashes), 500):
+                    chunk = hashes[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    existing.update(h for (h,) in self._conn.execute(
+                        f"SELECT text_hash FROM embeddings WHERE namespace = ? AND text_hash IN ({placeholders})",
+                        (ns, *chunk),
+                    ))
+                new_items = [(h, v) for h, v in pending.items() if h not in existing]
+                if new_items:
+                    start = self._file(ns, dims).append([v for _, v in new_items])
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (namespace, text_hash, row) VALUES (?, ?, ?)",
+                        [(ns, h, start + i) for i, (h, _) in enumerate(new_items)],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = int(self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            for vf in self._files.values():
+                vf.close()
+            self._conn.close()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """全局共享的嵌入缓存；配置关闭时返回 None。"""
+    global _embedding_cache
+    if not EMBEDDING_CACHE.get("enabled", True):
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(EMBEDDING_CACHE.get("dir", "workspace/.cache/embeddings"))
+    return _embedding_cache
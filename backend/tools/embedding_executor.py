@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+嵌入执行器：分批 + 并发 + 400 拆分重试
+- 按提供商单次条数与 token 上限贪心分批，多批同时在途（信号量 + 'embedding' 令牌桶限流）
+- 400/参数错误：只把被拒的批次对半拆分重试，不整体缩小批量；仅当 400 的错误码/信息明确为批量条数超限时，
+  被拒批次条数才记为后续分批的上限（文本过长等其他 400 不影响全局上限）
+- 返回结果不完整（条数与输入不一致，或含 None/空向量——DashScope 拒绝整批时不抛异常而是返回 [None] * n）：
+  视为该批失败，同样只拆分被拒批次重试；没有明确的条数超限错误码，不收紧全局上限
+- 限流/网络等临时错误：指数退避重试
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from backend.config.performance_config import EMBEDDING_EXECUTOR
+from backend.tools.prompt_packer import count_tokens, truncate_to_tokens
+from backend.tools.rate_limiter import get_rate_limiter, retry_async
+
+EmbedBatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+# 只认状态码字段（"status_code: 400" / "HTTP 400"）与提供商的参数错误码，不匹配信息中任意位置的 "400"
+_BAD_REQUEST_PATTERN = re.compile(
+    r"status(?:_code)?\W{0,3}400\b|\bHTTP(?:/[\d.]+)?\s+400\b|invalid_?parameter|bad request", re.IGNORECASE
+)
+# 批量条数超限（DashScope: InvalidParameter "batch size is invalid"；OpenAI 兼容接口: too many inputs）
+_BATCH_LIMIT_PATTERN = re.compile(
+    r"batch[ _]?size|too[ _]many[ _](?:inputs|items|texts)|input\S* (?:array|list) (?:is )?too long", re.IGNORECASE
+)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_bad_request(exc: BaseException) -> bool:
+    """判断是否为请求参数错误（批量过大/文本过长等），此类错误重试无意义，应拆分批次"""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 400
+    return bool(_BAD_REQUEST_PATTERN.search(str(exc)))
+
+
+def is_batch_limit_error(exc: BaseException) -> bool:
+    """400 且错误码/信息表明单次请求条数超限：只有这类错误说明提供商的批量上限低于配置值"""
+    if not is_bad_request(exc):
+        return False
+    code = getattr(exc, "code", None) or ""
+    return bool(_BATCH_LIMIT_PATTERN.search(f"{code} {exc}"))
+
+
+def _is_complete(vectors: Optional[Sequence[Optional[Sequence[float]]]], expected: int) -> bool:
+    """条数与输入一致且每条都是非空向量"""
+    if vectors is None or len(vectors) != expected:
+        return False
+    return all(vec is not None and len(vec) > 0 for vec in vectors)
+
+
+def _describe(vectors: Optional[Sequence[Optional[Sequence[float]]]]) -> str:
+    if vectors is None:
+        return "None"
+    invalid = sum(1 for vec in vectors if vec is None or not len(vec))
+    return f"{len(vectors)} 条（无效 {invalid} 条）"
+
+
+@dataclass
+class ExecutorStats:
+    requests: int = 0
+    items: int = 0
+    splits: int = 0
+    truncated: int = 0
+
+
+class EmbeddingExecutor:
+    """并发执行嵌入请求；embed_batch 为单次请求（一批文本 -> 向量）的异步函数"""
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        max_items_per_request: int = 10,
+        max_tokens_per_item: int = 8192,
+        max_tokens_per_request: int = 32000,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 10.0,
+        rate_limiter: str = "embedding",
+    ):
+        self._embed_batch = embed_batch
+        self.max_tokens_per_item = max(1, int(max_tokens_per_item))
+        self.item_limit = max(1, int(max_items_per_request))
+        self.token_limit = max(self.max_tokens_per_item, int(max_tokens_per_request))
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = int(max_retries)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self._limiter_name = rate_limiter
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self.stats = ExecutorStats()
+
+    @classmethod
+    def from_config(cls, embed_batch: EmbedBatchFn) -> "EmbeddingExecutor":
+        return cls(embed_batch, **EMBEDDING_EXECUTOR)
+
+    def plan_batches(self, token_counts: Sequence[int]) -> List[List[int]]:
+        """按条数/总 token 上限贪心分批，返回每批的文本下标"""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, tokens in enumerate(token_counts):
+            if current and (len(current) >= self.item_limit or current_tokens + tokens > self.token_limit):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def embed(self, texts: Sequence[str], embed_batch: Optional[EmbedBatchFn] = None) -> List[List[float]]:
+        """嵌入全部文本，返回与输入顺序一致的向量；embed_batch 可临时替换单次请求函数（如查询类型）"""
+        texts = [self._fit(t) for t in texts]
+        if not texts:
+            return []
+        token_counts = [count_tokens(t) for t in texts]
+        semaphore = self._get_semaphore()
+        call = embed_batch or self._embed_batch
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        async def run(indices: List[int]) -> None:
+            vectors = await self._embed_splitting(indices, texts, semaphore, call)
+            for i, vec in zip(indices, vectors):
+                results[i] = vec
+
+        await asyncio.gather(*(run(batch) for batch in self.plan_batches(token_counts)))
+        return results
+
+    def embed_sync(self, texts: Sequence[str], embed_batch: Optional[EmbedBatchFn] = None) -> List[List[float]]:
+        """同步入口：无运行中事件循环时直接运行，否则在独立线程的事件循环中运行"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.embed(texts, embed_batch))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.embed(texts, embed_batch)).result()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 同一执行器的并发调用共享在途请求上限；信号量绑定事件循环，跨 asyncio.run 时按当前循环重建
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _fit(self, text: str) -> str:
+        if count_tokens(text) <= self.max_tokens_per_item:
+            return text
+        self.stats.truncated += 1
+        return truncate_to_tokens(text, self.max_tokens_per_item)
+
+    async def _embed_splitting(
+        self,
+        indices: List[int],
+        texts: List[str],
+        semaphore: asyncio.Semaphore,
+        call: EmbedBatchFn,
+    ) -> List[List[float]]:
+        batch = [texts[i] for i in indices]
+        try:
+            vectors = await self._request(batch, semaphore, call)
+        except Exception as e:
+            if not is_bad_request(e) or len(indices) == 1:
+                raise
+            if is_batch_limit_error(e):
+                self._observe_rejected(len(indices))
+            return await self._split(indices, texts, semaphore, call)
+        if not _is_complete(vectors, len(batch)):
+            # 静默失败的批次（截断或含 None/空向量）：只在本批内拆分重试，单条仍失败时抛出
+            if len(indices) == 1:
+                raise ValueError(f"嵌入结果无效: 期望 1 条向量，得到 {_describe(vectors)}")
+            return await self._split(indices, texts, semaphore, call)
+        return vectors
+
+    async def _split(
+        self,
+        indices: List[int],
+        texts: List[str],
+        semaphore: asyncio.Semaphore,
+        call: EmbedBatchFn,
+    ) -> List[List[float]]:
+        self.stats.splits += 1
+        mid = len(indices) // 2
+        left, right = await asyncio.gather(
+            self._embed_splitting(indices[:mid], texts, semaphore, call),
+            self._embed_splitting(indices[mid:], texts, semaphore, call),
+        )
+        return left + right
+
+    async def _request(self, batch: List[str], semaphore: asyncio.Semaphore, call: EmbedBatchFn) -> List[List[float]]:
+        async def attempt() -> List[List[float]]:
+            async with semaphore:
+                await get_rate_limiter(self._limiter_name).acquire()
+                self.stats.requests += 1
+                return await call(batch)
+
+        vectors = await retry_async(
+            attempt,
+            retries=self.max_retries,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            should_retry=lambda e: not is_bad_request(e),
+        )
+        self.stats.items += len(batch)
+        return vectors
+
+    def _observe_rejected(self, items: int) -> None:
+        """因条数超限被拒的批次规模不再出现在后续分批中（仅收紧到被拒条数以下，不整体减半）"""
+        if items > 1:
+            self.item_limit = max(1, min(self.item_limit, items - 1))
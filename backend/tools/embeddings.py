@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+"""
+嵌入模型统一创建入口
+- create_embed_model: 按 config2.yaml 的 embedding_backend 选择提供商创建嵌入模型
+  （dashscope：远程 API，接入切块嵌入持久化缓存与嵌入执行器；local：本地哈希 n-gram，离线零成本）
+- register_embedding_provider: 注册其他嵌入提供商
+- with_embedding_cache: 为任意 llama-index 嵌入模型接入缓存与执行器（如 MetaGPT get_rag_embedding 的返回值）
+- embed_queries: 批量计算查询向量（DashScope 经显式构建的 query 文本类型模型，查询向量不进入切块缓存）
+"""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from backend.tools.embedding_cache import EmbeddingCache, get_embedding_cache
+from backend.tools.embedding_executor import EmbeddingExecutor
+from backend.tools.local_embedding import HashNgramEncoder
+
+DEFAULT_EMBED_DIMENSIONS = 1024  # text-embedding-v3
+DEFAULT_CONFIG_PATH = "config/config2.yaml"
+DEFAULT_EMBEDDING_PROVIDER = "dashscope"
+CACHE_LOOKUP_BATCH_SIZE = 256    # 缓存查找批大小；未命中部分由嵌入执行器按提供商上限分批并发请求
+
+
+class CachedEmbedding(BaseEmbedding):
+    """切块向量先查本地缓存（可关闭），未命中的切块经嵌入执行器分批并发调用内层模型；查询向量直接透传。
+
+    query_model 为与内层模型同一模型、query 文本类型的批量嵌入模型（DashScope 区分 query/document），供 embed_queries 使用。
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _query_model: Optional[BaseEmbedding] = PrivateAttr()
+    _cache: Optional[EmbeddingCache] = PrivateAttr()
+    _dimensions: int = PrivateAttr()
+    _executor: EmbeddingExecutor = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        cache: Optional[EmbeddingCache],
+        dimensions: int,
+        query_model: Optional[BaseEmbedding] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=CACHE_LOOKUP_BATCH_SIZE,
+            callback_manager=inner.callback_manager,
+            **kwargs,
+        )
+        self._inner = inner
+        self._query_model = query_model
+        self._cache = cache
+        self._dimensions = int(dimensions)
+        self._executor = EmbeddingExecutor.from_config(_batch_request(inner))
+        # 内层模型每次调用只发一个请求，分批由执行器负责
+        inner.embed_batch_size = max(inner.embed_batch_size, self._executor.item_limit)
+        if query_model is not None:
+            query_model.embed_batch_size = max(query_model.embed_batch_size, self._executor.item_limit)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    @property
+    def executor(self) -> EmbeddingExecutor:
+        return self._executor
+
+    @property
+    def query_model(self) -> Optional[BaseEmbedding]:
+        return self._query_model
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._inner.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        if missing:
+            fresh = self._executor.embed_sync([texts[i] for i in missing])
+            self._store(missing, texts, vectors, fresh)
+        return vectors
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        if missing:
+            fresh = await self._executor.embed([texts[i] for i in missing])
+            self._store(missing, texts, vectors, fresh)
+        return vectors
+
+    def _lookup(self, texts: List[str]):
+        if self._cache is None:
+            return [None] * len(texts), list(range(len(texts)))
+        vectors = self._cache.get_many(self.model_name, self._dimensions, texts)
+        return vectors, [i for i, v in enumerate(vectors) if v is None]
+
+    def _store(self, missing: List[int], texts: List[str], vectors: list, fresh: List[List[float]]) -> None:
+        if self._cache is not None:
+            self._cache.put_many(self.model_name, self._dimensions, [texts[i] for i in missing], fresh)
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec
+
+
+def _batch_request(embed_model: BaseEmbedding):
+    """单次嵌入请求：DashScope 等 SDK 为同步 HTTP 调用，放到线程中执行以便多批并发"""
+    async def request(batch: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(embed_model.get_text_embedding_batch, batch)
+    return request
+
+
+def with_embedding_cache(
+    embed_model: BaseEmbedding,
+    dimensions: int = DEFAULT_EMBED_DIMENSIONS,
+    query_model: Optional[BaseEmbedding] = None,
+) -> BaseEmbedding:
+    """接入切块嵌入缓存（配置关闭时仅接入执行器）；未给出 query_model 时按内层模型构建 query 文本类型的副本。"""
+    if isinstance(embed_model, CachedEmbedding):
+        return embed_model
+    return CachedEmbedding(
+        embed_model,
+        get_embedding_cache(),
+        dimensions or DEFAULT_EMBED_DIMENSIONS,
+        query_model=query_model or _dashscope_query_model(embed_model),
+    )
+
+
+class LocalHashEmbedding(BaseEmbedding):
+    """本地哈希字符 n-gram 嵌入（llama-index 适配）；查询与切块使用同一编码"""
+
+    _encoder: HashNgramEncoder = PrivateAttr()
+
+    def __init__(self, dimensions: int = DEFAULT_EMBED_DIMENSIONS, ngram_range=(1, 3), **kwargs: Any):
+        encoder = HashNgramEncoder(dimensions, tuple(ngram_range))
+        super().__init__(model_name=encoder.model_name, embed_batch_size=512, **kwargs)
+        self._encoder = encoder
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalHashEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._encoder.encode_one(query).tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._encoder.encode_one(text).tolist()
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._encoder.embed(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._encoder.embed(texts)
+
+
+# 提供商工厂：(model_name, api_key, dimensions, options) -> 嵌入模型
+EmbeddingProviderFactory = Callable[[str, str, int, Dict[str, Any]], BaseEmbedding]
+
+
+def _create_dashscope(model_name: str, api_key: str, dimensions: int, options: Dict[str, Any]) -> BaseEmbedding:
+    """官方 DashScopeEmbedding + 切块嵌入缓存与执行器"""
+    from llama_index.embeddings.dashscope import DashScopeEmbedding
+
+    embed_model = DashScopeEmbedding(
+        model_name=model_name,
+        api_key=api_key,
+        dashscope_api_key=api_key,  # DashScope专用参数
+    )
+    query_model = DashScopeEmbedding(
+        model_name=model_name,
+        api_key=api_key,
+        dashscope_api_key=api_key,
+        text_type="query",
+    )
+    return with_embedding_cache(embed_model, dimensions, query_model=query_model)
+
+
+def _create_local(model_name: str, api_key: str, dimensions: int, options: Dict[str, Any]) -> BaseEmbedding:
+    """本地计算无需缓存与限流；维度与 embedding.dimensions 一致，索引格式不变"""
+    return LocalHashEmbedding(dimensions=dimensions, ngram_range=options.get("ngram_range") or (1, 3))
+
+
+_PROVIDERS: Dict[str, EmbeddingProviderFactory] = {
+    "dashscope": _create_dashscope,
+    "local": _create_local,
+}
+_backend_configs: Dict[str, Dict[str, Any]] = {}
+
+
+def register_embedding_provider(name: str, factory: EmbeddingProviderFactory) -> None:
+    _PROVIDERS[name] = factory
+
+
+def get_embedding_backend(config_path: str | Path = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """读取 config2.yaml 顶层 embedding_backend 配置（缺省为 dashscope）"""
+    key = str(config_path)
+    if key not in _backend_configs:
+        backend: Dict[str, Any] = {}
+        try:
+            import yaml
+
+            with open(config_path, "r", encoding="utf-8") as f:
+                backend = (yaml.safe_load(f) or {}).get("embedding_backend") or {}
+        except Exception:
+            backend = {}
+        backend.setdefault("provider", DEFAULT_EMBEDDING_PROVIDER)
+        _backend_configs[key] = backend
+    return _backend_configs[key]
+
+
+def create_embed_model(
+    model_name: str,
+    api_key: str,
+    dimensions: int = DEFAULT_EMBED_DIMENSIONS,
+    provider: Optional[str] = None,
+    config_path: str | Path = DEFAULT_CONFIG_PATH,
+) -> BaseEmbedding:
+    """按配置的嵌入后端创建嵌入模型；provider 显式指定时优先。"""
+    backend = get_embedding_backend(config_path)
+    provider = provider or backend["provider"]
+    factory = _PROVIDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"未知的嵌入提供商: {provider}（可选: {', '.join(_PROVIDERS)}）")
+    return factory(model_name, api_key, dimensions or DEFAULT_EMBED_DIMENSIONS, backend.get(provider) or {})
+
+
+def _dashscope_query_model(embed_model: BaseEmbedding) -> Optional[BaseEmbedding]:
+    """DashScope 嵌入把文本类型存于私有属性 _text_type（model_copy 无法修改）：按同一模型与 API Key 显式构建 query 类型实例"""
+    if getattr(embed_model, "_text_type", None) != "document":
+        return None
+    try:
+        return type(embed_model)(
+            model_name=embed_model.model_name,
+            api_key=getattr(embed_model, "_api_key", None),
+            text_type="query",
+        )
+    except Exception:
+        return None
+
+
+def _query_request(embed_model: BaseEmbedding):
+    """无批量 query 模型时逐条调用 get_query_embedding（保证查询按 query 类型嵌入），同一批内并发"""
+    async def request(batch: List[str]) -> List[List[float]]:
+        return list(await asyncio.gather(*(asyncio.to_thread(embed_model.get_query_embedding, q) for q in batch)))
+    return request
+
+
+async def embed_queries(embed_model: BaseEmbedding, queries: List[str]) -> List[List[float]]:
+    """批量计算全部查询向量（绕过切块缓存；超出单次请求上限时由执行器分批并发）。
+
+    DashScope 经 query 文本类型的模型批量嵌入；其他接入缓存的模型逐条走 get_query_embedding；
+    本地哈希嵌入查询与切块同一编码，直接批量计算。
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        if embed_model.query_model is not None:
+            return await embed_model.executor.embed(list(queries), _batch_request(embed_model.query_model))
+        return await embed_model.executor.embed(list(queries), _query_request(embed_model.inner))
+    if isinstance(embed_model, LocalHashEmbedding) or not hasattr(embed_model, "aget_query_embedding"):
+        return await embed_model.aget_text_embedding_batch(list(queries))
+    return list(await asyncio.gather(*(embed_model.aget_query_embedding(q) for q in queries)))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+向量索引清单（manifest.json）
+- 记录索引中每个源文件的内容哈希与其切块节点 ID
+- 与当前目录内容比对得到 新增/变更/删除 文件，仅对这些文件重新切块、嵌入并就地更新向量
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_content_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_source_files(source_dir: Path, suffixes: Iterable[str] = (".md", ".txt")) -> Dict[str, str]:
+    """返回 {文件名: 内容哈希}（仅顶层目录，与索引构建的取文件范围一致）。"""
+    source_dir = Path(source_dir)
+    if not source_dir.is_dir():
+        return {}
+    suffixes = tuple(suffixes)
+    return {
+        fp.name: file_content_hash(fp)
+        for fp in sorted(source_dir.iterdir())
+        if fp.is_file() and fp.name.endswith(suffixes)
+    }
+
+
+@dataclass
+class ManifestDiff:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def to_embed(self) -> List[str]:
+        return self.added + self.changed
+
+    @property
+    def to_remove(self) -> List[str]:
+        return self.changed + self.removed
+
+
+class IndexManifest:
+    """索引目录下的文件清单：{文件名: {hash, node_ids, ref_doc_ids, updated_at}}"""
+
+    def __init__(self, index_dir: Path, files: Dict[str, dict] = None):
+        self.path = Path(index_dir) / MANIFEST_FILENAME
+        self.files: Dict[str, dict] = files or {}
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "IndexManifest":
+        path = Path(index_dir) / MANIFEST_FILENAME
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION and isinstance(data.get("files"), dict):
+                return cls(index_dir, data["files"])
+        except Exception:
+            pass
+        return cls(index_dir)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self.files}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+
+    def diff(self, current: Dict[str, str]) -> ManifestDiff:
+        """current: {文件名: 内容哈希}"""
+        result = ManifestDiff()
+        for name, digest in current.items():
+            entry = self.files.get(name)
+            if entry is None:
+                result.added.append(name)
+            elif entry.get("hash") != digest:
+                result.changed.append(name)
+            else:
+                result.unchanged.append(name)
+        result.removed = [name for name in self.files if name not in current]
+        return result
+
+    def node_ids(self, name: str) -> List[str]:
+        return list((self.files.get(name) or {}).get("node_ids", []))
+
+    def ref_doc_ids(self, name: str) -> List[str]:
+        return list((self.files.get(name) or {}).get("ref_doc_ids", []))
+
+    def set_file(self, name: str, digest: str, node_ids: List[str], ref_doc_ids: List[str]) -> None:
+        self.files[name] = {
+            "hash": digest,
+            "node_ids": list(node_ids),
+            "ref_doc_ids": list(dict.fromkeys(ref_doc_ids)),
+            "updated_at": time.time(),
+        }
+
+    def remove_file(self, name: str) -> None:
+        self.files.pop(name, None)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+基于 sqlite 的轻量持久化键值存储（进程内线程安全）
+供搜索结果缓存等本地缓存复用：值为文本（调用方自行 JSON 编码），带写入时间用于 TTL 判断
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+class SqliteKVStore:
+    """单表 sqlite 键值存储：key -> (value, created_at)"""
+
+    def __init__(self, path: str | Path, table: str = "kv"):
+        if not table.isidentifier():
+            raise ValueError(f"非法表名: {table}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """将任意可 JSON 序列化的键组成部分哈希为定长键。"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_with_time(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], float(row[1])) if row else None
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[str]:
+        """读取值；设置 max_age（秒）时，超龄记录视为不存在。"""
+        found = self.get_with_time(key)
+        if found is None:
+            return None
+        value, created_at = found
+        if max_age is not None and max_age >= 0 and time.time() - created_at > max_age:
+            return None
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def purge_older_than(self, max_age: float) -> int:
+        """删除超龄记录，返回删除条数。"""
+        with self._lock:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - max_age,)
+            )
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
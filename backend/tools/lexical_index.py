@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+词法检索辅助：中文友好的分词、编号类查询识别与倒数排名融合（RRF）
+- 分词：中文连续片段取字二元组（单字片段保留单字），英文/数字按整词，公文文号与指标编号整体成词
+- 编号类查询（如 豫政办〔2024〕42号、A101）只需词法命中，无需嵌入请求
+- 倒排索引由原生向量索引的 sqlite 文档库（FTS5，bm25 排序）维护，词项以十六进制编码存储，
+  绕过 FTS5 自带分词器，保证入库与查询使用同一套分词
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# 公文文号：发文机关代字 + 〔年份〕 + 序号 + 号（括号写法不一，统一归一化为 〔〕）
+_DOC_NUMBER = re.compile(
+    r"([一-鿿]{1,12})\s*[〔\[［【(（]\s*((?:19|20)\d{2})\s*[〕\]］】)）]\s*(\d{1,5})\s*号"
+)
+# 指标/条目编号：字母前缀 + 数字（A101、B-203、KPI12.3）
+_CODE = re.compile(r"(?<![A-Za-z0-9])([A-Za-z]{1,4})[-_]?(\d{1,6}(?:\.\d+)*)(?![A-Za-z0-9])")
+_CJK_RUN = re.compile(r"[一-鿿]+")
+_WORD = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_QUERY_SEPARATORS = re.compile(r"[\s,，、;；:：/|]+")
+
+DOC_NUMBER_PREFIX_MAX = 6   # 文号前缀最多保留的字数（正文中前面常连着“关于”“根据”等字）
+MAX_QUERY_TERMS = 64        # 单个查询参与匹配的词项上限
+
+
+def _doc_number_tokens(text: str, variants: bool) -> List[str]:
+    tokens = []
+    for prefix, year, seq in _DOC_NUMBER.findall(text):
+        suffix = f"〔{year}〕{int(seq)}号"
+        prefix = prefix[-DOC_NUMBER_PREFIX_MAX:]
+        if variants:
+            # 入库时登记不同长度的机关代字，查询只需与其中之一相同
+            tokens.extend(prefix[-n:] + suffix for n in range(1, len(prefix) + 1))
+        else:
+            tokens.append(prefix + suffix)
+    return tokens
+
+
+def identifier_tokens(text: str, variants: bool = False) -> List[str]:
+    """抽取编号类词项（归一化后）；variants=True 时为入库形式（文号登记多种前缀长度）"""
+    tokens = _doc_number_tokens(text or "", variants)
+    tokens.extend(f"{letters.lower()}{digits}" for letters, digits in _CODE.findall(text or ""))
+    return tokens
+
+
+def tokenize(text: str) -> List[str]:
+    """入库分词：中文字二元组 + 英文/数字整词 + 编号整词"""
+    lowered = (text or "").lower()
+    tokens: List[str] = []
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD.findall(lowered))
+    words = set(tokens)
+    tokens.extend(t for t in identifier_tokens(text, variants=True) if t not in words)
+    return tokens
+
+
+def is_identifier_query(query: str) -> bool:
+    """查询是否只由编号组成（去掉编号与分隔符后无剩余内容）"""
+    query = (query or "").strip()
+    if not query or not identifier_tokens(query):
+        return False
+    remainder = _CODE.sub(" ", _DOC_NUMBER.sub(" ", query))
+    return not _QUERY_SEPARATORS.sub("", remainder)
+
+
+def query_terms(query: str) -> List[str]:
+    """查询词项：编号类查询只匹配编号整词（精确），其余查询取分词结果"""
+    if is_identifier_query(query):
+        terms = identifier_tokens(query)
+    else:
+        terms = tokenize(query)
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+
+
+def encode_terms(terms: Sequence[str]) -> str:
+    """词项编码为 FTS5 unicode61 分词器不会再切分的形式（utf-8 十六进制）"""
+    return " ".join(t.encode("utf-8").hex() for t in terms)
+
+
+def match_expression(terms: Sequence[str]) -> str:
+    """词项 OR 组合的 FTS5 MATCH 表达式"""
+    return " OR ".join(f'"{t.encode("utf-8").hex()}"' for t in terms)
+
+
+def fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(body)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+FTS5_AVAILABLE = fts5_available()
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Hashable]],
+    weights: Optional[Sequence[float]] = None,
+    k: int = 60,
+) -> List[Tuple[Hashable, float]]:
+    """倒数排名融合：score(d) = Σ w_i / (k + rank_i(d))，rank 从 1 开始；同分时先出现者在前"""
+    weights = list(weights) if weights is not None else [1.0] * len(ranked_lists)
+    scores: Dict[Hashable, float] = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, key in enumerate(dict.fromkeys(ranked), start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+LLM 响应缓存与回放
+- 键：hash(model, system_msgs, prompt)，存储于本地 sqlite
+- 模式：
+  - off: 不使用缓存
+  - read_through: 命中直接返回，未命中调用 LLM 并写入
+  - record_only: 始终调用 LLM 并写入（覆盖旧记录），不读取
+  - replay: 严格回放，未命中抛出 LLMCacheMissError（用于确定性地基准测试非 LLM 部分）
+- CachedAskMixin: 混入 Action，统一接管 _aask（缓存未命中时经共享 'llm' 限流器调用；sqlite 读写在工作线程执行）
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from backend.config.performance_config import LLM_CACHE
+from backend.tools.kv_store import SqliteKVStore
+from backend.tools.rate_limiter import get_rate_limiter
+
+LLM_CACHE_MODES = ("off", "read_through", "record_only", "replay")
+
+
+class LLMCacheMissError(RuntimeError):
+    """严格回放模式下缓存未命中"""
+
+
+class LLMResponseCache:
+    """LLM 响应缓存（按模式决定读写行为）"""
+
+    def __init__(self, path: str, mode: str = "read_through"):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"不支持的LLM缓存模式: {mode}，可选: {LLM_CACHE_MODES}")
+        self.mode = mode
+        self._store = SqliteKVStore(path, table="llm_responses")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model: str, system_msgs: Optional[List[str]], prompt: str) -> str:
+        return SqliteKVStore.make_key(model or "", list(system_msgs or []), prompt)
+
+    def lookup(self, model: str, system_msgs: Optional[List[str]], prompt: str) -> Optional[str]:
+        """按模式查找缓存；replay 模式未命中时抛出 LLMCacheMissError。"""
+        if self.mode in ("off", "record_only"):
+            return None
+        value = self._store.get(self._key(model, system_msgs, prompt))
+        if value is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise LLMCacheMissError(f"LLM回放缓存未命中（model={model}, prompt前80字: {prompt[:80]!r}）")
+            return None
+        self.hits += 1
+        return value
+
+    def record(self, model: str, system_msgs: Optional[List[str]], prompt: str, response: str) -> None:
+        if self.mode in ("read_through", "record_only") and response is not None:
+            self._store.set(self._key(model, system_msgs, prompt), response)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "entries": len(self._store)}
+
+
+_default_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """按配置获取共享 LLM 缓存；模式可由环境变量 AUTOWRITER_LLM_CACHE_MODE 覆盖，off 时返回 None。"""
+    global _default_cache
+    mode = os.getenv("AUTOWRITER_LLM_CACHE_MODE") or LLM_CACHE.get("mode", "off")
+    if mode == "off":
+        return None
+    if _default_cache is None or _default_cache.mode != mode:
+        _default_cache = LLMResponseCache(
+            path=LLM_CACHE.get("path", "workspace/.cache/llm_cache.sqlite3"),
+            mode=mode,
+        )
+    return _default_cache
+
+
+class CachedAskMixin:
+    """混入到 Action 子类之前（class X(CachedAskMixin, Action)），为所有 _aask 调用接入缓存与共享限流。"""
+
+    def _llm_model_name(self) -> str:
+        llm = getattr(self, "llm", None)
+        model = getattr(llm, "model", None)
+        if not model:
+            model = getattr(getattr(llm, "config", None), "model", None)
+        return str(model or "")
+
+    async def _aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+        cache = get_llm_cache()
+        model = self._llm_model_name() if cache is not None else ""
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.lookup, model, system_msgs, prompt)
+            if cached is not None:
+                return cached
+
+        async with get_rate_limiter("llm"):
+            response = await super()._aask(prompt, system_msgs)
+
+        if cache is not None:
+            await asyncio.to_thread(cache.record, model, system_msgs, prompt, response)
+        return response
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+本地离线嵌入：哈希字符 n-gram 向量（纯 CPU，无网络、无调用费用）
+- 文本归一化后取 1~3 字符 n-gram，次线性词频（1 + log tf）按 n-gram 长度加权（近似 IDF：单字最常见、权重最低）
+- 特征哈希（crc32 取桶 + 符号位）投影到固定维度后 L2 归一化；无状态，查询与切块使用同一编码，无需拟合语料
+用于 CI 吞吐基准、内网离线部署与低成本粗筛；语义能力弱于远程模型，不宜与远程模型的索引混用
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class HashNgramEncoder:
+    """字符 n-gram 特征哈希编码器"""
+
+    def __init__(self, dimensions: int = 1024, ngram_range: Tuple[int, int] = (1, 3)):
+        self.dimensions = int(dimensions)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        if self.dimensions <= 0 or not 1 <= self.ngram_range[0] <= self.ngram_range[1]:
+            raise ValueError(f"无效的本地嵌入参数: dimensions={dimensions}, ngram_range={ngram_range}")
+
+    @property
+    def model_name(self) -> str:
+        lo, hi = self.ngram_range
+        return f"local-hash-ngram-{lo}-{hi}"
+
+    def _ngrams(self, text: str) -> Counter:
+        text = _WHITESPACE.sub(" ", (text or "").lower()).strip()
+        grams: Counter = Counter()
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+        return grams
+
+    def encode_one(self, text: str) -> np.ndarray:
+        grams = self._ngrams(text)
+        vec = np.zeros(self.dimensions, dtype=np.float32)
+        if not grams:
+            return vec
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        counts = np.fromiter(grams.values(), dtype=np.float32, count=len(grams))
+        lengths = np.fromiter((len(g) for g in grams), dtype=np.float32, count=len(grams))
+        signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+        weights = (1.0 + np.log(counts)) * lengths * signs
+        vec += np.bincount((hashes % np.uint64(self.dimensions)).astype(np.int64), weights=weights,
+                           minlength=self.dimensions).astype(np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """批量编码，返回 (len(texts), dimensions) 的 float32 矩阵"""
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.stack([self.encode_one(t) for t in texts])
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+按内存估算限额的 LRU/TTL 缓存（线程安全）
+- 每个条目登记估算字节数；总量超过上限或条目数超限时淘汰最久未使用的条目
+- 条目超过 TTL 未被访问即过期；淘汰/过期/失效时回调 on_evict(key, value, reason)
+- 统计命中、未命中、淘汰次数，被淘汰的条目由调用方按需从磁盘重新加载
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+EvictCallback = Callable[[Hashable, Any, str], None]
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size_bytes: int
+    last_access: float
+
+
+class BoundedLRUCache:
+    """LRU + TTL + 字节上限；最新写入的条目即使单独超限也会保留（保证可用）。"""
+
+    def __init__(
+        self,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_entries: int = 32,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[EvictCallback] = None,
+    ):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                evicted.append(self._remove(key, "ttl"))
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                entry.last_access = time.monotonic()
+                self._entries.move_to_end(key)
+        self._notify(evicted)
+        return entry.value if entry is not None else None
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def put(self, key: Hashable, value: Any, size_bytes: int = 0) -> None:
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                evicted.append(self._remove(key, "replaced"))
+            self._entries[key] = _Entry(value, max(0, int(size_bytes)), time.monotonic())
+            self._total_bytes += max(0, int(size_bytes))
+            evicted.extend(self._enforce_limits(keep=key))
+        self._notify(evicted)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """主动失效（如项目文档更新），触发 on_evict(reason='invalidate')。"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            item = self._remove(key, "invalidate")
+        self._notify([item])
+        return item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            items = [self._remove(k, "invalidate") for k in list(self._entries)]
+        self._notify(items)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - entry.last_access > self.ttl_seconds
+
+    def _remove(self, key: Hashable, reason: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size_bytes
+        if reason == "ttl":
+            self.expirations += 1
+        elif reason == "capacity":
+            self.evictions += 1
+        return key, entry.value, reason
+
+    def _enforce_limits(self, keep: Hashable) -> list:
+        evicted = [self._remove(k, "ttl") for k, e in list(self._entries.items()) if k != keep and self._expired(e)]
+        while len(self._entries) > 1 and (
+            self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            evicted.append(self._remove(oldest, "capacity"))
+        return evicted
+
+    def _notify(self, items: list) -> None:
+        # 回调在锁外执行，避免回调中再次访问缓存时死锁
+        if not self.on_evict:
+            return
+        for key, value, reason in items:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception:
+                pass
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+旁车元数据过滤（ragall.py 写入的 <文件>.meta.json：domain_tags / year / version / category）
+- MetadataFilter: 领域标签（任一命中）、年份区间（闭区间）、分类（任一命中）
+- MetadataIndex: 引擎打开时建立 文件 -> 元数据、文件 -> 行号 两张表，按过滤条件求候选行号，
+  向量/词法检索只对候选行打分（不是检索后再过滤）
+缺少某字段的文档在按该字段过滤时不命中；年份在建表时解析一次（接受 2021 / "2021" / "2021年"），
+无法解析的年份告警后视为缺失。
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+from metagpt.logs import logger
+
+SIDECAR_SUFFIX = ".meta.json"
+_YEAR_PATTERN = re.compile(r"\s*(\d{4})\s*年?\s*")
+
+
+def sidecar_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_suffix(path.suffix + SIDECAR_SUFFIX)
+
+
+def read_sidecar(path: Path) -> Dict[str, Any]:
+    """读取文档的旁车元数据；不存在或损坏时返回空字典"""
+    try:
+        data = json.loads(sidecar_path(path).read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def parse_year(value: Any) -> Optional[int]:
+    """旁车中的年份转为整数；缺失或无法解析时返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = _YEAR_PATTERN.fullmatch(str(value)) if isinstance(value, str) else None
+    return int(match.group(1)) if match else None
+
+
+def _as_tuple(value: Any) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(str(v) for v in value)
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """检索过滤条件；各条件之间为“且”关系"""
+    domain_tags: Tuple[str, ...] = ()
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    categories: Tuple[str, ...] = ()
+
+    @classmethod
+    def coerce(cls, value: Optional[FilterSpec]) -> Optional["MetadataFilter"]:
+        """接受 MetadataFilter 或字典：{"domain_tags"/"tags", "year_from", "year_to", "year", "category"/"categories"}，
+        year 可为单个年份或 (起, 止)。空条件返回 None（不过滤）。"""
+        if value is None or isinstance(value, MetadataFilter):
+            return None if value is None or value.is_empty else value
+        if not isinstance(value, dict):
+            raise TypeError(f"不支持的过滤条件类型: {type(value).__name__}")
+        year_from, year_to = value.get("year_from"), value.get("year_to")
+        year = value.get("year")
+        if isinstance(year, (list, tuple)):
+            year_from, year_to = (list(year) + [None, None])[:2]
+        elif year is not None:
+            year_from = year_to = year
+        spec = cls(
+            domain_tags=_as_tuple(value.get("domain_tags", value.get("tags"))),
+            year_from=None if year_from is None else int(year_from),
+            year_to=None if year_to is None else int(year_to),
+            categories=_as_tuple(value.get("categories", value.get("category"))),
+        )
+        return None if spec.is_empty else spec
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.domain_tags and not self.categories and self.year_from is None and self.year_to is None
+
+    def matches(self, meta: Dict[str, Any]) -> bool:
+        if self.categories and meta.get("category") not in self.categories:
+            return False
+        if self.domain_tags and not set(self.domain_tags) & set(_as_tuple(meta.get("domain_tags"))):
+            return False
+        if self.year_from is not None or self.year_to is not None:
+            year = parse_year(meta.get("year"))
+            if year is None:
+                return False
+            if self.year_from is not None and year < self.year_from:
+                return False
+            if self.year_to is not None and year > self.year_to:
+                return False
+        return True
+
+
+FilterSpec = Union[MetadataFilter, Dict[str, Any]]
+
+
+class MetadataIndex:
+    """文件级元数据 + 文件到索引行号的映射；候选行号按过滤条件缓存"""
+
+    def __init__(self, file_meta: Dict[str, Dict[str, Any]], file_rows: Dict[str, np.ndarray]):
+        self.file_meta = {name: self._normalize(name, meta) for name, meta in file_meta.items()}
+        self.file_rows = file_rows
+        self._cache: Dict[MetadataFilter, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, index: Any, documents: Iterable[Path], defaults: Optional[Dict[Path, Dict[str, Any]]] = None) -> "MetadataIndex":
+        """读取 documents 的旁车元数据（defaults 为按路径补充的缺省字段，如全局知识库的目录分类）"""
+        defaults = defaults or {}
+        file_meta: Dict[str, Dict[str, Any]] = {}
+        for path in documents:
+            meta = dict(defaults.get(Path(path), {}))
+            meta.update(read_sidecar(path))
+            file_meta[Path(path).name] = meta
+        return cls(file_meta, index.rows_by_file())
+
+    @staticmethod
+    def _normalize(name: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        """年份只在建表时解析一次；无法解析的年份告警并移除（按年份过滤时该文档不命中）"""
+        if meta.get("year") is None:
+            return meta
+        year = parse_year(meta["year"])
+        meta = dict(meta)
+        if year is None:
+            logger.warning(f"⚠️ 旁车元数据年份无法解析，按年份过滤时忽略该文档: {name} year={meta['year']!r}")
+            meta.pop("year")
+        else:
+            meta["year"] = year
+        return meta
+
+    def rows(self, spec: Optional[FilterSpec]) -> Optional[np.ndarray]:
+        """满足条件的行号（升序）；无过滤条件返回 None"""
+        spec = MetadataFilter.coerce(spec)
+        if spec is None:
+            return None
+        cached = self._cache.get(spec)
+        if cached is None:
+            parts = [
+                rows for name, rows in self.file_rows.items()
+                if spec.matches(self.file_meta.get(name, {}))
+            ]
+            cached = np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+            self._cache[spec] = cached
+        return cached
+
+    def __len__(self) -> int:
+        return len(self.file_meta)
@@ -0,0 +1,694 @@
+#!/usr/bin/env python
+"""
+原生向量索引（项目 / xsearch 索引共用的持久化格式）
+- vectors-<gen>.f32: float32 行主序向量矩阵，按行追加，检索时以内存映射打开（不整体读入内存）
+- docstore.sqlite3: 行号 -> 节点（node_id、文本、元数据），检索命中后按行号懒加载
+- native_index.json: 维度、度量方式与构建所用嵌入模型
+- ann_index.json + ann-<gen>.*: 可选的近似最近邻索引（hnsw / ivfpq）或压缩向量（pq / fp16），仅产生候选，
+  距离用原始向量精确重排
+- 文档库内的 lexical 表（FTS5）：切块分词后的 BM25 倒排索引，与向量在同一事务内增删
+冷启动只打开文件句柄，加载耗时与常驻内存不随语料规模增长；
+删除为墓碑标记，墓碑占比超过阈值时整理为新一代向量文件（sqlite 事务内切换代号，崩溃不会损坏索引）。
+可从 llama-index 的 JSON 持久化目录（default__vector_store.json + docstore.json + index_store.json）迁移。
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import sqlite3
+import struct
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.tools.ann_index import create_ann, load_ann
+from backend.tools.lexical_index import FTS5_AVAILABLE, encode_terms, match_expression, query_terms, tokenize
+
+NATIVE_INDEX_VERSION = 1
+META_FILENAME = "native_index.json"
+DOCSTORE_FILENAME = "docstore.sqlite3"
+ANN_META_FILENAME = "ann_index.json"
+LEGACY_FILES = ("default__vector_store.json", "docstore.json", "index_store.json")
+LEGACY_EXTRA_FILES = ("image__vector_store.json", "graph_store.json")
+
+COMPACT_DELETED_RATIO = 0.3   # 墓碑占比超过该值时整理向量文件
+SCAN_CHUNK_ROWS = 65536       # 暴力检索时每次映射计算的行数（限制临时内存）
+
+_FLOAT_BYTES = 4
+_LEXICAL_DDL = "CREATE VIRTUAL TABLE IF NOT EXISTS lexical USING fts5(node_id UNINDEXED, terms)"
+
+
+@dataclass
+class IndexedNode:
+    """索引中的一个切块"""
+    node_id: str
+    text: str
+    ref_doc_id: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    start_char_idx: Optional[int] = None
+    end_char_idx: Optional[int] = None
+
+
+class NativeVectorIndex:
+    """内存映射向量矩阵 + sqlite 文档库；distance 越小越相似（l2 为平方欧氏距离，ip 为负内积）"""
+
+    def __init__(self, index_dir: str | Path):
+        self.dir = Path(index_dir)
+        meta = json.loads((self.dir / META_FILENAME).read_text(encoding="utf-8"))
+        if meta.get("version") != NATIVE_INDEX_VERSION:
+            raise ValueError(f"不支持的索引版本: {meta.get('version')}")
+        self.dims = int(meta["dims"])
+        self.metric = meta.get("metric", "l2")
+        self.model: Optional[str] = meta.get("model")
+        self.closed = False
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.dir / DOCSTORE_FILENAME), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._matrix: Optional[np.memmap] = None
+        self._mapped: Tuple[int, int, int] = (-1, -1, -1)  # (代号, 行数, 墓碑数)
+        self._deleted: Optional[np.ndarray] = None
+        self.lexical_enabled = FTS5_AVAILABLE and self._ensure_lexical()
+        self._load_ann()
+
+    # ---------- 创建 / 打开 ----------
+
+    @staticmethod
+    def exists(index_dir: str | Path) -> bool:
+        index_dir = Path(index_dir)
+        return (index_dir / META_FILENAME).exists() and (index_dir / DOCSTORE_FILENAME).exists()
+
+    @classmethod
+    def create(
+        cls, index_dir: str | Path, dims: int, metric: str = "l2", model: Optional[str] = None
+    ) -> "NativeVectorIndex":
+        """创建空索引（覆盖目录中已有的原生索引文件）"""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        _remove_native_files(index_dir)
+        conn = sqlite3.connect(str(index_dir / DOCSTORE_FILENAME))
+        conn.executescript(
+            "CREATE TABLE nodes ("
+            " row INTEGER PRIMARY KEY, node_id TEXT UNIQUE, ref_doc_id TEXT, text TEXT NOT NULL DEFAULT '',"
+            " metadata TEXT NOT NULL DEFAULT '{}', start_char_idx INTEGER, end_char_idx INTEGER,"
+            " deleted INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX idx_nodes_ref_doc ON nodes(ref_doc_id);"
+            "CREATE INDEX idx_nodes_deleted ON nodes(deleted) WHERE deleted = 1;"
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "INSERT INTO meta (key, value) VALUES ('generation', '0');"
+        )
+        if FTS5_AVAILABLE:
+            conn.execute(_LEXICAL_DDL)
+        conn.commit()
+        conn.close()
+        tmp = index_dir / (META_FILENAME + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": NATIVE_INDEX_VERSION, "dims": int(dims), "metric": metric, "model": model}),
+            encoding="utf-8",
+        )
+        tmp.replace(index_dir / META_FILENAME)
+        return cls(index_dir)
+
+    @classmethod
+    def open_or_migrate(
+        cls, index_dir: str | Path, remove_legacy: bool = False, model: Optional[str] = None
+    ) -> Optional["NativeVectorIndex"]:
+        """打开原生索引；只有 llama-index JSON 索引时先迁移（model 记录为构建所用嵌入模型）。两者都不存在返回 None。"""
+        if cls.exists(index_dir):
+            return cls(index_dir)
+        if has_legacy_index(index_dir):
+            return migrate_llama_index(index_dir, remove_legacy=remove_legacy, model=model)
+        return None
+
+    def _ensure_lexical(self) -> bool:
+        """早于词法索引创建的文档库：一次性补建 lexical 表"""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'lexical'").fetchone():
+                return True
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(_LEXICAL_DDL)
+                rows = self._conn.execute("SELECT node_id, text FROM nodes WHERE deleted = 0").fetchall()
+                self._conn.executemany(
+                    "INSERT INTO lexical (node_id, terms) VALUES (?, ?)",
+                    [(node_id, encode_terms(tokenize(text))) for node_id, text in rows],
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except sqlite3.Error:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                return False
+
+    # ---------- 读取 ----------
+
+    def _generation(self) -> int:
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.dir / f"vectors-{generation}.f32"
+
+    def __len__(self) -> int:
+        """有效（未删除）向量数"""
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM nodes WHERE deleted = 0").fetchone()[0])
+
+    def _row_count(self) -> int:
+        row = self._conn.execute("SELECT MAX(row) FROM nodes").fetchone()[0]
+        return 0 if row is None else int(row) + 1
+
+    def _deleted_count(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM nodes WHERE deleted = 1").fetchone()[0])
+
+    def _matrix_view(self) -> Tuple[Optional[np.memmap], Optional[np.ndarray]]:
+        """当前代的向量矩阵（内存映射）与墓碑掩码；写入后按需重新映射"""
+        with self._lock:
+            state = (self._generation(), self._row_count(), self._deleted_count())
+            if state != self._mapped:
+                generation, rows, _ = state
+                self._matrix = None
+                if rows:
+                    self._matrix = np.memmap(
+                        self._vectors_path(generation), dtype=np.float32, mode="r", shape=(rows, self.dims)
+                    )
+                deleted = np.zeros(rows, dtype=bool)
+                for (row,) in self._conn.execute("SELECT row FROM nodes WHERE deleted = 1"):
+                    deleted[int(row)] = True
+                self._deleted = deleted
+                self._mapped = state
+            return self._matrix, self._deleted
+
+    def _distances(self, queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        dots = queries @ vectors.T
+        if self.metric == "ip":
+            return -dots
+        dist = np.einsum("ij,ij->i", queries, queries)[:, None] - 2.0 * dots + np.einsum("ij,ij->i", vectors, vectors)[None, :]
+        return np.maximum(dist, 0.0, out=dist)
+
+    def search(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        top_k: int = 5,
+        breadth: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """一次矩阵运算检索全部查询，返回每个查询的 [(行号, 距离)]（按距离升序）
+
+        建有当前代的 ANN 索引时先取近似候选再用原始向量精确重排（breadth 覆盖持久化的检索宽度），
+        ANN 构建之后追加的行仍做暴力检索。给定 rows（元数据预过滤的候选行）时只对这些行精确打分。
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dims)
+        matrix, deleted = self._matrix_view()
+        if matrix is None or top_k <= 0 or not len(queries):
+            return [[] for _ in range(len(queries))]
+        if rows is not None:
+            return self._scan_rows(queries, matrix, deleted, top_k, rows)
+        ann = self._current_ann()
+        if ann is None:
+            return self._scan(queries, matrix, deleted, top_k, 0)
+
+        covered = min(int(self._ann_meta["rows"]), matrix.shape[0])
+        tail = self._scan(queries, matrix, deleted, top_k, covered)
+        candidates = max(top_k, top_k * int(self._ann_meta.get("rescore_factor", 4)))
+        results = []
+        for q, rows, tail_hits in zip(queries, ann.search(queries, candidates, breadth), tail):
+            rows = np.unique(rows[(rows < covered)])
+            rows = rows[~deleted[rows]]
+            hits = list(tail_hits)
+            if len(rows):
+                dist = self._distances(q[None, :], np.asarray(matrix[rows]))[0]
+                hits.extend(zip(rows.tolist(), dist.tolist()))
+            results.append(sorted(hits, key=lambda h: h[1])[:top_k])
+        return results
+
+    def _scan(
+        self, queries: np.ndarray, matrix: np.memmap, deleted: np.ndarray, top_k: int, first_row: int
+    ) -> List[List[Tuple[int, float]]]:
+        """暴力检索 first_row 及之后的行（分块映射，限制临时内存）"""
+        best_dist = np.full((len(queries), 0), np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(first_row, matrix.shape[0], SCAN_CHUNK_ROWS):
+            chunk = np.asarray(matrix[start:start + SCAN_CHUNK_ROWS])
+            dist = self._distances(queries, chunk)
+            dist[:, deleted[start:start + chunk.shape[0]]] = np.inf
+            rows = np.broadcast_to(np.arange(start, start + chunk.shape[0]), dist.shape)
+            best_dist = np.concatenate([best_dist, dist], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_dist.shape[1] > top_k:
+                keep = np.argpartition(best_dist, top_k - 1, axis=1)[:, :top_k]
+                best_dist = np.take_along_axis(best_dist, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(best_dist, axis=1, kind="stable")
+        results = []
+        for dist_row, rows_row, order_row in zip(best_dist, best_rows, order):
+            results.append([
+                (int(rows_row[i]), float(dist_row[i])) for i in order_row if np.isfinite(dist_row[i])
+            ])
+        return results
+
+    def _scan_rows(
+        self, queries: np.ndarray, matrix: np.memmap, deleted: np.ndarray, top_k: int, rows: np.ndarray
+    ) -> List[List[Tuple[int, float]]]:
+        """只对给定行暴力检索（按块取行，限制临时内存）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < matrix.shape[0]]
+        rows = rows[~deleted[rows]]
+        hits: List[List[Tuple[int, float]]] = [[] for _ in range(len(queries))]
+        for start in range(0, len(rows), SCAN_CHUNK_ROWS):
+            chunk_rows = rows[start:start + SCAN_CHUNK_ROWS]
+            dist = self._distances(queries, np.asarray(matrix[chunk_rows]))
+            keep = min(top_k, len(chunk_rows))
+            best = np.argpartition(dist, keep - 1, axis=1)[:, :keep]
+            for q, cols in enumerate(best):
+                hits[q].extend(zip(chunk_rows[cols].tolist(), dist[q, cols].tolist()))
+        return [sorted(per_query, key=lambda h: h[1])[:top_k] for per_query in hits]
+
+    def rows_by_file(self) -> Dict[str, np.ndarray]:
+        """有效行按源文件名（节点元数据 file_name）分组，供元数据预过滤"""
+        grouped: Dict[str, List[int]] = {}
+        with self._lock:
+            for row, name in self._conn.execute(
+                "SELECT row, json_extract(metadata, '$.file_name') FROM nodes WHERE deleted = 0"
+            ):
+                grouped.setdefault(name or "", []).append(int(row))
+        return {name: np.asarray(rows, dtype=np.int64) for name, rows in grouped.items()}
+
+    def get_nodes(self, rows: Iterable[int]) -> Dict[int, IndexedNode]:
+        """按行号懒加载节点"""
+        rows = list(dict.fromkeys(int(r) for r in rows))
+        found: Dict[int, IndexedNode] = {}
+        with self._lock:
+            for i in range(0, len(rows), 500):
+                chunk = rows[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row, node_id, ref_doc_id, text, metadata, start, end in self._conn.execute(
+                    "SELECT row, node_id, ref_doc_id, text, metadata, start_char_idx, end_char_idx "
+                    f"FROM nodes WHERE deleted = 0 AND row IN ({placeholders})",
+                    chunk,
+                ):
+                    found[int(row)] = IndexedNode(node_id, text, ref_doc_id, json.loads(metadata or "{}"), start, end)
+        return found
+
+    def query(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        top_k: int = 5,
+        breadth: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[IndexedNode, float]]]:
+        """检索并加载命中节点：每个查询返回 [(节点, 距离)]"""
+        hits = self.search(query_vectors, top_k, breadth, rows)
+        nodes = self.get_nodes(row for per_query in hits for row, _ in per_query)
+        return [[(nodes[row], dist) for row, dist in per_query if row in nodes] for per_query in hits]
+
+    def lexical_query(
+        self, queries: Sequence[str], top_k: int = 5, rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[IndexedNode, float]]]:
+        """BM25 词法检索：每个查询返回 [(节点, bm25 值)]（FTS5 的 bm25 越小越相关），无需嵌入；rows 限定候选行"""
+        results: List[List[Tuple[IndexedNode, float]]] = []
+        row_clause, row_args = "", ()
+        if rows is not None:
+            row_clause, row_args = " AND n.row IN (SELECT value FROM json_each(?))", (json.dumps(np.asarray(rows).tolist()),)
+        for query in queries:
+            terms = query_terms(query) if self.lexical_enabled and top_k > 0 and (rows is None or len(rows)) else []
+            if not terms:
+                results.append([])
+                continue
+            with self._lock:
+                found = self._conn.execute(
+                    "SELECT n.node_id, n.ref_doc_id, n.text, n.metadata, n.start_char_idx, n.end_char_idx, "
+                    "bm25(lexical) AS score FROM lexical JOIN nodes n ON n.node_id = lexical.node_id "
+                    f"WHERE lexical MATCH ? AND n.deleted = 0{row_clause} ORDER BY score LIMIT ?",
+                    (match_expression(terms), *row_args, int(top_k)),
+                ).fetchall()
+            results.append([
+                (IndexedNode(node_id, text, ref_doc_id, json.loads(metadata or "{}"), start, end), float(score))
+                for node_id, ref_doc_id, text, metadata, start, end, score in found
+            ])
+        return results
+
+    # ---------- 写入 ----------
+
+    def add(self, nodes: Sequence[IndexedNode], vectors: Sequence[Sequence[float]]) -> List[int]:
+        """追加节点与向量；同 node_id 的旧节点先标记删除。返回新行号。"""
+        if len(nodes) != len(vectors):
+            raise ValueError(f"节点数与向量数不一致: {len(nodes)} != {len(vectors)}")
+        if not nodes:
+            return []
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(nodes), -1)
+        if matrix.shape[1] != self.dims:
+            raise ValueError(f"向量维度不匹配: {matrix.shape[1]} != {self.dims}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._mark_deleted([n.node_id for n in nodes])
+                start = self._row_count()
+                with open(self._vectors_path(self._generation()), "ab") as f:
+                    # 截掉未提交写入留下的尾部，保证行号与 sqlite 一致
+                    f.truncate(start * self.dims * _FLOAT_BYTES)
+                    f.write(matrix.tobytes())
+                rows = list(range(start, start + len(nodes)))
+                self._conn.executemany(
+                    "INSERT INTO nodes (row, node_id, ref_doc_id, text, metadata, start_char_idx, end_char_idx) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (row, n.node_id, n.ref_doc_id, n.text or "", json.dumps(n.metadata or {}, ensure_ascii=False),
+                         n.start_char_idx, n.end_char_idx)
+                        for row, n in zip(rows, nodes)
+                    ],
+                )
+                if self.lexical_enabled:
+                    self._conn.executemany(
+                        "INSERT INTO lexical (node_id, terms) VALUES (?, ?)",
+                        [(n.node_id, encode_terms(tokenize(n.text or ""))) for n in nodes],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def delete(self, node_ids: Iterable[str]) -> int:
+        """按 node_id 删除（墓碑标记），墓碑过多时自动整理。返回删除数。"""
+        node_ids = [n for n in dict.fromkeys(node_ids) if n]
+        if not node_ids:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = self._mark_deleted(node_ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            total = self._row_count()
+            if total and self._deleted_count() / total > COMPACT_DELETED_RATIO:
+                self.compact()
+        return removed
+
+    def _mark_deleted(self, node_ids: Sequence[str]) -> int:
+        removed = 0
+        for i in range(0, len(node_ids), 500):
+            chunk = list(node_ids[i:i + 500])
+            placeholders = ",".join("?" * len(chunk))
+            if self.lexical_enabled:
+                self._conn.execute(f"DELETE FROM lexical WHERE node_id IN ({placeholders})", chunk)
+            # 释放 node_id 唯一约束，便于同 ID 节点重新写入
+            removed += self._conn.execute(
+                f"UPDATE nodes SET deleted = 1, node_id = NULL, text = '', metadata = '{{}}' "
+                f"WHERE deleted = 0 AND node_id IN ({placeholders})",
+                chunk,
+            ).rowcount
+        return removed
+
+    def compact(self) -> None:
+        """去除墓碑：有效向量写入新一代文件，在同一 sqlite 事务内重排行号并切换代号"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = self._generation()
+                rows = self._row_count()
+                live = [int(r) for (r,) in self._conn.execute("SELECT row FROM nodes WHERE deleted = 0 ORDER BY row")]
+                new_path = self._vectors_path(generation + 1)
+                with open(new_path, "wb") as f:
+                    if live:
+                        old = np.memmap(
+                            self._vectors_path(generation), dtype=np.float32, mode="r", shape=(rows, self.dims)
+                        )
+                        for i in range(0, len(live), SCAN_CHUNK_ROWS):
+                            f.write(np.asarray(old[live[i:i + SCAN_CHUNK_ROWS]]).tobytes())
+                        del old
+                self._conn.execute("DELETE FROM nodes WHERE deleted = 1")
+                # 升序重排：第 k 个有效行移到 k，目标行号不会被尚未处理的行占用
+                self._conn.executemany(
+                    "UPDATE nodes SET row = ? WHERE row = ?", [(new, old_row) for new, old_row in enumerate(live)]
+                )
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (str(generation + 1),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._vectors_path(generation + 1).unlink(missing_ok=True)
+                raise
+            self._matrix = None
+            self._mapped = (-1, -1, -1)
+            self._vectors_path(generation).unlink(missing_ok=True)
+            # 行号已重排，旧 ANN 索引作废（需重新 build_ann）
+            self._remove_ann_files()
+
+    # ---------- ANN ----------
+
+    def _load_ann(self) -> None:
+        self._ann, self._ann_meta = None, None
+        meta_path = self.dir / ANN_META_FILENAME
+        if not meta_path.exists():
+            return
+        try:
+            self._ann, self._ann_meta = load_ann(meta_path)
+        except (ImportError, OSError, ValueError, KeyError):
+            # 例如 hnsw 索引在未安装 faiss 的环境中打开：退回暴力检索
+            self._ann, self._ann_meta = None, None
+
+    def _current_ann(self):
+        """与当前代一致的 ANN 索引（整理后代号变化，旧 ANN 作废）"""
+        with self._lock:
+            if self._ann is None or self._ann_meta.get("generation") != self._generation():
+                return None
+            return self._ann
+
+    def ann_info(self) -> Dict[str, Any]:
+        """ANN 索引概况（类型、训练参数、覆盖行数、构建后追加的行数）；无 ANN 时 type 为 flat"""
+        if self._current_ann() is None:
+            return {"type": "flat"}
+        info = {key: self._ann_meta[key] for key in ("type", "params", "rows", "rescore_factor") if key in self._ann_meta}
+        with self._lock:
+            info["uncovered_rows"] = max(0, self._row_count() - int(self._ann_meta["rows"]))
+        return info
+
+    def build_ann(
+        self, kind: str = "flat", rescore_factor: int = 4, train_sample: int = 65536, seed: int = 0, **params: Any
+    ) -> Dict[str, Any]:
+        """在当前代的有效向量上训练并构建 ANN 索引（flat 表示删除 ANN，使用精确检索）；返回 ann_info"""
+        with self._lock:
+            self._remove_ann_files()
+            if kind == "flat":
+                return self.ann_info()
+            matrix, deleted = self._matrix_view()
+            live = np.flatnonzero(~deleted) if matrix is not None else np.zeros(0, dtype=np.int64)
+            if not len(live):
+                return self.ann_info()
+            rng = np.random.default_rng(seed)
+            sample = live if len(live) <= train_sample else np.sort(rng.choice(live, size=train_sample, replace=False))
+            if kind == "ivfpq" and not params.get("nlist"):
+                params["nlist"] = max(1, int(4 * np.sqrt(len(live))))  # 按全部有效行数而非训练样本数取桶数
+            ann = create_ann(kind, np.asarray(matrix[sample]), metric=self.metric, seed=seed, **params)
+            for i in range(0, len(live), SCAN_CHUNK_ROWS):
+                rows = live[i:i + SCAN_CHUNK_ROWS]
+                ann.add(np.asarray(matrix[rows]), rows)
+            generation = self._generation()
+            filename = f"ann-{generation}.{ann.suffix}"
+            ann.save(self.dir / filename)
+            meta = {
+                "type": kind,
+                "file": filename,
+                "metric": self.metric,
+                "generation": generation,
+                "rows": int(matrix.shape[0]),
+                "rescore_factor": int(rescore_factor),
+                "params": ann.params(),
+            }
+            tmp = self.dir / (ANN_META_FILENAME + ".tmp")
+            tmp.write_text(json.dumps(meta), encoding="utf-8")
+            tmp.replace(self.dir / ANN_META_FILENAME)
+            self._ann, self._ann_meta = ann, meta
+            return self.ann_info()
+
+    def _remove_ann_files(self) -> None:
+        self._ann, self._ann_meta = None, None
+        (self.dir / ANN_META_FILENAME).unlink(missing_ok=True)
+        for path in self.dir.glob("ann-*"):
+            path.unlink(missing_ok=True)
+
+    # ---------- 其他 ----------
+
+    def estimated_bytes(self) -> int:
+        """检索时常驻内存的字节数（用于引擎缓存的内存估算）
+
+        无 ANN 时为整个向量文件（暴力检索逐行映射）；有 ANN 时为 ANN 文件 + 构建后追加的尾部行，
+        float32 向量只按候选行读取重排，不计入。
+        """
+        try:
+            if self._current_ann() is None:
+                return self._vectors_path(self._generation()).stat().st_size
+            size = (self.dir / self._ann_meta["file"]).stat().st_size
+        except OSError:
+            return 0
+        return size + self.ann_info()["uncovered_rows"] * self.dims * _FLOAT_BYTES
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._matrix = None
+            self._conn.close()
+
+
+# ========== llama-index JSON 索引迁移 ==========
+
+def has_legacy_index(index_dir: str | Path) -> bool:
+    return all((Path(index_dir) / name).exists() for name in LEGACY_FILES)
+
+
+def _read_faiss_flat(path: Path) -> Tuple[np.ndarray, str]:
+    """读取 FAISS IndexFlat 二进制（llama-index 以 .json 文件名保存），无需安装 faiss"""
+    data = path.read_bytes()
+    magic = data[:4]
+    if magic in (b"IxF2", b"IxFI"):
+        dims, ntotal = struct.unpack_from("<iq", data, 4)
+        # 头部: magic, d(int32), ntotal(int64), 2×int64 占位, is_trained(uint8), metric_type(int32)
+        offset = 4 + 4 + 8 + 8 + 8 + 1 + 4
+        (count,) = struct.unpack_from("<Q", data, offset)
+        offset += 8
+        if count != dims * ntotal:
+            raise ValueError(f"FAISS 索引向量长度异常: {count} != {dims}×{ntotal}")
+        vectors = np.frombuffer(data, dtype=np.float32, count=count, offset=offset).reshape(ntotal, dims)
+        return vectors, "l2" if magic == b"IxF2" else "ip"
+    import faiss  # 非 Flat 类型的索引需要 faiss 还原向量
+
+    index = faiss.read_index(str(path))
+    metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    return index.reconstruct_n(0, index.ntotal), metric
+
+
+def _legacy_nodes_dict(index_dir: Path) -> Dict[int, str]:
+    data = json.loads((index_dir / "index_store.json").read_text(encoding="utf-8"))
+    for struct_info in data.get("index_store/data", {}).values():
+        if struct_info.get("__type__") == "vector_store":
+            payload = struct_info.get("__data__")
+            payload = json.loads(payload) if isinstance(payload, str) else payload
+            return {int(pos): node_id for pos, node_id in (payload.get("nodes_dict") or {}).items()}
+    raise ValueError("index_store.json 中没有向量索引结构")
+
+
+def _legacy_node(node_id: str, record: dict) -> IndexedNode:
+    data = record.get("__data__", {})
+    data = json.loads(data) if isinstance(data, str) else data
+    source = (data.get("relationships") or {}).get("1") or {}
+    return IndexedNode(
+        node_id=node_id,
+        text=data.get("text", ""),
+        ref_doc_id=source.get("node_id"),
+        metadata=data.get("metadata") or {},
+        start_char_idx=data.get("start_char_idx"),
+        end_char_idx=data.get("end_char_idx"),
+    )
+
+
+def migrate_llama_index(
+    index_dir: str | Path, remove_legacy: bool = False, model: Optional[str] = None
+) -> NativeVectorIndex:
+    """把 llama-index JSON 持久化目录转换为原生索引（保留 node_id，清单中的节点记录仍然有效）
+
+    先在同级的 <目录名>.migrating 中构建并校验可打开，成功后才把原生文件移入原目录（元数据文件最后移入，
+    中途失败不会留下半成品索引）；默认保留 JSON 文件，删除原生文件即可回退。
+    model 为旧索引所用的嵌入模型，记录后切换嵌入后端时能检测到向量不可比。
+    """
+    index_dir = Path(index_dir)
+    vectors, metric = _read_faiss_flat(index_dir / "default__vector_store.json")
+    nodes_dict = _legacy_nodes_dict(index_dir)
+    docstore = json.loads((index_dir / "docstore.json").read_text(encoding="utf-8")).get("docstore/data", {})
+
+    staging = index_dir.with_name(index_dir.name + ".migrating")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        index = NativeVectorIndex.create(staging, vectors.shape[1] if vectors.size else 0, metric=metric, model=model)
+        try:
+            nodes, kept = [], []
+            for pos in range(vectors.shape[0]):
+                node_id = nodes_dict.get(pos)
+                if node_id and node_id in docstore:
+                    nodes.append(_legacy_node(node_id, docstore[node_id]))
+                    kept.append(pos)
+            if nodes:
+                index.add(nodes, vectors[kept])
+        finally:
+            index.close()
+        NativeVectorIndex(staging).close()
+        install_staged_index(staging, index_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    if remove_legacy:
+        for name in LEGACY_FILES + LEGACY_EXTRA_FILES:
+            (index_dir / name).unlink(missing_ok=True)
+    return NativeVectorIndex(index_dir)
+
+
+def _remove_native_files(index_dir: Path, keep_meta: bool = True) -> None:
+    """删除目录中的原生索引文件（文档库、向量、ANN），JSON 旧索引等其他文件不动"""
+    paths = [index_dir / DOCSTORE_FILENAME, index_dir / ANN_META_FILENAME,
+             *index_dir.glob("vectors-*.f32"), *index_dir.glob("ann-*")]
+    paths += [index_dir / (DOCSTORE_FILENAME + suffix) for suffix in ("-wal", "-shm")]
+    if not keep_meta:
+        paths.insert(0, index_dir / META_FILENAME)
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def install_staged_index(staging: str | Path, index_dir: str | Path) -> None:
+    """把在 staging 中构建完成（且已关闭）的索引移入 index_dir，替换其中的原生索引
+
+    先删除旧元数据文件（此后 exists() 为假）与旧原生文件，再移入新文件、元数据文件最后移入：
+    中途失败不会留下可被打开的半成品索引；目录中的 JSON 旧索引文件不受影响。
+    """
+    staging, index_dir = Path(staging), Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    _remove_native_files(index_dir, keep_meta=False)
+    for path in sorted(staging.iterdir(), key=lambda p: p.name == META_FILENAME):
+        path.replace(index_dir / path.name)
+
+
+# ========== llama-index 切块 / 嵌入辅助 ==========
+
+def load_file_nodes(
+    file_paths: Sequence[Path], chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None
+) -> list:
+    """读取文件并按 MetaGPT SimpleEngine.from_docs 的默认方式切块（SentenceSplitter，可指定块大小/重叠）"""
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.core.ingestion import run_transformations
+    from llama_index.core.node_parser import SentenceSplitter
+
+    documents = SimpleDirectoryReader(input_files=[str(p) for p in file_paths]).load_data()
+    for doc in documents:
+        # 与 SimpleEngine 一致：file_path 不参与嵌入
+        doc.excluded_embed_metadata_keys.append("file_path")
+    splitter_kwargs = {}
+    if chunk_size:
+        splitter_kwargs["chunk_size"] = int(chunk_size)
+    if chunk_overlap is not None:
+        splitter_kwargs["chunk_overlap"] = int(chunk_overlap)
+    return run_transformations(documents, transformations=[SentenceSplitter(**splitter_kwargs)])
+
+
+async def embed_nodes(embed_model, nodes: Sequence[Any]) -> List[List[float]]:
+    """按 llama-index 的方式（EMBED 元数据模式）计算切块向量"""
+    from llama_index.core.schema import MetadataMode
+
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    return await embed_model.aget_text_embedding_batch(texts)
+
+
+def to_indexed_nodes(nodes: Sequence[Any]) -> List[IndexedNode]:
+    return [
+        IndexedNode(
+            node_id=n.node_id,
+            text=n.get_content(),
+            ref_doc_id=n.ref_doc_id,
+            metadata=dict(n.metadata or {}),
+            start_char_idx=getattr(n, "start_char_idx", None),
+            end_char_idx=getattr(n, "end_char_idx", None),
+        )
+        for n in nodes
+    ]
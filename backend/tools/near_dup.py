@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+网页近重复检测（SimHash）
+- 不同 gov.cn 子域名转载的同一政策通知正文几乎一致，逐个送 LLM 总结是重复开销
+- 对正文做字符 n-gram 指纹：64 位 SimHash 汉明距离不超过阈值，或 n-gram 包含度超过阈值即视为近重复
+  （包含度只在两页 n-gram 规模相当时复核：只有导航/页脚外壳的短页不会把共享外壳的长文判为重复）
+- group(): 批量分组，每组第一个为正文最长的代表页，其余为镜像来源
+- find_or_add(): 流式增量判定，先到达的页面为代表页
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Hashable, List, Optional, Sequence, Set, Tuple
+
+_NOISE_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    return _NOISE_PATTERN.sub("", (text or "").lower())
+
+
+def shingles(text: str, shingle_size: int = 4) -> Set[str]:
+    """字符 n-gram 集合（忽略空白与标点）。"""
+    normalized = _normalize(text)
+    n = max(1, min(shingle_size, len(normalized)))
+    return {normalized[i:i + n] for i in range(len(normalized) - n + 1)} if normalized else set()
+
+
+def simhash(text: str, shingle_size: int = 4) -> int:
+    """计算文本的 64 位 SimHash（忽略空白与标点）。"""
+    return _simhash_of(shingles(text, shingle_size))
+
+
+def _simhash_of(grams: Set[str]) -> int:
+    weights = [0] * 64
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    value = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def containment(a: Set[str], b: Set[str]) -> float:
+    """较小集合被另一集合包含的比例（转载页多出导航/版权等外壳时仍接近 1）。"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class NearDuplicateDetector:
+    """按 SimHash 汉明距离快速判定，未命中时以 n-gram 包含度复核。"""
+
+    def __init__(
+        self,
+        hamming_threshold: int = 3,
+        shingle_size: int = 4,
+        min_chars: int = 200,
+        containment_threshold: float = 0.9,
+        min_size_ratio: float = 0.5,
+    ):
+        self.hamming_threshold = int(hamming_threshold)
+        self.shingle_size = int(shingle_size)
+        self.min_chars = int(min_chars)
+        self.containment_threshold = float(containment_threshold)
+        self.min_size_ratio = float(min_size_ratio)
+        self._registered: List[Tuple[Hashable, Tuple[int, Set[str]]]] = []
+
+    def _fingerprint(self, text: str) -> Optional[Tuple[int, Set[str]]]:
+        if len((text or "").strip()) < self.min_chars:
+            return None
+        grams = shingles(text, self.shingle_size)
+        return _simhash_of(grams), grams
+
+    def _is_near(self, a: Tuple[int, Set[str]], b: Tuple[int, Set[str]]) -> bool:
+        if hamming_distance(a[0], b[0]) <= self.hamming_threshold:
+            return True
+        # 较小一方的 n-gram 数不足较大一方的 min_size_ratio 时不比包含度（外壳短页对任何同站长文包含度都接近 1）
+        smaller, larger = sorted((len(a[1]), len(b[1])))
+        return smaller >= self.min_size_ratio * larger and containment(a[1], b[1]) >= self.containment_threshold
+
+    def find_or_add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """增量判定（流式场景）：与已登记页面近重复时返回其 key，否则登记为代表页并返回 None。"""
+        fp = self._fingerprint(text)
+        if fp is None:
+            return None
+        for rep_key, rep_fp in self._registered:
+            if self._is_near(fp, rep_fp):
+                return rep_key
+        self._registered.append((key, fp))
+        return None
+
+    def group(self, items: Sequence[Tuple[Hashable, str]]) -> List[List[Hashable]]:
+        """items: [(key, text)]；返回分组列表（按首次出现排序），每组首个 key 为正文最长的代表页。
+        过短文本（错误页/空页）不参与合并。"""
+        groups: List[List[Tuple[Hashable, int]]] = []
+        prints: List[Tuple[int, Tuple[int, Set[str]]]] = []  # (组下标, 指纹)
+        for key, text in items:
+            length = len((text or "").strip())
+            fp = self._fingerprint(text)
+            if fp is None:
+                groups.append([(key, length)])
+                continue
+            for group_idx, rep_fp in prints:
+                if self._is_near(fp, rep_fp):
+                    groups[group_idx].append((key, length))
+                    break
+            else:
+                prints.append((len(groups), fp))
+                groups.append([(key, length)])
+
+        result = []
+        for members in groups:
+            rep = max(range(len(members)), key=lambda i: (members[i][1], -i))
+            result.append([members[rep][0]] + [k for i, (k, _) in enumerate(members) if i != rep])
+        return result
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+网页内容缓存（内容寻址）
+- 记录表：URL -> {etag, last_modified, content_hash, fetched_at}
+- 文本表：content_hash -> 抽取后的正文（镜像页面共享同一份文本）
+- 新鲜期内直接命中（零请求）；过期后发一次条件 HEAD 请求（If-None-Match / If-Modified-Since）校验，
+  未变化则复用缓存，变化才重新抓取
+- 未缓存时只调用 fetch（不额外发 HEAD）；验证器取自 fetch 返回的响应头，或过期校验时 HEAD 的响应
+- sqlite 读写在工作线程执行，不阻塞事件循环
+- HEAD 请求可经 slot（如 BrowserPool.domain_slot）计入按域名的并发上限
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from backend.config.performance_config import PAGE_CACHE
+from backend.tools.kv_store import SqliteKVStore
+
+# fetch 返回正文，或 (正文, {"etag": ..., "last_modified": ...}) 附带响应验证器
+FetchResult = Union[str, Tuple[str, Dict[str, str]]]
+
+
+class PageCache:
+    """URL 级缓存 + 内容哈希去重的正文存储"""
+
+    def __init__(
+        self,
+        path: str,
+        fresh_seconds: float = 21600,
+        revalidate: bool = True,
+        request_timeout: float = 10.0,
+    ):
+        self._records = SqliteKVStore(path, table="page_records")
+        self._texts = SqliteKVStore(path, table="page_texts")
+        self.fresh_seconds = float(fresh_seconds)
+        self.revalidate = revalidate
+        self.request_timeout = float(request_timeout)
+        self.stats: Dict[str, int] = {"fresh_hits": 0, "revalidated": 0, "fetched": 0}
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _load(self, url: str) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        found = self._records.get_with_time(url)
+        if found is None:
+            return None
+        record, checked_at = json.loads(found[0]), found[1]
+        text = self._texts.get(record.get("content_hash", ""))
+        if text is None:
+            return None
+        return record, text, checked_at
+
+    def _save(self, url: str, text: str, validators: Dict[str, str]) -> None:
+        digest = self.content_hash(text)
+        if self._texts.get(digest) is None:
+            self._texts.set(digest, text)
+        record = {
+            "content_hash": digest,
+            "etag": validators.get("etag", ""),
+            "last_modified": validators.get("last_modified", ""),
+            "fetched_at": time.time(),
+        }
+        self._records.set(url, json.dumps(record, ensure_ascii=False))
+
+    def _touch(self, url: str, record: Dict[str, Any]) -> None:
+        """校验未变化：刷新记录时间以重新计算新鲜期"""
+        self._records.set(url, json.dumps(record, ensure_ascii=False))
+
+    async def _head(self, url: str, record: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, str]]:
+        """发送 HEAD 请求（有缓存记录时附带条件头），返回状态码与验证器。失败返回 (0, {})。"""
+        headers = {}
+        if record:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        try:
+            import httpx
+
+            async with httpx.AsyncClient(timeout=self.request_timeout, follow_redirects=True) as client:
+                resp = await client.head(url, headers=headers)
+            return resp.status_code, {
+                "etag": resp.headers.get("etag", ""),
+                "last_modified": resp.headers.get("last-modified", ""),
+            }
+        except Exception:
+            return 0, {}
+
+    @staticmethod
+    def _unchanged(record: Dict[str, Any], status: int, validators: Dict[str, str]) -> bool:
+        if status == 304:
+            return True
+        # 部分站点忽略条件头但返回相同验证器：同样视为未变化
+        if status == 200:
+            if record.get("etag") and validators.get("etag") == record["etag"]:
+                return True
+            if record.get("last_modified") and validators.get("last_modified") == record["last_modified"]:
+                return True
+        return False
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[str], Awaitable[FetchResult]],
+        slot: Optional[Callable[[str], AsyncContextManager]] = None,
+    ) -> str:
+        """返回 URL 的正文：新鲜命中 -> 零请求；过期 -> 一次条件请求校验；变化或未缓存 -> fetch 抓取。
+
+        slot(url) 为按域名限流的异步上下文（与抓取共用并发上限），校验用的 HEAD 请求在其中发送。
+        """
+        cached = await asyncio.to_thread(self._load, url)
+        validators: Dict[str, str] = {}
+        if cached is not None:
+            record, text, checked_at = cached
+            if time.time() - checked_at <= self.fresh_seconds:
+                self.stats["fresh_hits"] += 1
+                return text
+            if self.revalidate:
+                # 有验证器时为条件请求；旧记录缺少验证器时借此取得，供下次过期校验
+                async with (slot(url) if slot is not None else nullcontext()):
+                    status, validators = await self._head(url, record)
+                if self._unchanged(record, status, validators):
+                    await asyncio.to_thread(self._touch, url, record)
+                    self.stats["revalidated"] += 1
+                    return text
+
+        result = await fetch(url)
+        if isinstance(result, tuple):
+            text, fetched_validators = result
+            validators = {**validators, **{k: v for k, v in (fetched_validators or {}).items() if v}}
+        else:
+            text = result
+        self.stats["fetched"] += 1
+        if text and text.strip():
+            await asyncio.to_thread(self._save, url, text, validators)
+        return text
+
+
+_default_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """按配置获取进程内共享的网页缓存；未启用时返回 None。"""
+    global _default_cache
+    if not PAGE_CACHE.get("enabled", True):
+        return None
+    if _default_cache is None:
+        _default_cache = PageCache(
+            path=PAGE_CACHE.get("path", "workspace/.cache/page_cache.sqlite3"),
+            fresh_seconds=float(PAGE_CACHE.get("fresh_seconds", 21600)),
+            revalidate=bool(PAGE_CACHE.get("revalidate", True)),
+            request_timeout=float(PAGE_CACHE.get("request_timeout", 10.0)),
+        )
+    return _default_cache
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+异步分阶段流水线（生产者/消费者 + 有界队列背压）
+- 每个阶段独立的 worker 数；阶段之间以有界 asyncio.Queue 相连，下游处理不过来时上游自动等待
+- 处理函数返回零个或多个下游条目（扇出），最后一个阶段的产出作为流水线结果
+- 记录每阶段队列深度、排队等待与处理耗时，便于调优 worker 数与队列容量
+- 任一处理函数抛出异常时取消全部 worker 并向上抛出（不隐藏错误）
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """流水线阶段：handler(item) 返回下游条目的可迭代对象（None 表示不产出）。"""
+    name: str
+    handler: Callable[[Any], Awaitable[Optional[Iterable[Any]]]]
+    workers: int = 1
+    queue_size: int = 8  # 输入队列容量（0 表示不限）
+
+
+@dataclass
+class StageMetrics:
+    workers: int
+    processed: int = 0
+    emitted: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    total_wait: float = 0.0
+    max_queue_depth: int = 0
+    depth_samples: int = 0
+    depth_sum: int = 0
+    _queue: Optional[asyncio.Queue] = field(default=None, repr=False)
+
+    def as_dict(self) -> Dict[str, Any]:
+        n = max(1, self.processed)
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "avg_latency": round(self.total_latency / n, 4),
+            "max_latency": round(self.max_latency, 4),
+            "avg_queue_wait": round(self.total_wait / n, 4),
+            "avg_queue_depth": round(self.depth_sum / max(1, self.depth_samples), 2),
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+class StagePipeline:
+    """按顺序连接的阶段图。"""
+
+    def __init__(self, stages: List[Stage], name: str = "pipeline"):
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.name = name
+        self._metrics: Dict[str, StageMetrics] = {s.name: StageMetrics(workers=max(1, s.workers)) for s in stages}
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段实时指标（运行中调用可观察当前队列深度）。"""
+        return {name: m.as_dict() for name, m in self._metrics.items()}
+
+    def format_metrics(self) -> str:
+        lines = []
+        for name, m in self.metrics().items():
+            lines.append(
+                f"{name}: workers={m['workers']} processed={m['processed']} errors={m['errors']} "
+                f"latency(avg/max)={m['avg_latency']}s/{m['max_latency']}s wait(avg)={m['avg_queue_wait']}s "
+                f"depth(avg/max)={m['avg_queue_depth']}/{m['max_queue_depth']}"
+            )
+        return "\n".join(lines)
+
+    async def run(self, inputs: Iterable[Any]) -> List[Any]:
+        queues = [asyncio.Queue(maxsize=max(0, s.queue_size)) for s in self.stages]
+        metrics = [self._metrics[s.name] for s in self.stages]
+        for m, q in zip(metrics, queues):
+            m._queue = q
+        outputs: List[Any] = []
+
+        async def put(idx: int, item: Any) -> None:
+            await queues[idx].put((time.perf_counter(), item))
+            m = metrics[idx]
+            depth = queues[idx].qsize()
+            m.depth_samples += 1
+            m.depth_sum += depth
+            m.max_queue_depth = max(m.max_queue_depth, depth)
+
+        async def close(idx: int) -> None:
+            for _ in range(metrics[idx].workers):
+                await queues[idx].put((0.0, _DONE))
+
+        async def feed() -> None:
+            for item in inputs:
+                await put(0, item)
+            await close(0)
+
+        remaining = [m.workers for m in metrics]
+
+        async def worker(idx: int) -> None:
+            stage, m = self.stages[idx], metrics[idx]
+            while True:
+                enqueued_at, item = await queues[idx].get()
+                if item is _DONE:
+                    # 本阶段最后一个 worker 退出时关闭下游
+                    remaining[idx] -= 1
+                    if remaining[idx] == 0 and idx + 1 < len(self.stages):
+                        await close(idx + 1)
+                    return
+                started = time.perf_counter()
+                m.total_wait += started - enqueued_at
+                try:
+                    produced = await stage.handler(item)
+                except Exception:
+                    m.errors += 1
+                    raise
+                elapsed = time.perf_counter() - started
+                m.processed += 1
+                m.total_latency += elapsed
+                m.max_latency = max(m.max_latency, elapsed)
+                for out in produced or ():
+                    m.emitted += 1
+                    if idx + 1 < len(self.stages):
+                        await put(idx + 1, out)
+                    else:
+                        outputs.append(out)
+
+        tasks = [asyncio.ensure_future(feed())] + [
+            asyncio.ensure_future(worker(i)) for i, m in enumerate(metrics) for _ in range(m.workers)
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return outputs
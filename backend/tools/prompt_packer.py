@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+按 token 预算打包提示词
+- count_tokens: 优先使用 tiktoken 计数；不可用时按中文字符≈1 token、其他字符≈4字符/token 保守估算
+- PromptPacker: 按优先级填充各段内容，必保段（指令/白名单）完整保留，
+  低优先级的大段内容先被压缩（按段落截断），放不下时整段丢弃，并报告节省的 token 数
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from backend.config.performance_config import PROMPT_TOKEN_BUDGETS
+
+_CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """统计文本 token 数。"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """保留开头部分，截断到不超过 max_tokens；尽量在换行处断开。"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    head = text[:lo]
+    cut = head.rfind("\n")
+    if cut > lo * 0.8:
+        head = head[:cut]
+    return head
+
+
+def prompt_budget_for_model(model: Optional[str]) -> int:
+    """返回模型的输入 token 预算（未配置的模型使用 default）。"""
+    return int(PROMPT_TOKEN_BUDGETS.get(model or "", PROMPT_TOKEN_BUDGETS.get("default", 100000)))
+
+
+@dataclass
+class PromptSegment:
+    """提示词片段：priority 越小越重要；required=True 的片段始终完整保留。"""
+    name: str
+    text: str
+    priority: int = 1
+    required: bool = False
+
+
+@dataclass
+class PackResult:
+    texts: Dict[str, str]
+    budget: int
+    tokens_original: int
+    tokens_used: int
+    compressed: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_original - self.tokens_used)
+
+    def summary(self) -> str:
+        parts = [f"预算 {self.budget}", f"使用 {self.tokens_used}", f"节省 {self.tokens_saved}"]
+        if self.compressed:
+            parts.append(f"压缩 {self.compressed}")
+        if self.dropped:
+            parts.append(f"丢弃 {self.dropped}")
+        return "，".join(parts)
+
+
+class PromptPacker:
+    """在 token 预算内按优先级装填提示词片段。"""
+
+    def __init__(self, budget_tokens: int, min_segment_tokens: int = 64):
+        self.budget = int(budget_tokens)
+        self.min_segment_tokens = int(min_segment_tokens)
+
+    def pack(self, segments: List[PromptSegment], reserved_tokens: int = 0) -> PackResult:
+        """reserved_tokens: 模板固定文本与系统提示等已占用的 token。"""
+        counts = {s.name: count_tokens(s.text) for s in segments}
+        texts: Dict[str, str] = {}
+        remaining = self.budget - int(reserved_tokens)
+        result = PackResult(texts=texts, budget=self.budget,
+                            tokens_original=int(reserved_tokens) + sum(counts.values()), tokens_used=0)
+
+        for seg in (s for s in segments if s.required):
+            texts[seg.name] = seg.text
+            remaining -= counts[seg.name]
+
+        # 高优先级先装填；空间不足时压缩，仍不足则丢弃
+        for seg in sorted((s for s in segments if not s.required), key=lambda s: s.priority):
+            need = counts[seg.name]
+            if need <= remaining:
+                texts[seg.name] = seg.text
+                remaining -= need
+            elif remaining >= self.min_segment_tokens:
+                texts[seg.name] = truncate_to_tokens(seg.text, remaining)
+                remaining -= count_tokens(texts[seg.name])
+                result.compressed.append(seg.name)
+            else:
+                texts[seg.name] = ""
+                result.dropped.append(seg.name)
+
+        result.tokens_used = int(reserved_tokens) + sum(count_tokens(t) for t in texts.values())
+        return result
+
+
+def pack_prompt_segments(
+    segments: List[PromptSegment],
+    model: Optional[str] = None,
+    fixed_texts: Optional[List[str]] = None,
+) -> PackResult:
+    """按模型预算打包；fixed_texts 为模板固定文本/系统提示（计入预算但不参与压缩）。"""
+    reserved = sum(count_tokens(t) for t in (fixed_texts or []) if t)
+    return PromptPacker(prompt_budget_for_model(model)).pack(segments, reserved_tokens=reserved)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+异步限流与重试工具
+- TokenBucket: 令牌桶限流（每秒速率 + 突发容量）
+- get_rate_limiter: 按名称获取进程内共享的限流器（配置见 performance_config.RATE_LIMITS）
+- retry_async: 带指数退避与抖动的异步重试
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from backend.config.performance_config import RATE_LIMITS
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """令牌桶限流器：稳态速率 rate（个/秒），最多允许 burst 个请求突发。"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f"限流速率必须大于0: {rate}")
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # 锁绑定事件循环：跨 asyncio.run 复用同一限流器时按当前循环重建
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """获取令牌；不足时按缺口等待（先到先得）。"""
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    async def __aenter__(self) -> "TokenBucket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(name: str) -> TokenBucket:
+    """按名称获取共享限流器，未配置的名称使用保守默认值（1次/秒）。"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        cfg = RATE_LIMITS.get(name, {}) or {}
+        limiter = TokenBucket(
+            rate=float(cfg.get("rate_per_second", 1.0)),
+            burst=int(cfg.get("burst", 1)),
+        )
+        _limiters[name] = limiter
+    return limiter
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]],
+    retries: int = 3,
+    backoff_base: float = 1.0,
+    backoff_max: float = 10.0,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    on_retry: Optional[Callable[[int, BaseException, float], None]] = None,
+    should_retry: Optional[Callable[[BaseException], bool]] = None,
+) -> T:
+    """执行 func，失败时按 backoff_base * 2^n（带抖动，封顶 backoff_max）退避重试，最多 retries 次。
+
+    should_retry 返回 False 的异常（如参数错误）立即抛出，不做重试。
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except retry_on as e:
+            if attempt >= retries or (should_retry is not None and not should_retry(e)):
+                raise
+            delay = min(backoff_max, backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, e, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+搜索结果持久化缓存
+- SearchResultCache: 以 (engine, query, max_results, as_string) 为键的磁盘缓存（查询空白归一），支持 TTL、命中统计与旁路
+- CachedSearchEngine: SearchEngine 子类，透明接入缓存，可直接注入 CollectLinks 等原生组件
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from pydantic import PrivateAttr
+from metagpt.logs import logger
+from metagpt.tools.search_engine import SearchEngine
+
+from backend.config.performance_config import SEARCH_CACHE
+from backend.tools.kv_store import SqliteKVStore
+
+
+class SearchResultCache:
+    """磁盘搜索结果缓存。bypass=True 时跳过读取但仍写入最新结果（用于强制刷新）。"""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400, bypass: bool = False):
+        self._store = SqliteKVStore(path, table="search_results")
+        self.ttl_seconds = float(ttl_seconds)
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(engine: str, query: str, max_results: int, as_string: bool) -> str:
+        # 查询中的空白差异（首尾、连续空格、换行）不影响键
+        return SqliteKVStore.make_key(engine, " ".join(str(query).split()), int(max_results), bool(as_string))
+
+    def get(self, engine: str, query: str, max_results: int, as_string: bool) -> Optional[Any]:
+        if self.bypass:
+            self.misses += 1
+            return None
+        raw = self._store.get(self._key(engine, query, max_results, as_string), max_age=self.ttl_seconds)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, engine: str, query: str, max_results: int, as_string: bool, result: Any) -> None:
+        self._store.set(self._key(engine, query, max_results, as_string), json.dumps(result, ensure_ascii=False))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._store),
+            "bypass": self.bypass,
+        }
+
+
+_default_cache: Optional[SearchResultCache] = None
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """按配置获取进程内共享的搜索缓存；未启用时返回 None。"""
+    global _default_cache
+    if not SEARCH_CACHE.get("enabled", True):
+        return None
+    if _default_cache is None:
+        _default_cache = SearchResultCache(
+            path=SEARCH_CACHE.get("path", "workspace/.cache/search_cache.sqlite3"),
+            ttl_seconds=float(SEARCH_CACHE.get("ttl_seconds", 86400)),
+            bypass=bool(SEARCH_CACHE.get("bypass", False)),
+        )
+    return _default_cache
+
+
+class CachedSearchEngine(SearchEngine):
+    """带磁盘缓存的搜索引擎：仅缓存非空结果，错误不入缓存。"""
+
+    _cache: Optional[SearchResultCache] = PrivateAttr(default=None)
+
+    def __init__(self, cache: Optional[SearchResultCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache if cache is not None else get_search_cache()
+
+    @property
+    def cache(self) -> Optional[SearchResultCache]:
+        return self._cache
+
+    async def run(self, query: str, max_results: int = 8, as_string: bool = True, ignore_errors: bool = False):
+        if self._cache is None:
+            return await super().run(query, max_results=max_results, as_string=as_string, ignore_errors=ignore_errors)
+
+        engine_name = getattr(self.engine, "value", str(self.engine))
+        # sqlite 读写在工作线程执行，并发关键词检索时不阻塞事件循环
+        cached = await asyncio.to_thread(self._cache.get, engine_name, query, max_results, as_string)
+        if cached is not None:
+            logger.debug(f"🔎 搜索缓存命中: {query}")
+            return cached
+
+        result = await super().run(query, max_results=max_results, as_string=as_string, ignore_errors=ignore_errors)
+        if result:
+            await asyncio.to_thread(self._cache.set, engine_name, query, max_results, as_string, result)
+        return result
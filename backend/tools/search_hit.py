@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+结构化检索结果：项目/全局/本地索引与知识图谱统一返回 SearchHit 列表
+- 去重按 node_id（无 id 时按文本哈希），合并按分数，均为 O(n)
+- 融合分只在同一次检索内可比；跨索引（联邦检索）合并时按通道排名：向量通道按 similarity（同一嵌入模型可比）、
+  词法通道按 lexical_score 各自跨索引排序，再做倒数排名融合，不直接比较不同通道的分数
+- “📁 [项目知识]” 等来源前缀只在拼装提示词时由 format_hits 生成（联邦检索的命中附带所属项目）
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.tools.lexical_index import reciprocal_rank_fusion
+
+SOURCE_LABELS = {
+    "project": "📁 [项目知识]",
+    "global": "🌍 [全局知识]",
+    "local": "📁 [本地文档]",
+    "knowledge_graph": "🕸️ [知识图谱]",
+}
+
+
+@dataclass
+class SearchHit:
+    """一条检索命中；score 越大越相关（同一次检索的结果之间可比）
+    similarity 为向量通道相似度、lexical_score 为词法通道分数（-bm25），未经对应通道命中时为 None"""
+    text: str
+    score: float = 0.0
+    source: str = "project"
+    node_id: Optional[str] = None
+    file: Optional[str] = None
+    start_char_idx: Optional[int] = None
+    end_char_idx: Optional[int] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    project: Optional[str] = None
+    similarity: Optional[float] = None
+    lexical_score: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        """去重键：node_id 优先，否则为文本哈希"""
+        if self.node_id:
+            return self.node_id
+        return "text:" + hashlib.sha1(self.text.strip().encode("utf-8")).hexdigest()
+
+    def with_score(self, score: float) -> "SearchHit":
+        return replace(self, score=float(score))
+
+
+def hit_from_node(node: Any, score: float, source: str) -> SearchHit:
+    """由索引节点（IndexedNode）构造命中记录"""
+    metadata = dict(getattr(node, "metadata", None) or {})
+    return SearchHit(
+        text=(node.text or "").strip(),
+        score=float(score),
+        source=source,
+        node_id=node.node_id,
+        file=metadata.get("file_name") or metadata.get("file_path"),
+        start_char_idx=getattr(node, "start_char_idx", None),
+        end_char_idx=getattr(node, "end_char_idx", None),
+        metadata=metadata,
+    )
+
+
+def distance_to_score(distance: float, metric: str = "l2") -> float:
+    """索引距离（越小越相似）转为分数（越大越相关）：ip 为内积，l2 为 1 / (1 + 平方距离)"""
+    return -float(distance) if metric == "ip" else 1.0 / (1.0 + float(distance))
+
+
+def as_hit(result: Any, source: str, score: float = 0.0) -> SearchHit:
+    """兼容仍返回纯文本的检索实现"""
+    if isinstance(result, SearchHit):
+        return result
+    return SearchHit(text=str(result).strip(), score=score, source=source)
+
+
+def dedupe_hits(hits: Iterable[SearchHit]) -> List[SearchHit]:
+    """按去重键保留分数最高的一条，结果按分数降序（同分保持先后顺序）"""
+    best: Dict[str, SearchHit] = {}
+    for hit in hits:
+        if not hit.text:
+            continue
+        current = best.get(hit.key)
+        if current is None or hit.score > current.score:
+            best[hit.key] = hit
+    return sorted(best.values(), key=lambda h: h.score, reverse=True)
+
+
+def merge_ranked_hits(
+    hit_lists: Iterable[Sequence[SearchHit]],
+    top_k: int,
+    weights: Tuple[float, float] = (1.0, 1.0),
+    k: int = 60,
+) -> List[SearchHit]:
+    """合并多个索引的命中（联邦检索）：向量、词法两个通道分别把全部索引的命中按本通道分数排序，
+    再按 (词法, 向量) 权重做倒数排名融合，分数为融合分。两个通道都没有分数的命中按原分数另成一个列表。
+    各索引内的融合分只反映排名（每个索引的第一名同分），不参与跨索引比较。"""
+    best: Dict[str, SearchHit] = {}
+    for hits in hit_lists:
+        for hit in hits:
+            if hit.text and hit.key not in best:
+                best[hit.key] = hit
+    hits = list(best.values())
+    vector = sorted((h for h in hits if h.similarity is not None), key=lambda h: h.similarity, reverse=True)
+    lexical = sorted((h for h in hits if h.lexical_score is not None), key=lambda h: h.lexical_score, reverse=True)
+    other = sorted((h for h in hits if h.similarity is None and h.lexical_score is None), key=lambda h: h.score, reverse=True)
+    fused = reciprocal_rank_fusion(
+        [[h.key for h in lexical], [h.key for h in vector], [h.key for h in other]],
+        weights=[weights[0], weights[1], 1.0],
+        k=k,
+    )
+    return [best[key].with_score(score) for key, score in fused[:top_k]]
+
+
+def format_hits(hits: Sequence[Any], with_source: bool = True) -> List[str]:
+    """拼装提示词用的文本列表（带来源前缀）；纯文本结果原样保留"""
+    lines = []
+    for hit in hits:
+        if not isinstance(hit, SearchHit):
+            lines.append(str(hit))
+        elif with_source and hit.source in SOURCE_LABELS:
+            project = f"({hit.project})" if hit.project else ""
+            lines.append(f"{SOURCE_LABELS[hit.source]}{project} {hit.text}")
+        else:
+            lines.append(hit.text)
+    return lines
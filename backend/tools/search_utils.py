@@ -4,6 +4,7 @@
 """
 from __future__ import annotations
 
+import re
 from typing import Any, List
 
 
@@ -61,3 +62,33 @@ def normalize_keywords(raw_list: Any, topic: str) -> List[str]:
 
     return deduped or [topic[:50]]
 
+
+def select_relevant_passages(text: str, keywords: List[str], max_chars: int) -> str:
+    """按关键词命中数从文本中挑选相关段落（以空行分段），保持原文顺序，总长不超过 max_chars。
+
+    - 无关键词命中的段落被丢弃；若全部未命中，退回原文前 max_chars 个字符
+    - 文本本身不超过 max_chars 时原样返回
+    """
+    if not text or len(text) <= max_chars:
+        return text
+    paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+    scored = []
+    for idx, para in enumerate(paragraphs):
+        score = sum(para.count(k) for k in keywords if k)
+        if score > 0:
+            scored.append((score, idx))
+    if not scored:
+        return text[:max_chars]
+
+    # 按得分从高到低选入，直到达到字符上限
+    selected: List[int] = []
+    total = 0
+    for score, idx in sorted(scored, key=lambda x: (-x[0], x[1])):
+        length = len(paragraphs[idx]) + 2
+        if total + length > max_chars:
+            continue
+        selected.append(idx)
+        total += length
+    if not selected:
+        return paragraphs[sorted(scored, key=lambda x: (-x[0], x[1]))[0][1]][:max_chars]
+    return "\n\n".join(paragraphs[i] for i in sorted(selected))
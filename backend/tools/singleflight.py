@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+SingleFlight：同一 key 的并发异步调用合并为一次执行
+- 第一个调用者启动任务，其余调用者等待同一任务的结果（或异常）
+- 等待方被取消不会取消共享任务（shield），任务结束即从在途表移除，下一次调用重新执行
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        # 任务绑定事件循环：跨 asyncio.run 残留的任务不可复用
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 标记异常已读取，避免所有等待方都已取消时的 "never retrieved" 警告
+
+    def inflight(self, key: Hashable) -> bool:
+        task = self._inflight.get(key)
+        return task is not None and not task.done()
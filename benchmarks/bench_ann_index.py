@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+近似最近邻索引基准：recall@k 与单查询延迟，对照精确暴力检索（flat）
+- 语料为带簇结构的随机单位向量（更接近真实嵌入分布），查询为语料向量加噪声
+- ivfpq 逐档扫描 nprobe，hnsw（需 faiss）逐档扫描 efSearch；召回以 flat 的 top_k 为真值
+- 结果用于按语料规模选择 ANN_INDEX（performance_config.py）的类型与检索宽度
+
+用法:
+    python benchmarks/bench_ann_index.py --chunks 200000 --dims 1024 --queries 200 --top-k 10
+    python benchmarks/bench_ann_index.py --types ivfpq --ivf-m 32 --breadths 4 8 16 32 64
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.tools.ann_index import FAISS_AVAILABLE
+from backend.tools.native_index import IndexedNode, NativeVectorIndex
+
+
+def build_index(path: Path, chunks: int, dims: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dims)).astype("float32")
+    index = NativeVectorIndex.create(path, dims)
+    for start in range(0, chunks, 10000):
+        n = min(10000, chunks - start)
+        vecs = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dims)).astype("float32")
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        index.add([IndexedNode(f"n{start + i}", "") for i in range(n)], vecs)
+    return index
+
+
+def make_queries(index: NativeVectorIndex, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    matrix, _ = index._matrix_view()
+    base = np.asarray(matrix[np.sort(rng.choice(matrix.shape[0], size=count, replace=False))])
+    queries = base + 0.1 * rng.normal(size=base.shape).astype("float32")
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def timed_search(index, queries, top_k, breadth=None):
+    """逐条查询（在线检索的典型形态），返回 (结果, 单查询平均毫秒)"""
+    started = time.perf_counter()
+    results = [index.search(q[None, :], top_k, breadth)[0] for q in queries]
+    return results, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def recall_at_k(results, truth, top_k):
+    return float(np.mean([
+        len({r for r, _ in got} & {r for r, _ in want}) / max(1, min(top_k, len(want)))
+        for got, want in zip(results, truth)
+    ]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN 索引 recall@k / 延迟基准")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["ivfpq", "hnsw"])
+    parser.add_argument("--breadths", type=int, nargs="+", default=None, help="检索宽度档位（nprobe / efSearch）")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--ivf-m", type=int, default=32, help="ivfpq 子空间数")
+    parser.add_argument("--ivf-nlist", type=int, default=0, help="ivfpq 倒排桶数（0 为 4·√n）")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"📦 构建语料: {args.chunks} × {args.dims}")
+        index = build_index(Path(tmp), args.chunks, args.dims, args.clusters)
+        queries = make_queries(index, args.queries)
+        vector_mb = index.estimated_bytes() / 1024 / 1024
+
+        truth, flat_ms = timed_search(index, queries, args.top_k)
+        print(f"\n{'类型':<8}{'宽度':>8}{'recall@' + str(args.top_k):>12}{'ms/查询':>10}{'构建s':>9}{'附加MB':>9}")
+        print(f"{'flat':<8}{'-':>8}{1.0:>12.3f}{flat_ms:>10.2f}{0.0:>9.1f}{0.0:>9.1f}   (向量 {vector_mb:.1f}MB)")
+
+        for kind in args.types:
+            if kind == "hnsw" and not FAISS_AVAILABLE:
+                print(f"{'hnsw':<8}跳过：未安装 faiss-cpu")
+                continue
+            if kind == "ivfpq":
+                params = {"m": args.ivf_m, "nlist": args.ivf_nlist, "nprobe": 16}
+                breadths = args.breadths or [1, 4, 8, 16, 32, 64]
+            else:
+                params = {"m": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": 64}
+                breadths = args.breadths or [16, 32, 64, 128, 256]
+            started = time.perf_counter()
+            info = index.build_ann(kind, rescore_factor=args.rescore_factor, **params)
+            build_s = time.perf_counter() - started
+            extra_mb = sum(p.stat().st_size for p in Path(tmp).glob("ann-*")) / 1024 / 1024
+            print(f"  {kind} 参数: {info.get('params')}")
+            for breadth in breadths:
+                results, ms = timed_search(index, queries, args.top_k, breadth)
+                print(f"{kind:<8}{breadth:>8}{recall_at_k(results, truth, args.top_k):>12.3f}{ms:>10.2f}"
+                      f"{build_s:>9.1f}{extra_mb:>9.1f}")
+        index.build_ann("flat")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
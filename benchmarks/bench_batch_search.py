@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+批量检索基准：HybridSearchService.hybrid_search 逐条查询 vs hybrid_search_many 批量查询
+- 经真实服务路径检索：项目知识库（原生索引 + BM25）与全局知识库分片（general）同时参与
+- 逐条：每个查询一次嵌入请求 + 项目/全局各一次索引检索（顺序 / 并发两种）
+- 批量：全部查询一次嵌入请求，项目与全局共用查询向量，各一次矩阵检索
+嵌入请求以固定往返延迟模拟（无需网络与 API Key），向量为本地哈希 n-gram 编码；
+每条路径统计查询嵌入请求数，批量路径超过一次请求时报错（防止查询被重复嵌入）。
+
+用法:
+    python benchmarks/bench_batch_search.py --docs 200 --queries 32 --latency-ms 80
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.services import hybrid_search as hybrid_module
+from backend.services.global_knowledge import GlobalKnowledgeService
+from backend.services.hybrid_search import HybridSearchService
+from backend.tools.local_embedding import HashNgramEncoder
+
+TOPICS = ["预算执行", "绩效目标", "资金使用", "项目管理", "产出数量", "满意度调查", "政策依据", "成本控制"]
+
+
+class SimulatedEmbedding:
+    """模拟远程嵌入服务：每次请求固定往返延迟 + 按条目计的少量耗时，统计请求数"""
+
+    def __init__(self, dims: int, latency_s: float, per_item_s: float = 0.002):
+        self.encoder = HashNgramEncoder(dims)
+        self.model_name = self.encoder.model_name
+        self.latency_s = latency_s
+        self.per_item_s = per_item_s
+        self.requests = 0
+
+    async def aget_text_embedding_batch(self, texts):
+        self.requests += 1
+        await asyncio.sleep(self.latency_s + self.per_item_s * len(texts))
+        return self.encoder.embed(list(texts))
+
+
+def write_corpus(directory: Path, prefix: str, count: int) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        paragraphs = [
+            f"{prefix}{i} 关于{TOPICS[(i + j) % len(TOPICS)]}的说明：第{j}部分记录了相关指标与完成情况。"
+            for j in range(6)
+        ]
+        (directory / f"{prefix}_{i:04d}.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+async def single_sequential(service, project_path, queries, top_k):
+    return [await service.hybrid_search(q, project_path, global_top_k=top_k, project_top_k=top_k) for q in queries]
+
+
+async def single_concurrent(service, project_path, queries, top_k):
+    return await asyncio.gather(
+        *(service.hybrid_search(q, project_path, global_top_k=top_k, project_top_k=top_k) for q in queries)
+    )
+
+
+async def batched(service, project_path, queries, top_k):
+    return await service.hybrid_search_many(queries, project_path, global_top_k=top_k, project_top_k=top_k)
+
+
+async def run(args):
+    queries = [f"{TOPICS[i % len(TOPICS)]}的绩效评价问题 {i}" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        embed = SimulatedEmbedding(args.dims, args.latency_ms / 1000.0)
+
+        global_service = GlobalKnowledgeService(str(root / "global_knowledge"))
+        global_service._create_embed_model = lambda: embed
+        global_service._embed_dimensions = lambda: args.dims
+        write_corpus(global_service.documents_dir / "general", "全局", args.docs)
+        hybrid_module.global_knowledge = global_service
+
+        service = HybridSearchService()
+        service._create_embed_model = lambda: embed
+        project_path = service.create_project_knowledge_base("bench", str(root / "workspace"))
+        write_corpus(Path(project_path), "项目", args.docs)
+
+        started = time.perf_counter()
+        assert await global_service.build_global_index(), "全局知识库分片构建失败"
+        await service.hybrid_search(queries[0], project_path)  # 构建并加载项目索引（不计入计时）
+        print(f"🔧 构建索引: 项目/全局各 {args.docs} 个文档 × {args.dims} 维，耗时 {time.perf_counter() - started:.2f}s")
+
+        print(f"\n{'路径':<18}{'耗时(s)':>10}{'查询/秒':>10}{'嵌入请求':>10}")
+        baseline = None
+        for name, fn in (("逐条（顺序）", single_sequential), ("逐条（并发）", single_concurrent), ("批量", batched)):
+            embed.requests = 0
+            started = time.perf_counter()
+            results = await fn(service, project_path, queries, args.top_k)
+            elapsed = time.perf_counter() - started
+            keys = [[hit.key for hit in hits] for hits in results]
+            baseline = baseline or keys
+            assert keys == baseline, f"{name} 的检索结果与逐条查询不一致"
+            print(f"{name:<16}{elapsed:>10.3f}{len(queries) / elapsed:>10.1f}{embed.requests:>10}")
+        assert embed.requests == 1, f"批量检索发出了 {embed.requests} 次查询嵌入请求（应为 1 次）"
+
+        global_service.close()
+        service.invalidate_project_cache(project_path)  # 关闭项目索引（sqlite 连接与内存映射）
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量检索吞吐基准")
+    parser.add_argument("--docs", type=int, default=200, help="项目与全局知识库各自的文档数")
+    parser.add_argument("--dims", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="模拟的嵌入请求往返延迟")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+压缩向量基准：每 1 万切块的常驻内存与召回损失，对照 float32 暴力检索（flat）
+- fp16: float16 副本穷举扫描；pq: 乘积量化编码（m 字节/向量）穷举扫描
+- 首轮扫描取 top_k × rescore_factor 个候选，再用内存映射的 float32 向量精确重排；
+  rescore_factor=1 即不额外取候选，反映压缩本身的召回损失
+- 常驻内存取引擎缓存使用的估算值（estimated_bytes），按每 1 万切块折算
+- 结果用于选择 PROJECT_VECTOR_COMPRESSION / ANN_INDEX（performance_config.py）
+
+用法:
+    python benchmarks/bench_compressed_vectors.py --chunks 50000 --dims 1024 --queries 100
+    python benchmarks/bench_compressed_vectors.py --pq-m 64 128 256 --rescore-factors 1 4 8 16
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_ann_index import build_index, make_queries, recall_at_k, timed_search
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩向量（fp16 / pq）内存与召回基准")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[64, 128, 256], help="pq 子空间数（字节/向量）")
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--kmeans-iters", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"📦 构建语料: {args.chunks} × {args.dims}")
+        index = build_index(Path(tmp), args.chunks, args.dims, args.clusters)
+        queries = make_queries(index, args.queries)
+        per_10k = 10000 / args.chunks
+
+        truth, flat_ms = timed_search(index, queries, args.top_k)
+        flat_mb = index.estimated_bytes() / 1024 / 1024 * per_10k
+        header = f"{'类型':<12}{'重排倍数':>8}{'recall@' + str(args.top_k):>12}{'ms/查询':>10}{'MB/万切块':>12}{'压缩比':>8}{'构建s':>8}"
+        print(f"\n{header}")
+        print(f"{'flat':<12}{'-':>8}{1.0:>12.3f}{flat_ms:>10.2f}{flat_mb:>12.2f}{1.0:>8.1f}{0.0:>8.1f}")
+
+        variants = [("fp16", {})] + [("pq", {"m": m, "kmeans_iters": args.kmeans_iters}) for m in args.pq_m]
+        for kind, params in variants:
+            started = time.perf_counter()
+            info = index.build_ann(kind, rescore_factor=args.rescore_factors[0], **params)
+            build_s = time.perf_counter() - started
+            label = kind if kind == "fp16" else f"pq(m={info['params']['m']})"
+            mb = index.estimated_bytes() / 1024 / 1024 * per_10k
+            for factor in args.rescore_factors:
+                index._ann_meta["rescore_factor"] = factor  # 只改重排倍数，不重新训练
+                results, ms = timed_search(index, queries, args.top_k)
+                print(f"{label:<12}{factor:>8}{recall_at_k(results, truth, args.top_k):>12.3f}{ms:>10.2f}"
+                      f"{mb:>12.2f}{flat_mb / max(mb, 1e-9):>8.1f}{build_s:>8.1f}")
+        index.build_ann("flat")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+网页抓取会话池测试（浏览器会话复用、按域名并发上限、单页超时、异常后归还会话；不启动真实浏览器）
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.browser_pool import BrowserPool
+
+
+class _FakeBrowser:
+    """替身浏览器：按 URL 模拟页面耗时/异常，记录上下文数、关闭的标签页数与各域名最大在途数"""
+
+    def __init__(self, delays=None, errors=()):
+        self.delays = delays or {}
+        self.errors = set(errors)
+        self.contexts = 0
+        self.pages_closed = 0
+        self.closed = False
+        self.active = {}
+        self.peak = {}
+
+    async def new_context(self):
+        self.contexts += 1
+        return _FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return _FakePage(self.browser)
+
+    async def close(self):
+        pass
+
+
+class _FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = ""
+
+    async def goto(self, url, timeout=None, wait_until=None):
+        b, domain = self.browser, url.split("/")[2]
+        self.url, self.domain = url, domain
+        b.active[domain] = b.active.get(domain, 0) + 1
+        b.peak[domain] = max(b.peak.get(domain, 0), b.active[domain])
+        try:
+            await asyncio.sleep(b.delays.get(url, 0.01))
+            if url in b.errors:
+                raise RuntimeError(f"net::ERR_CONNECTION_RESET {url}")
+        finally:
+            b.active[domain] -= 1
+        return SimpleNamespace(headers={"etag": f'"{domain}"', "last-modified": "Mon, 01 Sep 2025 00:00:00 GMT"})
+
+    async def evaluate(self, script):
+        return f"正文 {self.url}"
+
+    async def content(self):
+        return "<html></html>"
+
+    async def close(self):
+        self.browser.pages_closed += 1
+
+
+def _pool(browser, **kwargs):
+    async def launcher():
+        return browser
+    return BrowserPool(launcher=launcher, **kwargs)
+
+
+def test_one_browser_reused_and_per_domain_limit():
+    """全部抓取共用一次启动的浏览器与 size 个上下文；单域名在途数不超过上限，不同域名可并行"""
+    browser = _FakeBrowser()
+    pool = _pool(browser, size=4, per_domain_limit=2)
+    urls = [f"https://{host}/p{i}" for host in ("a.gov.cn", "b.gov.cn") for i in range(6)]
+
+    async def run():
+        pages = await asyncio.gather(*(pool.fetch(u) for u in urls))
+        await pool.close()
+        return pages
+
+    pages = asyncio.run(run())
+    assert [p.inner_text for p in pages] == [f"正文 {u}" for u in urls]
+    assert (pool.launches, browser.contexts, browser.pages_closed) == (1, 4, len(urls))
+    assert browser.peak == {"a.gov.cn": 2, "b.gov.cn": 2} and browser.closed
+    # 响应头中的验证器随抓取结果返回，供网页缓存首次抓取即记录
+    assert pages[0].validators == {"etag": '"a.gov.cn"', "last_modified": "Mon, 01 Sep 2025 00:00:00 GMT"}
+
+
+def test_page_timeout_and_exception_release_session():
+    """超时或抓取异常后标签页关闭、会话与域名槽位归还，后续抓取不受影响"""
+    slow, broken, ok = "https://a.gov.cn/slow", "https://a.gov.cn/broken", "https://a.gov.cn/ok"
+    browser = _FakeBrowser(delays={slow: 5.0}, errors={broken})
+    pool = _pool(browser, size=1, per_domain_limit=1, page_timeout=0.05)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.fetch(slow)
+        with pytest.raises(RuntimeError):
+            await pool.fetch(broken)
+        return await asyncio.wait_for(pool.fetch(ok), timeout=1.0)
+
+    assert asyncio.run(run()).inner_text == f"正文 {ok}"
+    assert browser.pages_closed == 3 and pool.launches == 1
+
+
+def test_engine_fallback_without_browser_sessions():
+    """未提供浏览器启动器时按引擎工厂退化，仍然限制并发"""
+    class _Engine:
+        async def run(self, url):
+            return url
+
+    pool = BrowserPool(size=2, engine_factory=_Engine)
+    assert not pool.uses_browser_sessions
+    assert asyncio.run(pool.fetch("https://a.gov.cn/x")) == "https://a.gov.cn/x"
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+切块嵌入缓存测试（sqlite 行号 + 内存映射 float32 矩阵）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.embedding_cache import EmbeddingCache
+
+
+def test_round_trip_and_namespace_isolation(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many("text-embedding-v3", 4, ["切块一", "切块二"], [[0.1, 0.2, 0.3, 0.4], [1.0, 2.0, 3.0, 4.0]])
+
+    got = cache.get_many("text-embedding-v3", 4, ["切块二", "新切块", "切块一"])
+    assert got[0] == [1.0, 2.0, 3.0, 4.0]
+    assert got[1] is None
+    assert [round(x, 5) for x in got[2]] == [0.1, 0.2, 0.3, 0.4]
+    # 模型或维度不同即不同命名空间
+    assert cache.get_many("text-embedding-v2", 4, ["切块一"]) == [None]
+    assert cache.stats()["hits"] == 2
+
+
+def test_only_new_chunks_are_appended_and_persisted(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many("m", 2, ["a", "b"], [[1, 1], [2, 2]])
+    cache.put_many("m", 2, ["b", "c"], [[9, 9], [3, 3]])  # b 已存在，不覆盖
+    assert cache.stats()["entries"] == 3
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path)
+    assert reopened.get_many("m", 2, ["a", "b", "c"]) == [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]]
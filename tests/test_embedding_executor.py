@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+嵌入执行器测试：分批、并发、400 拆分重试（不依赖外部服务）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.embedding_executor import EmbeddingExecutor, is_bad_request, is_batch_limit_error
+
+
+class _FakeProvider:
+    """超过 max_items 条的请求返回 400，超过 truncate_to 条的请求只返回前 truncate_to 条向量；记录最大在途请求数"""
+
+    def __init__(self, max_items=None, delay=0.01, reject=None, truncate_to=None):
+        self.max_items = max_items
+        self.truncate_to = truncate_to
+        self.reject = reject
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.batches = []
+
+    async def __call__(self, batch):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.max_items is not None and len(batch) > self.max_items:
+                raise RuntimeError("InvalidParameter: batch size is invalid, status_code: 400")
+            if self.reject is not None and self.reject in batch:
+                raise RuntimeError("status_code: 400, code: InvalidParameter, message: Range of input length should be [1, 8192]")
+            self.batches.append(list(batch))
+            return [[float(len(t))] for t in batch][:self.truncate_to]
+        finally:
+            self.in_flight -= 1
+
+
+def _executor(provider, **kwargs):
+    kwargs.setdefault("max_items_per_request", 10)
+    kwargs.setdefault("concurrency", 4)
+    return EmbeddingExecutor(provider, backoff_base=0.0, **kwargs)
+
+
+def test_batches_run_concurrently_and_keep_order():
+    """按条数上限分批、多批并发在途，结果与输入顺序一致"""
+    provider = _FakeProvider()
+    executor = _executor(provider)
+    texts = ["x" * (i + 1) for i in range(35)]
+    vectors = asyncio.run(executor.embed(texts))
+
+    assert vectors == [[float(i + 1)] for i in range(35)]
+    assert sorted(len(b) for b in provider.batches) == [5, 10, 10, 10]
+    assert 1 < provider.peak <= 4
+
+
+def test_bad_request_splits_only_rejected_batch():
+    """400 只拆分被拒的批次重试，并把被拒规模记为后续上限"""
+    provider = _FakeProvider(max_items=4)
+    executor = _executor(provider, max_items_per_request=8)
+    vectors = asyncio.run(executor.embed([f"t{i}" for i in range(8)]))
+
+    assert len(vectors) == 8 and all(len(b) <= 4 for b in provider.batches)
+    assert executor.stats.splits == 1
+    assert executor.item_limit == 7
+
+
+def test_single_item_bad_request_is_raised():
+    """单条仍被拒时直接抛出，不重试"""
+    provider = _FakeProvider(max_items=0)
+    executor = _executor(provider)
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.embed(["a"]))
+    assert executor.stats.requests == 1
+    assert is_bad_request(RuntimeError("status_code: 400")) and not is_bad_request(RuntimeError("4000 tokens"))
+
+
+def test_other_bad_request_splits_locally_without_tightening_limits():
+    """非条数超限的 400（某条文本被拒）只在被拒批次内拆分，不收紧全局分批上限"""
+    provider = _FakeProvider(reject="bad")
+    executor = _executor(provider, max_items_per_request=8)
+    texts = [f"t{i}" for i in range(7)] + ["bad"]
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.embed(texts))
+    assert executor.stats.splits == 3
+    assert (executor.item_limit, executor.token_limit) == (8, 32000)
+    assert sorted(len(b) for b in provider.batches) == [1, 2, 4]
+
+
+def test_short_result_splits_locally_without_tightening_limits():
+    """返回条数少于输入时只拆分该批重试（无条数超限错误码，不收紧全局上限）；单条仍无结果时抛出"""
+    provider = _FakeProvider(truncate_to=3)
+    executor = _executor(provider, max_items_per_request=8)
+    texts = [f"text{i}" * (i + 1) for i in range(8)]
+    vectors = asyncio.run(executor.embed(texts))
+
+    assert vectors == [[float(len(t))] for t in texts]
+    assert executor.stats.splits == 3 and executor.item_limit == 8
+
+    with pytest.raises(ValueError):
+        asyncio.run(_executor(_FakeProvider(truncate_to=0)).embed(["a"]))
+
+
+def test_none_vectors_split_like_failed_batch():
+    """DashScope 拒绝整批时返回 [None] * n 而不抛异常：视为失败批次拆分重试，不收紧全局上限；单条仍为 None 时抛出"""
+    class _DashScopeLike:
+        def __init__(self, max_items):
+            self.max_items = max_items
+            self.batches = []
+
+        async def __call__(self, batch):
+            self.batches.append(list(batch))
+            if len(batch) > self.max_items:
+                return [None] * len(batch)
+            return [[float(len(t))] for t in batch]
+
+    provider = _DashScopeLike(max_items=2)
+    executor = _executor(provider, max_items_per_request=8)
+    texts = [f"t{i}" * (i + 1) for i in range(8)]
+    vectors = asyncio.run(executor.embed(texts))
+
+    assert vectors == [[float(len(t))] for t in texts]
+    assert sorted(len(b) for b in provider.batches) == [2, 2, 2, 2, 4, 4, 8]
+    assert executor.stats.splits == 3 and executor.item_limit == 8
+
+    with pytest.raises(ValueError):
+        asyncio.run(_executor(_DashScopeLike(max_items=0)).embed(["a"]))
+
+    class _EmptyVectors:
+        async def __call__(self, batch):
+            return [[] for _ in batch]
+
+    with pytest.raises(ValueError):
+        asyncio.run(_executor(_EmptyVectors()).embed(["a", "b"]))
+
+
+def test_bad_request_detection_uses_status_and_error_code():
+    assert is_batch_limit_error(RuntimeError("InvalidParameter: batch size is invalid, status_code: 400"))
+    assert not is_batch_limit_error(RuntimeError("status_code: 400, message: Range of input length should be [1, 8192]"))
+    assert not is_bad_request(RuntimeError("read timeout after 400 ms")) and not is_bad_request(RuntimeError("HTTP 429 batch size"))
+
+    class _StatusError(Exception):
+        status_code = 429
+
+    assert not is_bad_request(_StatusError("InvalidParameter"))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+查询嵌入测试：embed_queries 必须以 query 文本类型嵌入查询（DashScope 区分 query/document），不依赖外部服务
+"""
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("llama_index")
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from backend.tools import embeddings as embeddings_module
+from backend.tools.embeddings import embed_queries, with_embedding_cache
+
+CALLS: List[tuple] = []
+
+
+class _DashScopeLike(BaseEmbedding):
+    """与 DashScopeEmbedding 相同：文本类型存于私有属性 _text_type，查询嵌入固定使用 query 类型"""
+
+    _api_key: Optional[str] = PrivateAttr()
+    _text_type: str = PrivateAttr()
+
+    def __init__(self, model_name: str = "text-embedding-v3", text_type: str = "document",
+                 api_key: Optional[str] = None, **kwargs: Any):
+        super().__init__(model_name=model_name, **kwargs)
+        self._api_key = api_key
+        self._text_type = text_type
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        CALLS.append(("query", [query]))
+        return [1.0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        CALLS.append((self._text_type, list(texts)))
+        return [[1.0] for _ in texts]
+
+
+class _PlainModel(_DashScopeLike):
+    """不区分文本类型的模型（无 _text_type）：只能经 get_query_embedding 得到查询向量"""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._text_type = "plain"
+
+
+@pytest.fixture(autouse=True)
+def _no_disk_cache(monkeypatch):
+    monkeypatch.setattr(embeddings_module, "get_embedding_cache", lambda: None)
+    CALLS.clear()
+
+
+def test_dashscope_queries_are_batched_with_query_text_type():
+    """接入缓存的 DashScope 模型：全部查询一次批量请求，且请求使用 query 文本类型"""
+    model = with_embedding_cache(_DashScopeLike(api_key="k"), dimensions=1)
+    assert model.query_model is not None and model.query_model._api_key == "k"
+
+    vectors = asyncio.run(embed_queries(model, ["问题一", "问题二", "问题三"]))
+    assert vectors == [[1.0]] * 3
+    assert CALLS == [("query", ["问题一", "问题二", "问题三"])]
+
+
+def test_models_without_query_variant_use_get_query_embedding():
+    """无法构建 query 类型副本的模型逐条走 get_query_embedding，而不是按切块（document）嵌入"""
+    model = with_embedding_cache(_PlainModel(), dimensions=1)
+    assert model.query_model is None
+
+    asyncio.run(embed_queries(model, ["问题一", "问题二"]))
+    assert sorted(CALLS) == [("query", ["问题一"]), ("query", ["问题二"])]
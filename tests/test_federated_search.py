@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+多项目联邦检索测试（工作区扫描、项目归属、跨项目 top-k 排序、跳过未建索引项目、并发上限）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("metagpt")
+pytest.importorskip("llama_index")
+
+from backend.services import hybrid_search as hybrid_module
+from backend.services.hybrid_search import HybridSearchService
+from backend.tools.search_hit import SearchHit
+
+
+def _workspace(tmp_path, names):
+    for name in names:
+        (tmp_path / name / "vector_storage" / "project_docs").mkdir(parents=True)
+    return {name: str(tmp_path / name / "vector_storage" / "project_docs") for name in names}
+
+
+def _service(monkeypatch, built, hits_by_project, delay=0.01):
+    """替换索引存在检查、查询嵌入与单项目检索，记录被检索的项目与最大并发数"""
+    service = HybridSearchService()
+    calls = {"searched": [], "active": 0, "max_active": 0}
+
+    async def fake_embed(_model, texts):
+        return [[0.0] for _ in texts]
+
+    async def fake_search(queries, path, top_k, filters=None, query_embeddings=None):
+        calls["active"] += 1
+        calls["max_active"] = max(calls["max_active"], calls["active"])
+        await asyncio.sleep(delay)
+        calls["active"] -= 1
+        name = service._project_name(path)
+        calls["searched"].append(name)
+        return [list(hits_by_project.get(name, []))[:top_k] for _ in queries]
+
+    monkeypatch.setattr(hybrid_module, "embed_queries", fake_embed)
+    monkeypatch.setattr(service, "_create_embed_model", lambda: None)
+    monkeypatch.setattr(service, "_is_project_index_exists", lambda index_path: Path(index_path).parent.parent.name in built)
+    monkeypatch.setattr(service, "_search_project_knowledge_many", fake_search)
+    return service, calls
+
+
+def test_discover_projects(tmp_path):
+    """只收录 workspace/<项目>/vector_storage/project_docs 目录"""
+    projects = _workspace(tmp_path, ["alpha", "beta"])
+    (tmp_path / "gamma").mkdir()
+    (tmp_path / "notes.md").write_text("x", encoding="utf-8")
+    assert HybridSearchService.discover_projects(str(tmp_path)) == projects
+    assert HybridSearchService.discover_projects(str(tmp_path / "missing")) == {}
+
+
+def test_federated_topk_orders_by_similarity_and_skips_unbuilt(tmp_path, monkeypatch):
+    """合并按通道跨项目排名而非项目内排名；命中带项目归属；未建索引的项目不检索"""
+    projects = _workspace(tmp_path, ["alpha", "beta", "gamma"])
+    hits = {
+        "alpha": [SearchHit("a1", 0.03, node_id="a1", similarity=0.5), SearchHit("a2", 0.02, node_id="a2", similarity=0.4)],
+        "beta": [SearchHit("b1", 0.03, node_id="b1", similarity=0.9), SearchHit("b2", 0.02, node_id="b2", similarity=0.3)],
+        "gamma": [SearchHit("g1", 0.03, node_id="g1", similarity=1.0)],
+    }
+    service, calls = _service(monkeypatch, {"alpha", "beta"}, hits)
+
+    result = asyncio.run(service.federated_search("绩效目标", projects, top_k=3))
+    assert [(h.node_id, h.project) for h in result] == [("b1", "beta"), ("a1", "alpha"), ("a2", "alpha")]
+    assert sorted(calls["searched"]) == ["alpha", "beta"]
+
+    # 路径列表形式：项目名取自目录
+    result = asyncio.run(service.federated_search("绩效目标", list(projects.values()), top_k=1))
+    assert [(h.node_id, h.project) for h in result] == [("b1", "beta")]
+
+
+def test_federated_bounded_concurrency(tmp_path, monkeypatch):
+    """同时检索的项目数不超过 max_concurrency，全部项目都被检索"""
+    names = [f"p{i}" for i in range(6)]
+    projects = _workspace(tmp_path, names)
+    hits = {name: [SearchHit(name, 0.03, node_id=name, similarity=i / 10)] for i, name in enumerate(names)}
+    service, calls = _service(monkeypatch, set(names), hits)
+
+    result = asyncio.run(service.federated_search_many(["q1", "q2"], projects, top_k=2, max_concurrency=2))
+    assert calls["max_active"] == 2
+    assert sorted(calls["searched"]) == names
+    assert [[h.project for h in hits] for hits in result] == [["p5", "p4"], ["p5", "p4"]]
+
+
+def test_federated_mixes_fast_path_and_vector_hits(tmp_path, monkeypatch):
+    """一个项目词法直达、另一个项目向量命中：按通道排名融合，词法直达结果不会压过全部向量命中"""
+    projects = _workspace(tmp_path, ["alpha", "beta"])
+    hits = {
+        "alpha": [SearchHit("文号命中", 15.0, node_id="a1", lexical_score=15.0),
+                  SearchHit("文号次命中", 9.0, node_id="a2", lexical_score=9.0)],
+        "beta": [SearchHit("b1", 0.03, node_id="b1", similarity=0.9, lexical_score=2.0),
+                 SearchHit("b2", 0.02, node_id="b2", similarity=0.6)],
+    }
+    service, _ = _service(monkeypatch, {"alpha", "beta"}, hits)
+    result = asyncio.run(service.federated_search("财预〔2024〕12号", projects, top_k=4))
+    assert [h.node_id for h in result][:2] == ["b1", "a1"]
+    assert {h.node_id: h.project for h in result} == {"a1": "alpha", "a2": "alpha", "b1": "beta", "b2": "beta"}
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+分片全局知识库测试（意图路由、分片构建戳、单分类重建、切换嵌入模型后重建、跨分片合并；不依赖外部嵌入服务）
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("metagpt")
+pytest.importorskip("llama_index")
+
+from backend.services import global_knowledge as gk_module
+from backend.services.global_knowledge import GlobalKnowledgeService
+
+KEYWORDS = ["预算", "指标", "模板", "案例"]
+DOCS = {"laws": "预算 预算 预算法条文 财预〔2024〕12号", "standards": "预算 指标 评价标准", "general": "案例 经验"}
+
+
+def _vec(text):
+    vec = np.array([text.count(k) for k in KEYWORDS], dtype="float32") + 1e-3
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+class _Node:
+    def __init__(self, path):
+        self.node_id = path.name
+        self.ref_doc_id = path.name
+        self.text = path.read_text(encoding="utf-8")
+        self.metadata = {"file_name": path.name}
+
+    def get_content(self, metadata_mode=None):
+        return self.text
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """按关键词计数生成向量的替身嵌入；文档写入 documents/<分类>/"""
+    async def embed_nodes(_model, nodes):
+        return [_vec(n.text) for n in nodes]
+
+    async def embed_queries(_model, queries):
+        return [_vec(q) for q in queries]
+
+    monkeypatch.setattr(gk_module, "load_file_nodes", lambda files, *args: [_Node(p) for p in files])
+    monkeypatch.setattr(gk_module, "embed_nodes", embed_nodes)
+    monkeypatch.setattr(gk_module, "embed_queries", embed_queries)
+    svc = GlobalKnowledgeService(str(tmp_path))
+    monkeypatch.setattr(svc, "_create_embed_model", lambda: SimpleNamespace(model_name="fake-embed"))
+    monkeypatch.setattr(svc, "_embed_dimensions", lambda: len(KEYWORDS))
+    for category, text in DOCS.items():
+        (tmp_path / "documents" / category).mkdir(parents=True)
+        (tmp_path / "documents" / category / f"{category}.md").write_text(text, encoding="utf-8")
+    assert asyncio.run(svc.build_global_index())
+    yield svc
+    svc.close()
+
+
+def test_route_categories(service):
+    """按 GLOBAL_SHARDS 配置的意图关键词路由到对应分片（未构建的分片不参与），无意图命中时检索全部已构建分片，分类过滤优先"""
+    assert service.route_categories("相关政策依据") == ["laws"]
+    assert service.route_categories("指标体系") == ["standards"]  # templates 未构建
+    assert service.route_categories("其他问题") == ["laws", "standards", "general"]
+    assert service.route_categories("相关政策依据", {"category": "general"}) == ["general"]
+
+
+def test_keyword_query_searches_single_shard(service, monkeypatch):
+    """命中意图关键词的查询只检索一个分片，其余分片不被打开检索"""
+    searched = []
+    for category, shard in service.shards.items():
+        original = shard.query
+
+        def query(embeddings, top_k, spec, _category=category, _original=original):
+            searched.append(_category)
+            return _original(embeddings, top_k, spec)
+
+        monkeypatch.setattr(shard, "query", query)
+    hits = asyncio.run(service.search_global("预算法规条文", top_k=3))
+    assert searched == ["laws"]
+    assert [h.file for h in hits] == ["laws.md"]
+
+
+def test_per_shard_stamps_and_single_category_rebuild(service):
+    """每个分片有独立构建戳；重建某一分类只更新该分片，其余分片文件与构建戳不变；文档未变化时跳过"""
+    stamps = {c: service.shards[c].stamp() for c in DOCS}
+    assert {c: (s["category"], s["version"], s["model"]) for c, s in stamps.items()} == {
+        c: (c, 1, "fake-embed") for c in DOCS
+    }
+    others = {c: sorted((p.name, p.stat().st_mtime_ns) for p in service.shards[c].index_dir.iterdir()) for c in ("standards", "general")}
+
+    assert asyncio.run(service.build_global_index(force_rebuild=True, categories=["laws"]))
+    assert service.shards["laws"].stamp()["version"] == 2
+    for c in ("standards", "general"):
+        assert service.shards[c].stamp() == stamps[c]
+        assert sorted((p.name, p.stat().st_mtime_ns) for p in service.shards[c].index_dir.iterdir()) == others[c]
+
+    assert asyncio.run(service.build_global_index(categories=["laws"]))  # 签名未变：跳过
+    assert service.shards["laws"].stamp()["version"] == 2
+    assert service.get_global_stats()["shards"]["laws"]["version"] == 2
+
+
+def test_failed_rebuild_reports_failure_and_keeps_previous_version(service, monkeypatch):
+    async def broken_embed(_model, nodes):
+        raise RuntimeError("嵌入服务不可用")
+
+    monkeypatch.setattr(gk_module, "embed_nodes", broken_embed)
+    assert not asyncio.run(service.build_global_index(force_rebuild=True, categories=["laws"]))
+    assert service.shards["laws"].exists() and service.shards["laws"].stamp()["version"] == 1
+    hits = asyncio.run(service.search_global("预算", top_k=1, categories=["laws"]))
+    assert [h.file for h in hits] == ["laws.md"]
+
+
+def test_cross_shard_merge_by_score(service):
+    """多分片并发检索后按分数合并 top-k，命中来源为全局知识库"""
+    hits = asyncio.run(service.search_global("预算", top_k=2))
+    assert [h.file for h in hits] == ["laws.md", "standards.md"]
+    assert hits[0].score > hits[1].score and {h.source for h in hits} == {"global"}
+    assert [[h.file for h in r] for r in asyncio.run(service.search_global_many(["案例", "预算"], top_k=1))] == [
+        ["general.md"], ["laws.md"]
+    ]
+
+
+def test_close_during_query_defers_until_lease_released(service):
+    """重建替换时关闭分片：在途检索持有的旧索引与元数据保持可用，租约归还后才关闭；之后的检索打开新索引"""
+    shard = service.shards["laws"]
+    with shard._lease() as (index, metadata):
+        shard.close()
+        assert not index.closed and metadata.rows(None) is None
+        hits = index.query([_vec("预算")], 1)
+        assert [node.node_id for node, _ in hits[0]] == ["laws.md"]
+    assert index.closed
+    reopened, _ = shard.open()
+    assert reopened is not index and not reopened.closed
+    assert [h.file for h in asyncio.run(service.search_global("预算", top_k=1, categories=["laws"]))] == ["laws.md"]
+
+
+def test_embedding_model_change_rebuilds_shards(service, monkeypatch):
+    """切换嵌入模型或维度后，文档未变化的分片也按当前模型重建；检索前发现旧模型构建的分片先重建再检索"""
+    monkeypatch.setattr(service, "_create_embed_model", lambda: SimpleNamespace(model_name="other-embed"))
+    assert asyncio.run(service.build_global_index(categories=["laws"]))
+    assert service.shards["laws"].stamp()["version"] == 2
+    assert service.shards["laws"].built_with() == ("other-embed", len(KEYWORDS))
+    assert asyncio.run(service.build_global_index(categories=["laws"]))  # 已与当前模型一致：跳过
+    assert service.shards["laws"].stamp()["version"] == 2
+
+    # 检索路径：standards / general 仍由 fake-embed 构建，检索前重建，结果来自新向量
+    service._embed_model = None
+    hits = asyncio.run(service.search_global("预算", top_k=2))
+    assert [h.file for h in hits] == ["laws.md", "standards.md"]
+    assert {c: service.shards[c].built_with()[0] for c in DOCS} == {c: "other-embed" for c in DOCS}
+    assert {c: service.shards[c].stamp()["version"] for c in DOCS} == {"laws": 2, "standards": 2, "general": 2}
+
+    monkeypatch.setattr(service, "_embed_dimensions", lambda: 2 * len(KEYWORDS))
+    assert asyncio.run(service.build_global_index(categories=["laws"]))
+    assert service.shards["laws"].stamp()["version"] == 3
+
+
+def test_identifier_query_answered_lexically_without_embedding(service, monkeypatch):
+    """编号类查询由分片 BM25 词法通道直接命中，不发嵌入请求；其余查询仍走向量通道"""
+    if not service.shards["laws"].open()[0].lexical_enabled:
+        pytest.skip("sqlite 不支持 FTS5")
+    calls = []
+
+    async def embed_queries(_model, queries):
+        calls.append(list(queries))
+        return [_vec(q) for q in queries]
+
+    monkeypatch.setattr(gk_module, "embed_queries", embed_queries)
+    results = asyncio.run(service.search_global_many(["财预〔2024〕12号", "预算"], top_k=1))
+    assert [[h.file for h in r] for r in results] == [["laws.md"], ["laws.md"]]
+    assert results[0][0].lexical_score is not None
+    assert calls == [["预算"]]
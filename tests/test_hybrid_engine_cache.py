@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+项目索引缓存的关闭时机测试：淘汰/失效的索引在没有在途检索时立即关闭，否则等检索结束后关闭
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("metagpt")
+pytest.importorskip("llama_index")
+
+from backend.services.hybrid_search import HybridSearchService
+
+
+class _FakeIndex:
+    def __init__(self):
+        self.closed = False
+        self.close_calls = 0
+
+    def close(self):
+        self.closed = True
+        self.close_calls += 1
+
+
+def _cached_service(*keys):
+    service = HybridSearchService()
+    indexes = {key: _FakeIndex() for key in keys}
+    for key, index in indexes.items():
+        service._project_indexes.put(key, (index, None, None), 1)
+    return service, indexes
+
+
+def test_invalidate_closes_idle_index():
+    service, indexes = _cached_service("p1")
+    service.invalidate_project_cache("p1")
+    assert indexes["p1"].close_calls == 1
+
+
+def test_evicted_index_closed_after_inflight_search():
+    """检索持有租约期间被失效或按容量淘汰的索引，在租约归还后才关闭，且只关闭一次"""
+    service, indexes = _cached_service("p1", "p2")
+
+    async def run():
+        async with service._leased_project_index("p1") as (index, _, _):
+            async with service._leased_project_index("p1"):
+                service.invalidate_project_cache("p1")
+            assert not index.closed  # 外层检索仍在进行
+        return index
+
+    assert asyncio.run(run()).close_calls == 1
+
+    async def evict_during_search():
+        async with service._leased_project_index("p2") as (index, _, _):
+            service._project_indexes.max_entries = 1
+            service._project_indexes.put("p3", (_FakeIndex(), None, None), 1)  # 按容量淘汰 p2
+            assert not index.closed
+        return index
+
+    assert asyncio.run(evict_during_search()).close_calls == 1
+
+
+def test_closed_index_is_reloaded():
+    """冷加载完成到恢复执行之间索引被淘汰关闭时，重新获取而不使用已关闭的索引"""
+    service = HybridSearchService()
+    stale, fresh = _FakeIndex(), _FakeIndex()
+    stale.close()
+    loads = iter([stale, fresh])
+
+    async def load(key, fn):
+        return next(loads), None, None
+
+    service._index_flights.do = load
+
+    async def run():
+        async with service._leased_project_index("p1") as (index, _, _):
+            return index
+
+    assert asyncio.run(run()) is fresh
+
+
+def test_failed_rebuild_keeps_previous_index(tmp_path, monkeypatch):
+    """全量重建在暂存目录进行：写入中途失败时原索引原样可用，成功后才替换原生文件与清单"""
+    np = pytest.importorskip("numpy")
+    from types import SimpleNamespace
+
+    from backend.services import hybrid_search as hybrid_module
+    from backend.tools.native_index import IndexedNode, NativeVectorIndex
+
+    source = tmp_path / "vector_storage" / "project_docs"
+    source.mkdir(parents=True)
+    (source / "a.md").write_text("新切块", encoding="utf-8")
+    service = HybridSearchService()
+    index_path = Path(service._get_project_vector_index_path(str(source)))
+    old = NativeVectorIndex.create(index_path, 2, model="fake-embed")  # 无清单的旧索引：同步时全量重建
+    old.add([IndexedNode("old", "旧切块")], np.ones((1, 2), dtype="float32"))
+    old.close()
+
+    node = SimpleNamespace(node_id="new", ref_doc_id="a.md", metadata={"file_name": "a.md"}, get_content=lambda: "新切块")
+
+    async def embed_nodes(_model, nodes):
+        return [[1.0, 0.0] for _ in nodes]
+
+    apply_sync = HybridSearchService._apply_sync
+    fail = {"on": True}
+
+    def flaky_apply(*args):
+        if fail["on"]:
+            raise RuntimeError("写入失败")
+        return apply_sync(*args)
+
+    monkeypatch.setattr(service, "_create_embed_model", lambda: SimpleNamespace(model_name="fake-embed"))
+    monkeypatch.setattr(hybrid_module, "load_file_nodes", lambda paths: [node])
+    monkeypatch.setattr(hybrid_module, "embed_nodes", embed_nodes)
+    monkeypatch.setattr(HybridSearchService, "_apply_sync", staticmethod(flaky_apply))
+
+    def texts():
+        index = NativeVectorIndex(index_path)
+        try:
+            return [n.text for n, _ in index.query([[1.0, 0.0]], 5)[0]]
+        finally:
+            index.close()
+
+    assert asyncio.run(service._sync_project_index(str(source)))
+    assert texts() == ["旧切块"] and not (index_path / "manifest.json").exists()
+    assert not index_path.with_name(index_path.name + ".building").exists()
+
+    fail["on"] = False
+    assert asyncio.run(service._sync_project_index(str(source)))
+    assert texts() == ["新切块"] and (index_path / "manifest.json").exists()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+向量索引清单测试（文件哈希比对得到新增/变更/删除）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.index_manifest import IndexManifest, scan_source_files
+
+
+def test_diff_detects_added_changed_removed(tmp_path):
+    docs = tmp_path / "project_docs"
+    index_dir = tmp_path / "vector_index"
+    docs.mkdir()
+    (docs / "a.md").write_text("项目A", encoding="utf-8")
+    (docs / "b.txt").write_text("项目B", encoding="utf-8")
+    (docs / "skip.pdf").write_bytes(b"%PDF")
+
+    current = scan_source_files(docs)
+    assert sorted(current) == ["a.md", "b.txt"]
+
+    manifest = IndexManifest(index_dir)
+    for name, digest in current.items():
+        manifest.set_file(name, digest, [f"{name}-n1", f"{name}-n2"], [f"{name}-doc"])
+    manifest.save()
+
+    (docs / "a.md").write_text("项目A（修订）", encoding="utf-8")
+    (docs / "b.txt").unlink()
+    (docs / "c.md").write_text("项目C", encoding="utf-8")
+
+    loaded = IndexManifest.load(index_dir)
+    diff = loaded.diff(scan_source_files(docs))
+    assert diff.added == ["c.md"]
+    assert diff.changed == ["a.md"]
+    assert diff.removed == ["b.txt"]
+    assert diff.to_embed == ["c.md", "a.md"]
+    assert loaded.node_ids("a.md") == ["a.md-n1", "a.md-n2"]
+
+
+def test_unchanged_files_produce_no_work(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("内容", encoding="utf-8")
+    manifest = IndexManifest(tmp_path)
+    manifest.set_file("a.md", scan_source_files(docs)["a.md"], ["n1"], ["d1"])
+    assert not manifest.diff(scan_source_files(docs)).has_changes
+
+
+def test_missing_or_corrupt_manifest_loads_empty(tmp_path):
+    assert not IndexManifest.load(tmp_path).exists()
+    (tmp_path / "manifest.json").write_text("{broken", encoding="utf-8")
+    assert IndexManifest.load(tmp_path).files == {}
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+sqlite 键值存储测试（搜索/网页等本地缓存的底层存储）
+"""
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.kv_store import SqliteKVStore
+
+
+def test_set_get_and_persist(tmp_path):
+    """写入后可读取，重新打开文件后仍然存在"""
+    path = tmp_path / "cache.sqlite3"
+    store = SqliteKVStore(path, table="search_results")
+    key = SqliteKVStore.make_key("alibaba", "绩效评价", 8, False)
+    store.set(key, '[{"link": "https://www.gov.cn"}]')
+    assert store.get(key) == '[{"link": "https://www.gov.cn"}]'
+    store.close()
+
+    reopened = SqliteKVStore(path, table="search_results")
+    assert reopened.get(key) == '[{"link": "https://www.gov.cn"}]'
+    assert len(reopened) == 1
+
+
+def test_max_age_expires_entries(tmp_path):
+    """超过 max_age 的记录视为不存在，purge 可清理"""
+    store = SqliteKVStore(tmp_path / "cache.sqlite3")
+    store.set("k", "v")
+    time.sleep(0.05)
+    assert store.get("k", max_age=10) == "v"
+    assert store.get("k", max_age=0.01) is None
+    assert store.purge_older_than(0.01) == 1
+    assert store.get("k") is None
+
+
+def test_make_key_is_stable_and_distinct():
+    """键对相同输入稳定，对不同参数区分"""
+    a = SqliteKVStore.make_key("alibaba", "查询", 8, False)
+    assert a == SqliteKVStore.make_key("alibaba", "查询", 8, False)
+    assert a != SqliteKVStore.make_key("alibaba", "查询", 6, False)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+词法检索测试（中文分词、编号类查询识别、RRF 融合、原生索引内的 BM25 倒排索引）
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.lexical_index import (
+    FTS5_AVAILABLE,
+    identifier_tokens,
+    is_identifier_query,
+    query_terms,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+def test_tokenize_chinese_bigrams_and_identifiers():
+    """中文取字二元组，英文数字整词，文号/指标编号整体成词（括号写法归一化）"""
+    tokens = tokenize("绩效评价 A101 指标，依据豫政办[2024]42号")
+    assert "绩效" in tokens and "效评" in tokens
+    assert "a101" in tokens
+    assert "豫政办〔2024〕42号" in tokens
+    assert "政办〔2024〕42号" in tokens  # 入库时登记多种机关代字长度
+    assert identifier_tokens("依据豫政办（2024）42号") == ["依据豫政办〔2024〕42号"]
+
+
+def test_identifier_query_detection():
+    assert is_identifier_query("豫政办〔2024〕42号")
+    assert is_identifier_query("A101")
+    assert is_identifier_query("A101、B-203")
+    assert not is_identifier_query("A101 指标的计算方法")
+    assert not is_identifier_query("项目绩效评价")
+    assert query_terms("豫政办【2024】42号") == ["豫政办〔2024〕42号"]
+
+
+def test_reciprocal_rank_fusion():
+    """两个列表都靠前的条目排名第一；权重改变贡献"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [key for key, _ in fused][:2] == ["b", "a"]
+    weighted = reciprocal_rank_fusion([["a"], ["d"]], weights=[0.3, 0.7])
+    assert [key for key, _ in weighted] == ["d", "a"]
+
+
+@pytest.mark.skipif(not FTS5_AVAILABLE, reason="sqlite 未编译 FTS5")
+def test_native_index_lexical_query(tmp_path):
+    """BM25 命中编号所在切块；删除后不再命中；旧文档库打开时补建词法表"""
+    np = pytest.importorskip("numpy")
+    from backend.tools.native_index import DOCSTORE_FILENAME, IndexedNode, NativeVectorIndex
+
+    texts = [
+        "根据《关于加强预算绩效管理的通知》（豫政办〔2024〕42号）开展评价",
+        "指标 A101 为项目完成率，A102 为资金到位率",
+        "满意度调查采用问卷方式进行",
+    ]
+    index = NativeVectorIndex.create(tmp_path, dims=4)
+    index.add([IndexedNode(f"n{i}", t) for i, t in enumerate(texts)], np.eye(3, 4, dtype="float32"))
+
+    hits = index.lexical_query(["豫政办〔2024〕42号", "A101", "问卷调查", "无关内容"], top_k=2)
+    assert [n.node_id for n, _ in hits[0]] == ["n0"]
+    assert [n.node_id for n, _ in hits[1]] == ["n1"]
+    assert hits[2][0][0].node_id == "n2"
+    assert hits[3] == []
+
+    index.delete(["n1"])
+    assert index.lexical_query(["A101"])[0] == []
+    index.close()
+
+    conn = sqlite3.connect(str(tmp_path / DOCSTORE_FILENAME))
+    conn.execute("DROP TABLE lexical")
+    conn.commit()
+    conn.close()
+    reopened = NativeVectorIndex(tmp_path)
+    assert reopened.lexical_enabled
+    assert [n.node_id for n, _ in reopened.lexical_query(["豫政办〔2024〕42号"])[0]] == ["n0"]
+    reopened.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+LLM 响应缓存与回放模式测试（使用假 LLM 基类，不依赖 MetaGPT）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import backend.tools.llm_cache as llm_cache
+from backend.tools.llm_cache import CachedAskMixin, LLMCacheMissError, LLMResponseCache
+
+
+class _FakeLLM:
+    model = "qwen-plus-latest"
+
+
+class _FakeAction:
+    """模拟 MetaGPT Action._aask：记录真实调用次数"""
+
+    def __init__(self):
+        self.llm = _FakeLLM()
+        self.calls = 0
+
+    async def _aask(self, prompt, system_msgs=None):
+        self.calls += 1
+        return f"answer:{prompt}"
+
+
+class _CachedAction(CachedAskMixin, _FakeAction):
+    pass
+
+
+def _use_cache(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: cache)
+
+
+def test_read_through_hits_after_first_call(tmp_path, monkeypatch):
+    """read_through：首次调用写入，相同 (model, system, prompt) 再次调用命中"""
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), mode="read_through")
+    _use_cache(monkeypatch, cache)
+    action = _CachedAction()
+
+    first = asyncio.run(action._aask("问题", ["系统"]))
+    second = asyncio.run(action._aask("问题", ["系统"]))
+    other_system = asyncio.run(action._aask("问题", ["另一个系统"]))
+
+    assert first == second == "answer:问题"
+    assert other_system == "answer:问题"
+    assert action.calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_record_only_never_reads(tmp_path, monkeypatch):
+    """record_only：总是调用 LLM 并写入"""
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), mode="record_only")
+    _use_cache(monkeypatch, cache)
+    action = _CachedAction()
+
+    asyncio.run(action._aask("问题"))
+    asyncio.run(action._aask("问题"))
+    assert action.calls == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_replay_serves_recorded_and_fails_on_miss(tmp_path, monkeypatch):
+    """replay：录制过的提示词直接回放，未录制的抛出 LLMCacheMissError"""
+    path = str(tmp_path / "llm.sqlite3")
+    recorder = LLMResponseCache(path, mode="record_only")
+    _use_cache(monkeypatch, recorder)
+    asyncio.run(_CachedAction()._aask("已录制"))
+
+    replay = LLMResponseCache(path, mode="replay")
+    _use_cache(monkeypatch, replay)
+    action = _CachedAction()
+    assert asyncio.run(action._aask("已录制")) == "answer:已录制"
+    assert action.calls == 0
+
+    try:
+        asyncio.run(action._aask("未录制"))
+    except LLMCacheMissError:
+        pass
+    else:
+        raise AssertionError("回放模式未命中时应抛出 LLMCacheMissError")
+    assert action.calls == 0
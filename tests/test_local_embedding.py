@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+本地哈希 n-gram 嵌入测试（离线嵌入后端）
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+np = pytest.importorskip("numpy")
+
+from backend.tools.local_embedding import HashNgramEncoder
+
+
+def test_vectors_are_deterministic_and_normalized():
+    """同一文本的向量稳定、维度固定且为单位长度；空文本为零向量"""
+    encoder = HashNgramEncoder(dimensions=256)
+    vecs = encoder.encode(["财政预算绩效评价", "财政预算绩效评价", ""])
+    assert vecs.shape == (3, 256)
+    assert np.allclose(vecs[0], vecs[1])
+    assert np.linalg.norm(vecs[0]) == pytest.approx(1.0, abs=1e-5)
+    assert not vecs[2].any()
+
+
+def test_similar_texts_score_higher():
+    """共享字符片段越多的文本内积越高"""
+    encoder = HashNgramEncoder(dimensions=1024)
+    query, near, far = encoder.encode([
+        "农村公益事业财政奖补项目绩效评价",
+        "财政奖补项目的绩效评价报告（农村公益事业）",
+        "Python asyncio event loop tutorial",
+    ])
+    assert float(query @ near) > float(query @ far) + 0.3
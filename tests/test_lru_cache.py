@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+按内存估算限额的 LRU/TTL 缓存测试（项目检索引擎缓存）
+"""
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.lru_cache import BoundedLRUCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    """超过字节上限时淘汰最久未访问的条目，并回调 on_evict"""
+    evicted = []
+    cache = BoundedLRUCache(max_bytes=100, max_entries=10, on_evict=lambda k, v, r: evicted.append((k, r)))
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"  # a 变为最近使用
+    cache.put("c", "C", 40)
+
+    assert evicted == [("b", "capacity")]
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 80
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] == 1
+
+
+def test_oversized_entry_is_kept_alone():
+    """单个条目超过上限时仍保留（保证当前引擎可用），其余条目被淘汰"""
+    cache = BoundedLRUCache(max_bytes=50, max_entries=10)
+    cache.put("a", "A", 30)
+    cache.put("big", "BIG", 200)
+    assert "a" not in cache
+    assert cache.get("big") == "BIG"
+
+
+def test_ttl_and_invalidate():
+    """超时未访问即过期；pop 主动失效并回调 invalidate"""
+    reasons = []
+    cache = BoundedLRUCache(max_bytes=1000, ttl_seconds=0.05, on_evict=lambda k, v, r: reasons.append(r))
+    cache.put("a", "A", 10)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+    cache.put("b", "B", 10)
+    assert cache.pop("b") == "B"
+    assert cache.pop("b") is None
+    assert reasons == ["ttl", "invalidate"]
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+旁车元数据过滤测试（过滤条件解析、候选行预过滤后的向量/词法检索）
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("metagpt")
+
+from backend.tools import metadata_filter as metadata_module
+from backend.tools.metadata_filter import MetadataFilter, MetadataIndex
+from backend.tools.native_index import IndexedNode, NativeVectorIndex
+
+
+def test_filter_coerce_and_match():
+    spec = MetadataFilter.coerce({"category": "laws", "tags": ["政策规范"], "year": (2020, None)})
+    assert spec == MetadataFilter(domain_tags=("政策规范",), year_from=2020, categories=("laws",))
+    assert spec.matches({"category": "laws", "domain_tags": ["政策规范", "通用"], "year": 2023})
+    assert not spec.matches({"category": "laws", "domain_tags": ["政策规范"], "year": 2019})
+    assert not spec.matches({"category": "laws", "domain_tags": ["政策规范"]})  # 缺少年份不命中
+    assert MetadataFilter.coerce({}) is None and MetadataFilter.coerce(MetadataFilter()) is None
+
+
+def test_prefiltered_vector_and_lexical_search(tmp_path):
+    """只对候选行打分：过滤掉的文档即使与查询完全相同也不会返回"""
+    docs = tmp_path / "documents"
+    docs.mkdir()
+    for name, meta in [("办法2021.md", {"category": "laws", "year": 2021}), ("模板.md", {"category": "templates"})]:
+        (docs / name).write_text("", encoding="utf-8")
+        (docs / (name + ".meta.json")).write_text(json.dumps(meta), encoding="utf-8")
+
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(40, 8)).astype("float32")
+    index = NativeVectorIndex.create(tmp_path / "index", dims=8)
+    files = ["办法2021.md"] * 20 + ["模板.md"] * 20
+    index.add(
+        [IndexedNode(f"n{i}", f"预算 绩效 {i}", metadata={"file_name": f}) for i, f in enumerate(files)], vecs
+    )
+    meta = MetadataIndex.build(index, sorted(p for p in docs.iterdir() if p.suffix == ".md"))
+
+    rows = meta.rows({"category": "laws", "year": (2020, 2022)})
+    assert rows.tolist() == list(range(20))
+    assert meta.rows(None) is None and len(meta.rows({"category": "standards"})) == 0
+
+    hits = index.query(vecs[25:27], top_k=3, rows=rows)
+    assert all(node.metadata["file_name"] == "办法2021.md" for per_query in hits for node, _ in per_query)
+    dist = ((vecs[:2, None, :] - vecs[None, :20, :]) ** 2).sum(-1)
+    expected = [[f"n{i}" for i in np.argsort(d)[:3]] for d in dist]
+    assert [[n.node_id for n, _ in h] for h in index.query(vecs[:2], top_k=3, rows=rows)] == expected
+
+    lexical = index.lexical_query(["绩效"], top_k=50, rows=meta.rows({"category": "templates"}))[0]
+    assert {node.node_id for node, _ in lexical} == {f"n{i}" for i in range(20, 40)}
+    index.close()
+
+
+def test_unparseable_year_is_no_match(monkeypatch):
+    """旁车年份建表时解析一次："2021年" 视为 2021，"unknown" 告警后按年份过滤不命中，不影响其他文档"""
+    warnings = []
+    monkeypatch.setattr(metadata_module, "logger", SimpleNamespace(warning=warnings.append))
+    file_rows = {name: np.array([i]) for i, name in enumerate(["a.md", "b.md", "c.md"])}
+    meta = MetadataIndex(
+        {"a.md": {"year": "2021年"}, "b.md": {"year": "unknown", "category": "laws"}, "c.md": {"year": 2023}},
+        file_rows,
+    )
+    assert len(warnings) == 1 and "b.md" in warnings[0]
+    assert meta.rows({"year": (2020, 2022)}).tolist() == [0]
+    assert meta.rows({"year_from": 2000}).tolist() == [0, 2]
+    assert meta.rows({"category": "laws"}).tolist() == [1]
+    assert not MetadataFilter(year_from=2000).matches({"year": "unknown"})
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+原生向量索引测试（内存映射向量 + sqlite 文档库，llama-index JSON 索引迁移）
+"""
+import json
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+np = pytest.importorskip("numpy")
+
+from backend.tools.native_index import IndexedNode, NativeVectorIndex, migrate_llama_index
+
+
+def _unit_vectors(n, dims=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dims)).astype("float32")
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_add_search_delete_and_reopen(tmp_path):
+    """批量检索返回最近邻；删除后不再命中；重新打开后数据一致"""
+    vecs = _unit_vectors(20)
+    index = NativeVectorIndex.create(tmp_path, dims=8)
+    index.add([IndexedNode(f"n{i}", f"切块{i}", ref_doc_id=f"doc{i // 5}") for i in range(20)], vecs)
+
+    hits = index.query(vecs[[3, 7]], top_k=2)
+    assert [h[0][0].node_id for h in hits] == ["n3", "n7"]
+    assert hits[0][0][1] == pytest.approx(0.0, abs=1e-5)
+
+    assert index.delete(["n3"]) == 1
+    assert index.query(vecs[[3]], top_k=1)[0][0][0].node_id != "n3"
+    index.close()
+
+    reopened = NativeVectorIndex(tmp_path)
+    assert len(reopened) == 19
+    assert reopened.query(vecs[[7]], top_k=1)[0][0][0].text == "切块7"
+
+
+def test_compaction_keeps_live_rows(tmp_path):
+    """墓碑过多时整理为新一代向量文件，剩余节点仍可检索"""
+    vecs = _unit_vectors(10, seed=1)
+    index = NativeVectorIndex.create(tmp_path, dims=8)
+    index.add([IndexedNode(f"n{i}", f"t{i}") for i in range(10)], vecs)
+    index.delete([f"n{i}" for i in range(6)])
+
+    assert sorted(p.name for p in tmp_path.glob("vectors-*.f32")) == ["vectors-1.f32"]
+    assert len(index) == 4
+    for i in range(6, 10):
+        assert index.query(vecs[[i]], top_k=1)[0][0][0].node_id == f"n{i}"
+
+
+def test_migrate_llama_index_json(tmp_path):
+    """从 llama-index 持久化目录（FAISS IndexFlatL2 二进制 + JSON 文档库）迁移，node_id 保持不变"""
+    vecs = _unit_vectors(3, dims=4, seed=2)
+    header = b"IxF2" + struct.pack("<iqqqBi", 4, 3, 1 << 20, 1 << 20, 1, 1) + struct.pack("<Q", vecs.size)
+    (tmp_path / "default__vector_store.json").write_bytes(header + vecs.tobytes())
+    nodes_dict = {"0": "a", "1": "b", "2": "c"}
+    (tmp_path / "index_store.json").write_text(json.dumps({"index_store/data": {"x": {
+        "__type__": "vector_store", "__data__": json.dumps({"index_id": "x", "nodes_dict": nodes_dict}),
+    }}}))
+    docstore = {nid: {"__type__": "1", "__data__": {
+        "id_": nid, "text": f"文本{nid}", "metadata": {"file_name": "f.md"},
+        "relationships": {"1": {"node_id": "doc"}}, "start_char_idx": 0, "end_char_idx": 3,
+    }} for nid in nodes_dict.values()}
+    (tmp_path / "docstore.json").write_text(json.dumps({"docstore/data": docstore}, ensure_ascii=False))
+
+    index = NativeVectorIndex.open_or_migrate(tmp_path, model="text-embedding-v3")
+    # 默认保留 JSON 文件（可回退），记录嵌入模型；不留下迁移临时目录
+    assert (tmp_path / "docstore.json").exists() and index.model == "text-embedding-v3"
+    assert not tmp_path.with_name(tmp_path.name + ".migrating").exists()
+    node, dist = index.query(vecs[[1]], top_k=1)[0][0]
+    assert (node.node_id, node.text, node.ref_doc_id, node.metadata) == ("b", "文本b", "doc", {"file_name": "f.md"})
+    assert dist == pytest.approx(0.0, abs=1e-5)
+    index.close()
+    assert NativeVectorIndex.open_or_migrate(tmp_path).model == "text-embedding-v3"  # 再次打开直接用原生索引
+
+    for path in tmp_path.glob("*"):
+        if path.name not in ("default__vector_store.json", "docstore.json", "index_store.json"):
+            path.unlink()
+    migrate_llama_index(tmp_path, remove_legacy=True).close()
+    assert not (tmp_path / "docstore.json").exists()
+
+
+def test_install_staged_index_replaces_native_files_only(tmp_path):
+    """暂存目录的索引移入后替换旧原生文件（含旧代号向量文件），目录中的其他文件保留"""
+    from backend.tools.native_index import install_staged_index
+
+    live, staging = tmp_path / "index", tmp_path / "index.building"
+    old = NativeVectorIndex.create(live, 2)
+    old.add([IndexedNode("old", "旧")], np.ones((1, 2), dtype="float32"))
+    old.close()
+    stale = live / "vectors-99.f32"
+    stale.write_bytes(b"")
+    (live / "docstore.json").write_text("{}", encoding="utf-8")
+    new = NativeVectorIndex.create(staging, 2)
+    new.add([IndexedNode("new", "新")], np.ones((1, 2), dtype="float32"))
+    new.close()
+
+    install_staged_index(staging, live)
+    index = NativeVectorIndex(live)
+    assert [n.node_id for n, _ in index.query([[1.0, 1.0]], 5)[0]] == ["new"]
+    index.close()
+    assert not stale.exists() and (live / "docstore.json").exists()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+网页近重复检测测试（SimHash 分组）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.near_dup import NearDuplicateDetector, hamming_distance, simhash
+
+NOTICE = (
+    "关于印发《某省财政支出绩效评价管理办法》的通知。各市、县财政局，省直各部门："
+    "为全面实施预算绩效管理，提高财政资金使用效益，根据《中华人民共和国预算法》"
+    "及有关规定，我厅制定了本办法，现予印发，请认真贯彻执行。第一条 为规范财政支出"
+    "绩效评价行为，建立科学合理的绩效评价管理体系，制定本办法。第二条 本办法适用于"
+    "各级财政部门和预算部门开展的绩效评价工作。第三条 绩效评价应当遵循科学规范、"
+    "公正公开、分级分类、绩效相关的原则。"
+)
+
+
+def test_mirrored_pages_grouped_with_longest_as_representative():
+    mirror = "首页 > 政策文件\n" + NOTICE + "\n（来源：某市财政局 转载）"  # 转载页外壳更长，成为代表页
+    other = "某县农村公路建设项目2024年完成投资1.2亿元，新改建道路86公里。" * 5
+    groups = NearDuplicateDetector().group([
+        ("https://czt.a.gov.cn/1", NOTICE),
+        ("https://xx.gov.cn/news", other),
+        ("https://czj.b.gov.cn/2", mirror),
+    ])
+    assert groups == [["https://czj.b.gov.cn/2", "https://czt.a.gov.cn/1"], ["https://xx.gov.cn/news"]]
+
+
+def test_short_or_failed_pages_never_merged():
+    groups = NearDuplicateDetector().group([("a", ""), ("b", ""), ("c", "404 Not Found")])
+    assert groups == [["a"], ["b"], ["c"]]
+
+
+def test_simhash_distance_small_for_near_duplicates():
+    assert hamming_distance(simhash(NOTICE), simhash(NOTICE + "（转载）")) <= 3
+    assert hamming_distance(simhash(NOTICE), simhash("完全不同的一段文本内容" * 10)) > 3
+
+
+def test_chrome_only_stub_does_not_swallow_articles():
+    """只有导航/页脚外壳的短页先到达成为代表页时，共享同一外壳的正文页不被判为其镜像；正文的转载页仍能识别"""
+    chrome = "首页 政务公开 政策文件 通知公告 办事服务 互动交流 网站地图 联系我们 版权所有 某省财政厅 备案号 ICP备12345678号 " * 2
+    article = chrome + NOTICE + chrome
+    mirror = "首页 > 政策文件\n" + NOTICE + "\n（来源：某市财政局 转载）"
+    detector = NearDuplicateDetector(min_chars=50)
+
+    assert detector.find_or_add("stub", chrome) is None
+    assert detector.find_or_add("article", article) is None
+    assert detector.find_or_add("mirror", mirror) == "article"
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+网页缓存测试（新鲜命中零请求、304 条件校验、ETag 变化重新抓取、未启用/不校验路径）
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools import page_cache as page_cache_module
+from backend.tools.page_cache import PageCache
+
+URL = "https://czt.example.gov.cn/notice/1.html"
+
+
+class _Site:
+    """替身站点：记录抓取与 HEAD 次数，HEAD 按当前 ETag 响应条件请求"""
+
+    def __init__(self, etag='"v1"', text="绩效评价管理办法全文"):
+        self.etag = etag
+        self.text = text
+        self.fetches = 0
+        self.heads = []
+        self.slots = 0
+
+    async def fetch(self, url):
+        self.fetches += 1
+        return self.text, {"etag": self.etag}
+
+    async def head(self, url, record=None):
+        self.heads.append(dict(record or {}))
+        if record and record.get("etag") == self.etag:
+            return 304, {}
+        return 200, {"etag": self.etag}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        self.slots += 1
+        yield
+
+
+def _cache(tmp_path, site, **kwargs):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), **kwargs)
+    cache._head = site.head
+    return cache
+
+
+def test_miss_fetches_once_without_head_and_fresh_hit_sends_nothing(tmp_path):
+    site = _Site()
+    cache = _cache(tmp_path, site)
+    assert asyncio.run(cache.get_or_fetch(URL, site.fetch, site.slot)) == site.text
+    assert asyncio.run(cache.get_or_fetch(URL, site.fetch, site.slot)) == site.text
+    assert (site.fetches, site.heads) == (1, [])
+    assert cache.stats == {"fresh_hits": 1, "revalidated": 0, "fetched": 1}
+
+
+def test_stale_entry_revalidated_with_304(tmp_path):
+    """过期后只发一次条件 HEAD（附带缓存的 ETag，计入域名槽位），304 时复用缓存"""
+    site = _Site()
+    cache = _cache(tmp_path, site, fresh_seconds=0)
+    asyncio.run(cache.get_or_fetch(URL, site.fetch, site.slot))
+    assert asyncio.run(cache.get_or_fetch(URL, site.fetch, site.slot)) == site.text
+    assert site.fetches == 1 and [h["etag"] for h in site.heads] == ['"v1"'] and site.slots == 1
+    assert cache.stats["revalidated"] == 1
+
+
+def test_changed_etag_refetches(tmp_path):
+    site = _Site()
+    cache = _cache(tmp_path, site, fresh_seconds=0)
+    asyncio.run(cache.get_or_fetch(URL, site.fetch))
+    site.etag, site.text = '"v2"', "修订后的管理办法全文"
+    assert asyncio.run(cache.get_or_fetch(URL, site.fetch)) == "修订后的管理办法全文"
+    assert site.fetches == 2 and len(site.heads) == 1
+    assert asyncio.run(cache.get_or_fetch(URL, site.fetch)) == "修订后的管理办法全文"  # 新 ETag 已记录：304
+    assert site.fetches == 2 and site.heads[-1]["etag"] == '"v2"'
+
+
+def test_disabled_and_no_revalidate_paths(tmp_path, monkeypatch):
+    """未启用时不提供缓存；关闭校验时过期条目直接重新抓取，不发 HEAD"""
+    monkeypatch.setattr(page_cache_module, "PAGE_CACHE", {"enabled": False})
+    monkeypatch.setattr(page_cache_module, "_default_cache", None)
+    assert page_cache_module.get_page_cache() is None
+
+    site = _Site()
+    cache = _cache(tmp_path, site, fresh_seconds=0, revalidate=False)
+    asyncio.run(cache.get_or_fetch(URL, site.fetch))
+    asyncio.run(cache.get_or_fetch(URL, site.fetch))
+    assert (site.fetches, site.heads) == (2, [])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+异步分阶段流水线测试（扇出、背压、指标、异常传播）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.pipeline import Stage, StagePipeline
+
+
+def test_fan_out_flows_through_all_stages():
+    async def expand(n):
+        return [(n, i) for i in range(n)]
+
+    async def square(item):
+        await asyncio.sleep(0.001)
+        n, i = item
+        return [n * 10 + i]
+
+    pipeline = StagePipeline([
+        Stage("expand", expand, workers=2, queue_size=1),
+        Stage("square", square, workers=3, queue_size=2),
+    ])
+    outputs = asyncio.run(pipeline.run([1, 2, 3]))
+
+    assert sorted(outputs) == [10, 20, 21, 30, 31, 32]
+    metrics = pipeline.metrics()
+    assert metrics["expand"]["processed"] == 3
+    assert metrics["expand"]["emitted"] == 6
+    assert metrics["square"]["processed"] == 6
+    assert metrics["square"]["max_queue_depth"] <= 2  # 有界队列约束
+
+
+def test_early_items_reach_downstream_before_slow_upstream_finishes():
+    """慢的上游条目不阻塞已完成条目进入下游"""
+    order = []
+
+    async def search(item):
+        await asyncio.sleep(0.05 if item == "slow" else 0)
+        return [item]
+
+    async def summarize(item):
+        order.append(item)
+        return [item]
+
+    pipeline = StagePipeline([Stage("search", search, workers=2), Stage("summarize", summarize)])
+    asyncio.run(pipeline.run(["slow", "fast"]))
+    assert order == ["fast", "slow"]
+
+
+def test_handler_error_propagates_and_is_counted():
+    async def boom(item):
+        if item == 2:
+            raise ValueError("搜索失败")
+        return [item]
+
+    pipeline = StagePipeline([Stage("search", boom, workers=2), Stage("index", boom)])
+    try:
+        asyncio.run(pipeline.run([1, 2, 3]))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("处理函数异常应向上抛出")
+    assert pipeline.metrics()["search"]["errors"] == 1
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+提示词 token 预算打包测试（必保段保留、低优先级先压缩/丢弃）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.prompt_packer import PromptPacker, PromptSegment, count_tokens, truncate_to_tokens
+
+
+def test_truncate_to_tokens_respects_budget():
+    text = "\n".join(f"第{i}段：项目资金拨付情况说明。" for i in range(200))
+    cut = truncate_to_tokens(text, 100)
+    assert count_tokens(cut) <= 100
+    assert text.startswith(cut)
+    assert truncate_to_tokens("短文本", 100) == "短文本"
+
+
+def test_required_segments_kept_and_lowest_priority_compressed_first():
+    whitelist = "allowed_web_urls: [\"https://a.gov.cn\"]"
+    facts = "关键事实：预算 500 万元。" * 20
+    bulk = "网页正文。" * 2000
+    budget = count_tokens(whitelist) + count_tokens(facts) + 200
+    result = PromptPacker(budget).pack([
+        PromptSegment("bulk", bulk, priority=3),
+        PromptSegment("whitelist", whitelist, required=True),
+        PromptSegment("facts", facts, priority=1),
+    ])
+
+    assert result.texts["whitelist"] == whitelist
+    assert result.texts["facts"] == facts
+    assert result.compressed == ["bulk"]
+    assert 0 < len(result.texts["bulk"]) < len(bulk)
+    assert result.tokens_used <= budget
+    assert result.tokens_saved > 0
+
+
+def test_segment_dropped_when_no_room_left():
+    result = PromptPacker(100).pack(
+        [PromptSegment("bulk", "正文" * 500, priority=2)],
+        reserved_tokens=90,
+    )
+    assert result.texts["bulk"] == ""
+    assert result.dropped == ["bulk"]
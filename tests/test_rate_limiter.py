@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+令牌桶限流与重试退避测试（不依赖外部服务）
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.rate_limiter import TokenBucket, get_rate_limiter, retry_async
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    """突发容量内立即放行，超出后按速率等待"""
+    async def _run():
+        bucket = TokenBucket(rate=20.0, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst_elapsed = time.monotonic() - start
+        for _ in range(2):
+            await bucket.acquire()
+        total_elapsed = time.monotonic() - start
+        return burst_elapsed, total_elapsed
+
+    burst_elapsed, total_elapsed = asyncio.run(_run())
+    assert burst_elapsed < 0.05
+    # 额外2个令牌需按 20/s 补充，约 0.1s
+    assert total_elapsed >= 0.08
+
+
+def test_token_bucket_concurrent_callers_respect_rate():
+    """并发调用者共享同一速率"""
+    async def _run():
+        bucket = TokenBucket(rate=50.0, burst=1)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(_run())
+    assert elapsed >= 0.09  # 5 个令牌需等待补充（约 0.1s）
+
+
+def test_get_rate_limiter_is_shared_and_reusable_across_loops():
+    """同名限流器为共享实例，且可在多个事件循环中复用"""
+    limiter = get_rate_limiter("search")
+    assert limiter is get_rate_limiter("search")
+    asyncio.run(limiter.acquire())
+    asyncio.run(limiter.acquire())
+
+
+def test_retry_async_retries_then_succeeds():
+    """失败后按退避重试，直到成功"""
+    calls = {"n": 0}
+    retried = []
+
+    async def flaky():
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise RuntimeError("temporary")
+        return "ok"
+
+    result = asyncio.run(retry_async(
+        flaky, retries=3, backoff_base=0.01, backoff_max=0.02,
+        on_retry=lambda attempt, e, delay: retried.append(attempt),
+    ))
+    assert result == "ok"
+    assert calls["n"] == 3
+    assert retried == [1, 2]
+
+
+def test_retry_async_raises_after_exhaustion():
+    """重试耗尽后抛出最后一次异常"""
+    async def always_fail():
+        raise ValueError("boom")
+
+    try:
+        asyncio.run(retry_async(always_fail, retries=2, backoff_base=0.001))
+    except ValueError as e:
+        assert "boom" in str(e)
+    else:
+        raise AssertionError("应当抛出异常")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+研究流水线测试（近重复镜像来源的合并：代表页被过滤时镜像一并丢弃，否则附在代表页来源行上；
+智能检索增强的批量查询只发一次查询嵌入请求）
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("metagpt")
+
+from backend.actions.research_action import ConductComprehensiveResearch
+from backend.tools.near_dup import NearDuplicateDetector
+
+NOTICE = (
+    "关于印发《某省财政支出绩效评价管理办法》的通知。各市、县财政局，省直各部门："
+    "为全面实施预算绩效管理，提高财政资金使用效益，根据《中华人民共和国预算法》"
+    "及有关规定，我厅制定了本办法，现予印发，请认真贯彻执行。第一条 为规范财政支出"
+    "绩效评价行为，建立科学合理的绩效评价管理体系，制定本办法。"
+)
+OTHER = "某县农村公路建设项目2024年完成投资1.2亿元，新改建道路86公里。" * 5
+PAGES = {"https://a.gov.cn/1": NOTICE, "https://b.gov.cn/2": NOTICE + "（转载）", "https://c.gov.cn/3": OTHER}
+
+
+def _run(summaries):
+    """以替身对象运行 _run_question_pipeline：代表页先于镜像抓取完成，总结结果由 summaries 指定"""
+    async def search(query, num):
+        return list(PAGES)
+
+    async def rank(topic, query, results, num):
+        return results
+
+    async def fetch(url):
+        if url == "https://b.gov.cn/2":
+            await asyncio.sleep(0.05)  # 镜像晚于代表页到达
+        return PAGES[url]
+
+    async def summarize(url, query, page):
+        return f"#### 来源: {url}\n{summaries[url]}"
+
+    action = SimpleNamespace(
+        _search_query_results=search,
+        _rank_urls=rank,
+        _fetch_page_or_none=fetch,
+        _summarize_page=summarize,
+        _new_near_dup_detector=lambda: NearDuplicateDetector(min_chars=50),
+        _attach_mirrors=ConductComprehensiveResearch._attach_mirrors,
+        _extract_source_urls=ConductComprehensiveResearch._extract_source_urls,
+    )
+    return asyncio.run(ConductComprehensiveResearch._run_question_pipeline(action, "绩效评价", ["问题一"], 3))
+
+
+def test_mirror_dropped_with_filtered_representative():
+    report = _run({"https://a.gov.cn/1": "该页面与问题不相关。", "https://c.gov.cn/3": "完成投资1.2亿元。"})
+    assert "a.gov.cn" not in report and "b.gov.cn" not in report
+    assert "#### 来源: https://c.gov.cn/3\n完成投资1.2亿元。" in report
+    assert ConductComprehensiveResearch._extract_source_urls(report) == ["https://c.gov.cn/3"]
+
+
+def test_mirror_attached_to_kept_representative():
+    """镜像以独立来源行附在代表页块后，run() 的来源白名单同时包含代表页与镜像的完整URL"""
+    report = _run({"https://a.gov.cn/1": "印发绩效评价管理办法。", "https://c.gov.cn/3": "完成投资1.2亿元。"})
+    assert "#### 来源: https://a.gov.cn/1\n印发绩效评价管理办法。\n#### 来源: https://b.gov.cn/2（镜像" in report
+    assert ConductComprehensiveResearch._extract_source_urls(report) == [
+        "https://a.gov.cn/1", "https://b.gov.cn/2", "https://c.gov.cn/3"
+    ]
+
+
+def test_enhancement_round_embeds_queries_once(tmp_path, monkeypatch):
+    """增强查询经 intelligent_search_many -> hybrid_search_many 批量检索：项目与全局知识库共用一次查询嵌入请求"""
+    pytest.importorskip("llama_index")
+    from backend.actions import research_action as research_module
+    from backend.services import global_knowledge as gk_module
+    from backend.services import hybrid_search as hybrid_module
+    from backend.services.intelligent_search import intelligent_search
+    from backend.tools.native_index import IndexedNode
+
+    requests = []
+
+    async def embed_queries(_model, queries):
+        requests.append(list(queries))
+        return [[1.0, 0.0] for _ in queries]
+
+    node = IndexedNode("p1", "项目绩效目标完成情况", metadata={"file_name": "项目.md"})
+    index = SimpleNamespace(
+        closed=False,
+        close=lambda: None,
+        lexical_enabled=False,
+        metric="l2",
+        query=lambda embeddings, top_k, rows=None: [[(node, 0.1)] for _ in embeddings],
+    )
+    metadata = SimpleNamespace(rows=lambda filters: None)
+    project_path = str(tmp_path / "project_docs")
+
+    service = hybrid_module.hybrid_search
+    global_service = hybrid_module.global_knowledge
+    shard_queries = []
+
+    def shard_query(embeddings, top_k, spec):
+        shard_queries.append(len(embeddings))
+        return [[] for _ in embeddings]
+
+    monkeypatch.setattr(hybrid_module, "embed_queries", embed_queries)
+    monkeypatch.setattr(gk_module, "embed_queries", embed_queries)
+    monkeypatch.setattr(service, "_create_embed_model", lambda: None)
+    monkeypatch.setattr(global_service, "_create_embed_model", lambda: None)
+    async def current_categories(categories):
+        return list(categories)
+
+    monkeypatch.setattr(global_service, "route_categories", lambda query, spec=None: ["general"])
+    monkeypatch.setattr(global_service, "_current_categories", current_categories)
+    monkeypatch.setattr(global_service.shards["general"], "query", shard_query)
+    monkeypatch.setattr(intelligent_search, "_knowledge_graph_search", lambda *args: asyncio.sleep(0))
+    monkeypatch.setattr(research_module, "ENHANCEMENT_QUERIES", ["{topic}绩效目标", "{topic}资金使用", "{topic}政策依据"])
+    service._project_indexes.put(project_path, (index, None, metadata), 1)
+    try:
+        enhanced = asyncio.run(ConductComprehensiveResearch._enhance_research_with_intelligent_search(
+            SimpleNamespace(), "农村公路", "原始素材", project_path
+        ))
+    finally:
+        service._project_indexes.pop(project_path)
+
+    assert requests == [["农村公路绩效目标", "农村公路资金使用", "农村公路政策依据"]]
+    assert shard_queries == [3]
+    assert enhanced.count("项目绩效目标完成情况") == 3
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+搜索结果缓存测试（TTL 过期、旁路刷新、命中统计、键对参数顺序与空白稳定）
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("metagpt")
+
+from metagpt.tools import SearchEngineType
+
+from backend.tools import kv_store
+from backend.tools.search_cache import CachedSearchEngine, SearchResultCache
+
+
+class _CountingEngine:
+    """替身搜索引擎：记录真实调用次数，每次返回带序号的结果便于区分新旧"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, query, max_results=8, as_string=True):
+        self.calls.append(query)
+        return f"{query} 的第 {len(self.calls)} 次结果"
+
+
+def _engine(tmp_path, **kwargs):
+    fake = _CountingEngine()
+    cache = SearchResultCache(str(tmp_path / "search.sqlite3"), **kwargs)
+    engine = CachedSearchEngine(cache=cache, engine=SearchEngineType.CUSTOM_ENGINE, run_func=fake.run)
+    return engine, cache, fake
+
+
+def test_hit_miss_counters_and_stable_key(tmp_path):
+    """首次未命中调用引擎；参数以关键字乱序传入、查询带多余空白时仍命中同一条缓存"""
+    engine, cache, fake = _engine(tmp_path)
+    first = asyncio.run(engine.run("绩效评价 管理办法", 5, True))
+    again = asyncio.run(engine.run(as_string=True, max_results=5, query="  绩效评价\n  管理办法 "))
+    assert first == again == "绩效评价 管理办法 的第 1 次结果"
+    assert len(fake.calls) == 1
+    assert asyncio.run(engine.run("绩效评价 管理办法", max_results=8)) != first  # max_results 不同为另一条键
+    assert len(fake.calls) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"]) == (1, 2, 2, 0.333)
+
+
+def test_ttl_expiry_refetches(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(kv_store, "time", SimpleNamespace(time=lambda: clock[0]))
+    engine, cache, fake = _engine(tmp_path, ttl_seconds=60)
+    asyncio.run(engine.run("专项资金"))
+    clock[0] += 59
+    assert asyncio.run(engine.run("专项资金")) == "专项资金 的第 1 次结果"
+    clock[0] += 2
+    assert asyncio.run(engine.run("专项资金")) == "专项资金 的第 2 次结果"
+    assert (len(fake.calls), cache.hits, cache.misses) == (2, 1, 2)
+
+
+def test_bypass_refreshes_and_empty_results_not_cached(tmp_path):
+    """旁路时总是调用引擎并写入最新结果，关闭旁路后读到刷新后的结果；空结果不入缓存"""
+    engine, cache, fake = _engine(tmp_path)
+    asyncio.run(engine.run("预算绩效"))
+    cache.bypass = True
+    assert asyncio.run(engine.run("预算绩效")) == "预算绩效 的第 2 次结果"
+    assert cache.hits == 0 and len(fake.calls) == 2
+    cache.bypass = False
+    assert asyncio.run(engine.run("预算绩效")) == "预算绩效 的第 2 次结果"
+    assert len(fake.calls) == 2 and cache.stats()["bypass"] is False
+
+    empty = SearchResultCache(str(tmp_path / "empty.sqlite3"))
+    calls = []
+
+    async def nothing(query, max_results=8, as_string=True):
+        calls.append(query)
+        return ""
+
+    engine = CachedSearchEngine(cache=empty, engine=SearchEngineType.CUSTOM_ENGINE, run_func=nothing)
+    asyncio.run(engine.run("无结果"))
+    asyncio.run(engine.run("无结果"))
+    assert len(calls) == 2 and len(empty._store) == 0
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+结构化检索结果测试（按 id 去重、分数排序、提示词格式化）
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.search_hit import (
+    SearchHit, as_hit, dedupe_hits, distance_to_score, format_hits, hit_from_node, merge_ranked_hits
+)
+
+
+def test_hit_from_node_keeps_ids_and_offsets():
+    node = SimpleNamespace(
+        node_id="n1", text=" 预算执行率 98% ", metadata={"file_name": "报告.md"}, start_char_idx=10, end_char_idx=20
+    )
+    hit = hit_from_node(node, 0.5, "project")
+    assert (hit.text, hit.node_id, hit.file, hit.start_char_idx, hit.end_char_idx) == (
+        "预算执行率 98%", "n1", "报告.md", 10, 20
+    )
+    assert distance_to_score(0.0) == 1.0 and distance_to_score(-0.8, "ip") == 0.8
+
+
+def test_dedupe_by_id_keeps_best_score():
+    """同 node_id 保留高分；无 id 的纯文本按内容去重；结果按分数降序"""
+    hits = [
+        SearchHit("甲", 0.2, "project", node_id="a"),
+        SearchHit("甲（全局副本）", 0.9, "global", node_id="a"),
+        SearchHit("乙", 0.5, "global"),
+        as_hit(" 乙 ", "global", 0.1),
+        SearchHit("", 1.0, "project", node_id="empty"),
+    ]
+    result = dedupe_hits(hits)
+    assert [(h.node_id, h.score) for h in result] == [("a", 0.9), (None, 0.5)]
+
+
+def test_format_hits_only_at_prompt_time():
+    hits = [SearchHit("项目内容", 1.0, "project"), SearchHit("全局内容", 0.5, "global"), "旧格式文本"]
+    assert format_hits(hits) == ["📁 [项目知识] 项目内容", "🌍 [全局知识] 全局内容", "旧格式文本"]
+    assert format_hits(hits[:2], with_source=False) == ["项目内容", "全局内容"]
+    assert format_hits([SearchHit("联邦结果", 0.1, "project", project="project01")]) == ["📁 [项目知识](project01) 联邦结果"]
+
+
+def test_merge_ranked_hits_ranks_each_channel_across_indexes():
+    """跨索引合并按通道排名：各列表的第一名不再同分，排序与列表顺序无关"""
+    alpha = [SearchHit("a1", 0.03, node_id="a1", project="alpha", similarity=0.5),
+             SearchHit("a2", 0.02, node_id="a2", project="alpha", similarity=0.4)]
+    beta = [SearchHit("b1", 0.03, node_id="b1", project="beta", similarity=0.9),
+            SearchHit("b2", 0.02, node_id="b2", project="beta", similarity=0.3)]
+    merged = merge_ranked_hits([alpha, beta], top_k=3)
+    assert [(h.node_id, h.project) for h in merged] == [("b1", "beta"), ("a1", "alpha"), ("a2", "alpha")]
+    assert merged[0].score > merged[1].score > merged[2].score
+
+
+def test_merge_ranked_hits_mixes_fast_path_and_vector_hits():
+    """词法直达（无相似度、BM25 分无上界）与向量命中混合时，不因分数量纲不同而压过全部向量命中"""
+    alpha = [SearchHit("编号命中", 12.0, node_id="a1", project="alpha", lexical_score=12.0)]
+    beta = [SearchHit("b1", 0.03, node_id="b1", project="beta", similarity=0.9, lexical_score=3.0),
+            SearchHit("b2", 0.02, node_id="b2", project="beta", similarity=0.5)]
+    merged = merge_ranked_hits([alpha, beta], top_k=3)
+    assert [h.node_id for h in merged] == ["b1", "a1", "b2"]
+    # 仅词法命中（融合分很小）按词法通道排名参与，不会沉底
+    gamma = [SearchHit("g1", 0.016, node_id="g1", project="gamma", lexical_score=20.0)]
+    assert [h.node_id for h in merge_ranked_hits([beta, gamma], top_k=3)] == ["b1", "g1", "b2"]
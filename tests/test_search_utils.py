@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+搜索工具函数测试（关键词规范化、相关段落筛选）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.search_utils import normalize_keywords, select_relevant_passages
+
+
+def test_normalize_keywords_flattens_and_dedupes():
+    raw = ["绩效评价", {"category": "政策", "keywords": ["预算法", "绩效评价"]}, "  "]
+    assert normalize_keywords(raw, "主题") == ["绩效评价", "预算法"]
+    assert normalize_keywords([], "主题") == ["主题"]
+
+
+def test_select_relevant_passages_keeps_matching_paragraphs_in_order():
+    """只保留命中关键词的段落，并保持原文顺序"""
+    notes = "\n\n".join([
+        "#### 来源: https://a.gov.cn\n项目预算资金 500 万元，已拨付 300 万元。",
+        "当地天气晴朗。" * 20,
+        "2024年3月1日 项目开工，资金支付进度正常。",
+    ])
+    selected = select_relevant_passages(notes, ["资金", "预算"], max_chars=200)
+    assert "预算资金" in selected
+    assert "天气" not in selected
+    assert selected.index("预算资金") < selected.index("开工")
+
+
+def test_select_relevant_passages_short_text_unchanged():
+    assert select_relevant_passages("短文本", ["资金"], max_chars=100) == "短文本"
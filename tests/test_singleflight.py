@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+SingleFlight 测试（同 key 并发只执行一次、异常共享、结束后可重新执行）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.tools.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_build():
+    flights = SingleFlight()
+    calls = []
+
+    async def build(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"index:{key}"
+
+    async def main():
+        results = await asyncio.gather(*[flights.do(k, lambda k=k: build(k)) for k in ["a"] * 5 + ["b"] * 3])
+        assert not flights.inflight("a")
+        again = await flights.do("a", lambda: build("a"))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert results == ["index:a"] * 5 + ["index:b"] * 3
+    assert again == "index:a" and calls == ["a", "b", "a"]
+
+
+def test_failure_and_cancelled_waiter():
+    """构建失败时所有等待方收到同一异常；单个等待方取消不影响其余等待方"""
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("构建失败")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def main():
+        errors = await asyncio.gather(*[flights.do("x", failing) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(e, RuntimeError) for e in errors)
+
+        first = asyncio.ensure_future(flights.do("y", slow))
+        second = asyncio.ensure_future(flights.do("y", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 1
@@ -33,6 +33,12 @@ except ImportError as e:
     MODELS_AVAILABLE = False
     print(f"⚠️ 模型依赖不可用: {e}")
 
+try:
+    from backend.tools.embeddings import create_embed_model
+    EMBEDDING_CACHE_AVAILABLE = True
+except ImportError:
+    EMBEDDING_CACHE_AVAILABLE = False
+
 
 class XSearchKnowledgeGraph:
     """xsearch专用知识图谱服务"""
@@ -91,13 +97,22 @@ class XSearchKnowledgeGraph:
                 is_chat_model=True
             )
             
-            # 创建Embedding模型
-            embed_model = DashScopeEmbedding(
-                model_name=embed_config.get('model', 'text-embedding-v3'),
-                api_key=embed_config.get('api_key', ''),
-                dashscope_api_key=embed_config.get('api_key', '')
-            )
-            embed_model.embed_batch_size = 8
+            # 创建Embedding模型：按 config2.yaml 的 embedding_backend 选择提供商
+            # （默认 DashScope，接入切块嵌入缓存与嵌入执行器，按提供商上限分批并发）
+            if EMBEDDING_CACHE_AVAILABLE:
+                embed_model = create_embed_model(
+                    embed_config.get('model', 'text-embedding-v3'),
+                    embed_config.get('api_key', ''),
+                    embed_config.get('dimensions', 1024),
+                    config_path=Path(project_root) / 'config' / 'config2.yaml',
+                )
+            else:
+                embed_model = DashScopeEmbedding(
+                    model_name=embed_config.get('model', 'text-embedding-v3'),
+                    api_key=embed_config.get('api_key', ''),
+                    dashscope_api_key=embed_config.get('api_key', '')
+                )
+                embed_model.embed_batch_size = 8
             
             return llm, embed_model
             
@@ -3,6 +3,7 @@
 本地向量化服务
 借鉴现有服务的实现方式，为xsearch提供本地文档向量化能力
 参考已验证的backend/services代码
+索引使用原生格式（向量文件内存映射 + sqlite 文档库），旧的 llama-index JSON 索引首次加载时自动迁移
 """
 
 import os
@@ -16,9 +17,6 @@ project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
 try:
-    # 🔧 参考已验证的代码：使用MetaGPT的SimpleEngine
-    from metagpt.rag.engines.simple import SimpleEngine
-    from metagpt.rag.schema import FAISSRetrieverConfig
     from metagpt.config2 import Config
     from llama_index.llms.openai_like import OpenAILike
     from llama_index.embeddings.dashscope import DashScopeEmbedding
@@ -27,9 +25,30 @@ except ImportError as e:
     VECTOR_SERVICES_AVAILABLE = False
     print(f"⚠️ 向量化服务依赖不可用: {e}")
 
+try:
+    from backend.tools.embeddings import create_embed_model, get_embedding_backend, with_embedding_cache
+    EMBEDDING_CACHE_AVAILABLE = True
+except ImportError:
+    EMBEDDING_CACHE_AVAILABLE = False
+
+try:
+    from backend.tools.embeddings import embed_queries
+    from backend.tools.native_index import (
+        NativeVectorIndex,
+        embed_nodes,
+        has_legacy_index,
+        load_file_nodes,
+        to_indexed_nodes,
+    )
+    from backend.tools.search_hit import SearchHit, distance_to_score, hit_from_node
+    NATIVE_INDEX_AVAILABLE = True
+except ImportError as e:
+    NATIVE_INDEX_AVAILABLE = False
+    print(f"⚠️ 原生向量索引不可用: {e}")
+
 
 class LocalVectorService:
-    """本地向量化服务 - 使用MetaGPT SimpleEngine"""
+    """本地向量化服务 - 原生向量索引（与项目知识库同一格式）"""
     
     def __init__(self, project_config: Dict[str, Any]):
         self.project_config = project_config
@@ -42,7 +61,8 @@ class LocalVectorService:
         
         # 配置
         self._config = None
-        self._engine = None
+        self._index = None
+        self._embed_model = None
     
     def _get_config(self) -> Config:
         """获取系统配置"""
@@ -73,10 +93,25 @@ class LocalVectorService:
                 is_chat_model=True
             )
             
+            # 离线/本地嵌入后端（config2.yaml 的 embedding_backend）：与项目知识库同一创建入口
+            config_path = Path(self.project_config['project_root']) / 'config' / 'config2.yaml'
+            if EMBEDDING_CACHE_AVAILABLE and get_embedding_backend(config_path)["provider"] != "dashscope":
+                embed_model = create_embed_model(
+                    embed_config.model,
+                    embed_config.api_key,
+                    getattr(embed_config, "dimensions", None) or 1024,
+                    config_path=config_path,
+                )
+                return llm, embed_model
+            
             # 创建Embedding模型
             from metagpt.rag.factories.embedding import get_rag_embedding
             embed_model = get_rag_embedding(config=config)
-            embed_model.embed_batch_size = 5  # 修复：降低batch size避免400错误
+            # 接入切块嵌入缓存与嵌入执行器：与项目/全局索引共用缓存，多批并发，遇 400 仅拆分该批重试
+            if EMBEDDING_CACHE_AVAILABLE:
+                embed_model = with_embedding_cache(embed_model, getattr(embed_config, "dimensions", None) or 1024)
+            else:
+                embed_model.embed_batch_size = 5  # 修复：降低batch size避免400错误
             
             return llm, embed_model
             
@@ -105,14 +140,14 @@ class LocalVectorService:
         return documents
     
     def is_index_exists(self) -> bool:
-        """检查索引是否存在"""
-        # 修复：使用正确的索引文件名
-        index_files = ['docstore.json', 'index_store.json', 'default__vector_store.json']
-        return all((self.index_dir / f).exists() for f in index_files)
+        """检查索引是否存在（原生索引，或待迁移的 llama-index JSON 索引）"""
+        if not NATIVE_INDEX_AVAILABLE:
+            return False
+        return NativeVectorIndex.exists(self.index_dir) or has_legacy_index(self.index_dir)
     
     async def build_vector_index(self, force_rebuild: bool = False) -> bool:
         """构建向量索引"""
-        if not VECTOR_SERVICES_AVAILABLE:
+        if not (VECTOR_SERVICES_AVAILABLE and NATIVE_INDEX_AVAILABLE):
             print("⚠️ 向量化服务不可用")
             return False
         
@@ -135,16 +170,18 @@ class LocalVectorService:
             
             print("🔧 开始构建本地向量索引...")
             
-            # 🔧 参考已验证的代码：使用MetaGPT SimpleEngine
-            engine = SimpleEngine.from_docs(
-                input_files=documents,
-                llm=llm,
-                embed_model=embed_model,
-                retriever_configs=[FAISSRetrieverConfig(dimensions=1024)]  # 使用FAISS支持持久化
-            )
-            
-            # 持久化索引
-            engine.persist(str(self.index_dir))
+            # 与 SimpleEngine.from_docs 相同的切块方式，嵌入完成后写入原生索引
+            nodes = load_file_nodes([Path(p) for p in documents])
+            vectors = await embed_nodes(embed_model, nodes)
+            dims = len(vectors[0]) if vectors else 1024
+            # create() 会删除旧的向量与文档库文件：先关闭已加载的索引（sqlite 连接与内存映射）
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            index = NativeVectorIndex.create(self.index_dir, dims, model=embed_model.model_name)
+            index.add(to_indexed_nodes(nodes), vectors)
+            index.close()
+            self._index = None
             
             print(f"✅ 本地向量索引构建完成，保存到: {self.index_dir}")
             return True
@@ -153,10 +190,17 @@ class LocalVectorService:
             print(f"❌ 构建本地向量索引失败: {e}")
             return False
     
-    async def search_local_documents(self, query: str, top_k: int = 5) -> List[str]:
+    async def search_local_documents(self, query: str, top_k: int = 5) -> List["SearchHit"]:
         """搜索本地文档"""
-        if not VECTOR_SERVICES_AVAILABLE:
+        return (await self.search_local_documents_many([query], top_k))[0]
+    
+    async def search_local_documents_many(self, queries: List[str], top_k: int = 5) -> List[List["SearchHit"]]:
+        """批量搜索本地文档：全部查询一次嵌入请求 + 一次矩阵检索，结果与 queries 顺序一致"""
+        empty = [[] for _ in queries]
+        if not (VECTOR_SERVICES_AVAILABLE and NATIVE_INDEX_AVAILABLE):
             print("⚠️ 向量化服务不可用")
+            return empty
+        if not queries:
             return []
         
         try:
@@ -164,31 +208,32 @@ class LocalVectorService:
             if not self.is_index_exists():
                 print("⚠️ 本地向量索引不存在，尝试构建...")
                 if not await self.build_vector_index():
-                    return []
+                    return empty
             
             # 加载索引
-            if not self._engine:
+            if not self._index:
                 await self._load_index()
             
-            if not self._engine:
+            if not self._index:
                 print("❌ 无法加载向量索引")
-                return []
+                return empty
             
             # 执行搜索
-            results = await self._engine.aretrieve(query)
+            embeddings = await embed_queries(self._embed_model, list(queries))
+            hits = self._index.query(embeddings, top_k)
             
             # 提取搜索结果
-            search_results = []
-            for result in results[:top_k]:
-                if hasattr(result, 'text'):
-                    search_results.append(result.text.strip())
+            search_results = [
+                [hit_from_node(node, distance_to_score(dist, self._index.metric), "local") for node, dist in per_query if node.text]
+                for per_query in hits
+            ]
             
-            print(f"🔍 本地文档搜索完成，找到 {len(search_results)} 条结果")
+            print(f"🔍 本地文档搜索完成，{len(queries)} 个查询共找到 {sum(map(len, search_results))} 条结果")
             return search_results
             
         except Exception as e:
             print(f"❌ 本地文档搜索失败: {e}")
-            return []
+            return empty
     
     async def _load_index(self) -> bool:
         """加载已保存的索引"""
@@ -203,22 +248,23 @@ class LocalVectorService:
             
             print("📖 加载已存在的本地向量索引...")
             
-            # 🔧 参考已验证的代码：使用MetaGPT SimpleEngine.from_index
-            from metagpt.rag.schema import FAISSIndexConfig
-            
-            config = FAISSIndexConfig(
-                persist_path=str(self.index_dir),
-                embed_model=embed_model
-            )
-            
-            self._engine = SimpleEngine.from_index(
-                index_config=config,
-                embed_model=embed_model,
-                llm=llm,
-                retriever_configs=[FAISSRetrieverConfig(dimensions=1024)]
-            )
+            # 原生索引只打开文件句柄；旧 JSON 索引在此一次性迁移
+            self._index = NativeVectorIndex.open_or_migrate(self.index_dir, model=embed_model.model_name)
+            if not self._index:
+                return False
+
+            # 切换嵌入后端后旧向量与查询向量不可比：全量重建（与项目知识库同步时的判断一致）
+            if self._index.model is not None and self._index.model != embed_model.model_name:
+                print(f"⚠️ 本地向量索引由 {self._index.model} 构建，当前嵌入模型为 {embed_model.model_name}，重建索引...")
+                self._index.close()
+                self._index = None
+                if not await self.build_vector_index(force_rebuild=True):
+                    print("❌ 本地向量索引与当前嵌入模型不一致且重建失败，拒绝使用旧索引")
+                    return False
+                self._index = NativeVectorIndex(self.index_dir)
+            self._embed_model = embed_model
             
-            print(f"✅ 本地向量索引加载成功")
+            print(f"✅ 本地向量索引加载成功: {len(self._index)} 个切块")
             return True
             
         except Exception as e:
@@ -232,7 +278,7 @@ class LocalVectorService:
             "index_dir": str(self.index_dir),
             "index_exists": self.is_index_exists(),
             "doc_count": 0,
-            "index_loaded": self._engine is not None
+            "index_loaded": self._index is not None
         }
         
         # 统计文档数量
@@ -95,7 +95,8 @@ async def build_global_knowledge_base(file_paths: list, build_vector: bool = Tru
     # 构建向量索引
     if build_vector:
         print("\n📊 构建向量索引知识库...")
-        # 添加文件到全局知识库
+        # 添加文件到全局知识库（只重建涉及的分类分片）
+        touched_categories = set()
         for file_path in valid_files:
             file_name = Path(file_path).name
             # 根据文件类型自动分类
@@ -126,6 +127,7 @@ async def build_global_knowledge_base(file_paths: list, build_vector: bool = Tru
 
             success = global_knowledge.add_global_document(file_path, category)
             if success:
+                touched_categories.add(category)
                 print(f"📄 已添加: {file_name} -> {category}")
             else:
                 print(f"❌ 添加失败: {file_name}")
@@ -134,7 +136,9 @@ async def build_global_knowledge_base(file_paths: list, build_vector: bool = Tru
         print("\n🔧 构建全局向量索引...")
         try:
             # 若全局知识实现支持，传入切分参数；否则回退
-            success_vector = await global_knowledge.build_global_index(force_rebuild=True, chunk_size=chunk_size, overlap=overlap)
+            success_vector = await global_knowledge.build_global_index(
+                force_rebuild=True, chunk_size=chunk_size, overlap=overlap, categories=sorted(touched_categories)
+            )
         except TypeError:
             success_vector = await global_knowledge.build_global_index(force_rebuild=True)
         
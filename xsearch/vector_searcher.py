@@ -23,6 +23,7 @@ except ImportError:
 
 # 导入配置常量
 from .config_constants import VECTOR_SEARCH_CONFIG
+from backend.tools.search_hit import SearchHit
 
 
 class VectorSearcher:
@@ -42,7 +43,7 @@ class VectorSearcher:
         if not VECTOR_SERVICES_AVAILABLE:
             print("⚠️ 向量搜索服务不可用，将使用模拟搜索")
     
-    async def search_project(self, query: str, top_k: int = None) -> List[str]:
+    async def search_project(self, query: str, top_k: int = None) -> List[SearchHit]:
         """搜索项目知识库"""
         # 使用配置常量作为默认值
         if top_k is None:
@@ -78,7 +79,23 @@ class VectorSearcher:
             print("⚠️ 项目知识库搜索失败，返回空结果")
             return []
     
-    async def search_global(self, query: str, top_k: int = None) -> List[str]:
+    async def search_project_many(self, queries: List[str], top_k: int = None) -> List[List[SearchHit]]:
+        """批量搜索项目知识库（本地向量索引一次嵌入请求 + 一次矩阵检索）"""
+        if top_k is None:
+            top_k = VECTOR_SEARCH_CONFIG["PROJECT_TOP_K"]
+        if not VECTOR_SERVICES_AVAILABLE:
+            print("⚠️ 向量搜索服务不可用")
+            return [[] for _ in queries]
+        
+        try:
+            results = await self.local_vector_service.search_local_documents_many(queries, top_k)
+            print(f"📁 本地文档批量搜索完成，{len(queries)} 个查询")
+            return results
+        except Exception as e:
+            print(f"⚠️ 项目知识库批量搜索失败: {e}")
+            return [[] for _ in queries]
+    
+    async def search_global(self, query: str, top_k: int = None) -> List[SearchHit]:
         """搜索全局知识库（直接使用已构建的索引）"""
         # 使用配置常量作为默认值
         if top_k is None: